@@ -8,13 +8,72 @@ The addon reads the rendered policy IR emitted by `render-policy`. That IR is
 canonicalized to a single top-level `domains` list where each entry is a host
 record with a `host` field and normalized `rules`.
 
+Header injection: when an allowed request needs secrets that the resolver
+cannot serve from its cache, `requestheaders`/`request` return a coroutine
+that mitmproxy awaits. The coroutine resolves the secrets on a small thread
+pool with a per-call timeout, so a slow secret filesystem only delays the
+flows that need it. Requests that need no resolution are handled inline.
+
 Reload behavior: the enforcer installs a `SIGHUP` handler on the mitmproxy
 event loop that re-runs `render-policy` in-process and swaps the matcher
-atomically. A failed reload keeps the previous matcher installed.
+atomically. A failed reload keeps the previous matcher installed. The
+render-policy module is loaded once and re-executed only when the file
+changes. With PROXY_RELOAD_WORKER=process, rendering and compiling run in a
+persistent worker process (see policy_worker.py), so a large reload does not
+compete with in-flight flows for the GIL.
 
 Environment variables:
   PROXY_MODE: log (allow all) or enforce (block non-allowed)
+  POLICY_PATH: rendered policy YAML (default /etc/mitmproxy/policy.yaml).
+  POLICY_ARTIFACT_PATH: optional compiled policy written by
+    `render-policy --compiled-output`. Used at startup instead of parsing
+    POLICY_PATH when its version, checksum and source digest match; otherwise
+    the enforcer logs why and loads the YAML.
+  PROXY_STARTUP_RENDER: 1 renders the policy in-process at startup through
+    the same path as a reload, writing the credential shim and public
+    allowlist, instead of loading POLICY_PATH. This skips a separate
+    render-policy process and the YAML round trip. It also runs in log mode,
+    where only the exports are used. Default 0; entrypoint.sh sets it to 1
+    unless it is explicitly 0.
   PROXY_LOG_LEVEL: quiet (errors only) or normal (default, one line per request)
+  PROXY_LOG_BLOCK_WINDOW: seconds during which repeated blocked requests with
+    the same host, reason and method are counted instead of logged (default
+    10). The first one is logged in full and a `block_summary` event reports
+    the count when the window closes. Set to 0 to log every blocked request.
+  PROXY_SECRET_RESOLVE_TIMEOUT: seconds to wait for one secret resolution
+    before blocking the request with `secret_resolution_timeout` (default 5).
+  PROXY_SECRET_PREFETCH: 1 (default) resolves every secret the policy
+    references once the proxy is running and after each reload, and logs a
+    `secret_prefetch` summary. Set to 0 to resolve secrets only on first use.
+  PROXY_DECISION_CACHE_SIZE: maximum number of memoized policy decisions
+    (default 1024). Set to 0 to disable the cache.
+  PROXY_LOG_QUEUE_SIZE: maximum number of log lines buffered for the
+    background writer thread (default 10000). Set to 0 to write every line
+    synchronously on the event loop.
+  PROXY_LOG_OVERFLOW: what to do when the log queue is full: drop-oldest
+    (default), drop-new, or block. Reload, blocked-request and info lines are
+    never dropped and never wait; they displace the oldest droppable line.
+  PROXY_LOG_STATS_INTERVAL: minimum seconds between `log_stats` events that
+    report dropped lines (default 60).
+  PROXY_LOG_SCHEMA: full (default) or compact. Compact renames well-known
+    keys to short aliases (see COMPACT_LOG_KEYS) and drops JSON whitespace.
+  PROXY_LOG_ENCODER: json (default), auto, or orjson. json keeps the output
+    byte-identical to `json.dumps`. auto uses orjson when it is installed and
+    falls back to json; orjson output is compact and keeps non-ASCII as UTF-8.
+  PROXY_POLICY_WATCH: off (default), auto, or poll. Watches the policy files
+    render-policy reads (see `policy_source_paths()` there) and reloads
+    through the same path as SIGHUP when one changes. auto uses inotify where
+    available; poll checks every PROXY_POLICY_WATCH_INTERVAL seconds (default
+    2) and also sees host-side writes to bind-mounted files.
+  PROXY_RELOAD_WORKER: thread (default) renders reloads on a thread in this
+    process; process renders and compiles them in a persistent worker process
+    and only decodes changed host records and swaps the matcher here.
+  PROXY_POLICY_RELOAD_DEBOUNCE: seconds without further changes to wait
+    before reloading (default 1), so multi-step editor saves reload once.
+  AGENTBOX_SECRET_WATCH: off (default), auto, or poll. Watches the secret
+    source directory and emits a `secret_rotated` event (secret ID only) for
+    each cached secret whose file changed, or one `secret_watch_reset` event
+    when the watch is lost or re-established. See secret_resolver.py.
   AGENTBOX_RENDER_POLICY_PATH: optional override for the render-policy binary
     path. Defaults to /usr/local/bin/render-policy (the location the proxy
     image installs it to).
@@ -23,13 +82,17 @@ Environment variables:
 from __future__ import annotations
 
 import asyncio
-import importlib.util
+import atexit
+import concurrent.futures
 import json
+import multiprocessing
 import os
 import signal
 import sys
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime, timezone
-from importlib.machinery import SourceFileLoader
 from pathlib import Path
 from urllib.parse import urlencode, urlsplit
 
@@ -49,14 +112,21 @@ for module_path in reversed((PROXY_DIR, PROXY_LIB_DIR)):
 
 from policy_matcher import (  # noqa: E402
     DEFAULT_POLICY_PATH,
+    PolicyArtifactError,
     PolicyDecision,
     PolicyError,
     PolicyMatcher,
 )
+from policy_worker import (  # noqa: E402
+    RenderPolicyModuleCache,
+    render_compiled_policy,
+    render_matcher,
+)
+from directory_watcher import DirectoryWatcher  # noqa: E402
 from secret_resolver import (  # noqa: E402
     SecretResolver,
     SecretResolverError,
-    render_header_value,
+    render_compiled_header_value,
 )
 
 try:
@@ -67,47 +137,502 @@ except ImportError:  # pragma: no cover - unit tests intentionally import withou
 
 FLOW_DECISION_METADATA_KEY = "agent_sandbox_policy_decision"
 
+DEFAULT_DECISION_CACHE_SIZE = 1024
+DEFAULT_LOG_BLOCK_WINDOW = 10.0
+DEFAULT_SECRET_RESOLVE_TIMEOUT = 5.0
+POLICY_WATCH_MODES = ("off", "auto", "poll")
+DEFAULT_POLICY_WATCH_INTERVAL = 2.0
+DEFAULT_POLICY_RELOAD_DEBOUNCE = 1.0
+RELOAD_WORKER_MODES = ("thread", "process")
+SECRET_RESOLVE_WORKERS = 4
+DEFAULT_LOG_QUEUE_SIZE = 10000
+DEFAULT_LOG_STATS_INTERVAL = 60.0
+LOG_OVERFLOW_POLICIES = ("block", "drop-oldest", "drop-new")
+LOG_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+LOG_SCHEMAS = ("full", "compact")
+LOG_ENCODERS = ("auto", "json", "orjson")
+COMPACT_LOG_KEYS = {
+    "ts": "t",
+    "type": "ty",
+    "phase": "ph",
+    "action": "a",
+    "reason": "r",
+    "host": "h",
+    "scheme": "s",
+    "matched_host": "mh",
+    "method": "m",
+    "path": "p",
+    "matched_rule_index": "ri",
+    "status": "st",
+    "detail": "d",
+    "header": "hd",
+    "headers": "hs",
+    "secret": "sec",
+    "error": "e",
+    "warnings": "w",
+}
+
 RELOAD_SIGNAL = signal.SIGHUP
 RENDER_POLICY_PATH = Path(
     os.getenv("AGENTBOX_RENDER_POLICY_PATH", "/usr/local/bin/render-policy")
 )
 
 
-def _load_render_policy_module(path):
-    original_sys_path = list(sys.path)
-    loader = SourceFileLoader("agent_sandbox_render_policy", str(path))
-    spec = importlib.util.spec_from_loader(loader.name, loader)
-    module = importlib.util.module_from_spec(spec)
+class CachedTimestamp:
+    """Log timestamp formatter that formats at most once per second.
+
+    Log timestamps have one-second resolution, so the formatted string is
+    cached and only rebuilt when the clock moves to a new second. Without a
+    clock the wall clock is read through `time.time()`, which avoids building a
+    datetime for every line.
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock
+        self._cached = (None, "")
+
+    def __call__(self):
+        if self.clock is None:
+            second = int(time.time())
+            cached_second, text = self._cached
+            if second != cached_second:
+                text = datetime.fromtimestamp(second, timezone.utc).strftime(
+                    LOG_TIMESTAMP_FORMAT
+                )
+                self._cached = (second, text)
+            return text
+
+        now = self.clock()
+        second = now.replace(microsecond=0)
+        cached_second, text = self._cached
+        if second != cached_second:
+            text = now.strftime(LOG_TIMESTAMP_FORMAT)
+            self._cached = (second, text)
+        return text
+
+
+def _orjson_dumps():
     try:
-        loader.exec_module(module)
-    finally:
-        sys.path[:] = original_sys_path
-    return module
+        import orjson
+    except ImportError:
+        return None
+
+    fallback = json.JSONEncoder(separators=(",", ":")).encode
+
+    def dumps(entry):
+        try:
+            return orjson.dumps(entry).decode("utf-8")
+        except TypeError:
+            return fallback(entry)
+
+    return dumps
+
+
+def make_log_encoder(schema="full", encoder="json"):
+    """Return a function that serializes one log entry to a JSON line.
+
+    `full` with the `json` encoder reproduces `json.dumps(entry)` exactly.
+    """
+    if schema not in LOG_SCHEMAS:
+        raise ValueError(f"log schema must be one of {list(LOG_SCHEMAS)}, got {schema!r}")
+    if encoder not in LOG_ENCODERS:
+        raise ValueError(f"log encoder must be one of {list(LOG_ENCODERS)}, got {encoder!r}")
+
+    dumps = None
+    if encoder in ("auto", "orjson"):
+        dumps = _orjson_dumps()
+        if dumps is None and encoder == "orjson":
+            raise ValueError("log encoder 'orjson' requested but orjson is not installed")
+    if dumps is None:
+        if schema == "compact":
+            dumps = json.JSONEncoder(separators=(",", ":")).encode
+        else:
+            dumps = json.dumps
+
+    if schema == "full":
+        return dumps
+
+    def encode_compact(entry):
+        return dumps({COMPACT_LOG_KEYS.get(key, key): value for key, value in entry.items()})
+
+    return encode_compact
+
+
+class StreamLogWriter:
+    """Write each log line to the stream immediately, on the caller's thread."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, line, critical=False):
+        del critical
+        self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class BackgroundLogWriter:
+    """Hand log lines to a writer thread through a bounded queue.
+
+    The mitmproxy event loop only appends to the queue. The writer thread
+    drains everything queued so far and writes it as one batch, so a slow
+    stdout pipe delays log output instead of stalling the proxy. When the queue
+    is full, `overflow` decides what happens to a new line: `drop-oldest`
+    (the default) discards the oldest droppable queued line, `drop-new`
+    discards the incoming line, and `block` waits for space. Critical lines
+    are never discarded and never wait: they displace the oldest droppable
+    line, or are queued past the bound when every queued line is critical.
+    Dropped lines are counted and reported in
+    `log_stats` events at most once every `stats_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        stream,
+        max_queue=DEFAULT_LOG_QUEUE_SIZE,
+        overflow="drop-oldest",
+        stats_interval=DEFAULT_LOG_STATS_INTERVAL,
+        timestamp=None,
+        encode=json.dumps,
+        monotonic=time.monotonic,
+    ):
+        if max_queue < 1:
+            raise ValueError("log queue size must be at least 1")
+        if overflow not in LOG_OVERFLOW_POLICIES:
+            raise ValueError(
+                f"log overflow policy must be one of {list(LOG_OVERFLOW_POLICIES)}, "
+                f"got {overflow!r}"
+            )
+        if stats_interval < 0:
+            raise ValueError("log stats interval must not be negative")
+
+        self.stream = stream
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.stats_interval = stats_interval
+        self.timestamp = timestamp or CachedTimestamp()
+        self.encode = encode
+        self.monotonic = monotonic
+        self.dropped_total = 0
+        self._dropped_unreported = 0
+        self._last_report = monotonic()
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def write(self, line, critical=False):
+        with self._condition:
+            if self._closed:
+                if not self._write_batch([line]):
+                    self._record_drops(1)
+                return
+            self._ensure_started()
+            if len(self._queue) >= self.max_queue:
+                if critical:
+                    # Never wait on the event loop for a critical line: take a
+                    # droppable line's slot, or run over the bound if there is none.
+                    self._drop_oldest()
+                elif self.overflow == "block":
+                    while len(self._queue) >= self.max_queue:
+                        self._condition.wait()
+                elif self.overflow == "drop-new" or not self._drop_oldest():
+                    self._record_drops(1)
+                    return
+            self._queue.append((line, critical))
+            self._condition.notify_all()
+
+    def close(self, timeout=5.0):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "overflow": self.overflow,
+                "dropped_total": self.dropped_total,
+            }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="agentbox-log-writer",
+            daemon=True,
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _drop_oldest(self):
+        for index, (_, critical) in enumerate(self._queue):
+            if not critical:
+                del self._queue[index]
+                self._record_drops(1)
+                return True
+        return False
+
+    def _record_drops(self, count):
+        self.dropped_total += count
+        self._dropped_unreported += count
+        self._condition.notify_all()
+
+    def _stats_line(self, force=False):
+        if not self._dropped_unreported:
+            return None
+        now = self.monotonic()
+        if not force and now - self._last_report < self.stats_interval:
+            return None
+        entry = {
+            "ts": self.timestamp(),
+            "type": "log_stats",
+            "dropped_events": self._dropped_unreported,
+            "dropped_total": self.dropped_total,
+            "overflow": self.overflow,
+        }
+        self._dropped_unreported = 0
+        self._last_report = now
+        return self.encode(entry)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait(timeout=self.stats_interval or None)
+                    if self._dropped_unreported and self._stats_line_due():
+                        break
+                batch = [line for line, _ in self._queue]
+                self._queue.clear()
+                closing = self._closed
+                stats_line = self._stats_line(force=closing)
+                self._condition.notify_all()
+
+            if stats_line is not None:
+                batch.append(stats_line)
+            if batch and not self._write_batch(batch):
+                with self._condition:
+                    self._record_drops(len(batch))
+            if closing:
+                return
+
+    def _stats_line_due(self):
+        return self.monotonic() - self._last_report >= self.stats_interval
+
+    def _write_batch(self, lines):
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            # There is nowhere left to report a broken stdout, so callers count
+            # the lines as dropped instead.
+            return False
+        return True
+
+
+def log_writer_from_env(stream, env=None, encode=json.dumps):
+    if env is None:
+        env = os.environ
+
+    queue_size_text = env.get("PROXY_LOG_QUEUE_SIZE", str(DEFAULT_LOG_QUEUE_SIZE))
+    try:
+        queue_size = int(queue_size_text)
+        if queue_size < 0:
+            raise ValueError
+    except ValueError:
+        raise ValueError(
+            f"Invalid PROXY_LOG_QUEUE_SIZE '{queue_size_text}'. Use a non-negative integer."
+        ) from None
+    if queue_size == 0:
+        return StreamLogWriter(stream)
+
+    overflow = env.get("PROXY_LOG_OVERFLOW", "drop-oldest").strip().lower()
+    if overflow not in LOG_OVERFLOW_POLICIES:
+        raise ValueError(
+            f"Invalid PROXY_LOG_OVERFLOW '{overflow}'. "
+            f"Use one of {', '.join(LOG_OVERFLOW_POLICIES)}."
+        )
+
+    interval_text = env.get("PROXY_LOG_STATS_INTERVAL", str(DEFAULT_LOG_STATS_INTERVAL))
+    try:
+        stats_interval = float(interval_text)
+        if stats_interval < 0:
+            raise ValueError
+    except ValueError:
+        raise ValueError(
+            f"Invalid PROXY_LOG_STATS_INTERVAL '{interval_text}'. "
+            "Use a non-negative number of seconds."
+        ) from None
+
+    return BackgroundLogWriter(
+        stream,
+        max_queue=queue_size,
+        overflow=overflow,
+        stats_interval=stats_interval,
+        encode=encode,
+    )
+
+
+def json_logger_from_env(log_level, stream=None, env=None):
+    if env is None:
+        env = os.environ
+    if stream is None:
+        stream = sys.stdout
+
+    schema = env.get("PROXY_LOG_SCHEMA", "full").strip().lower()
+    encoder = env.get("PROXY_LOG_ENCODER", "json").strip().lower()
+    try:
+        encode = make_log_encoder(schema, encoder)
+    except ValueError as error:
+        raise ValueError(
+            f"Invalid PROXY_LOG_SCHEMA/PROXY_LOG_ENCODER: {error}"
+        ) from None
+
+    return JsonLogger(
+        log_level=log_level,
+        stream=stream,
+        writer=log_writer_from_env(stream, env, encode=encode),
+        encode=encode,
+    )
 
 
 class JsonLogger:
-    def __init__(self, log_level="normal", stream=None, clock=None):
+    def __init__(self, log_level="normal", stream=None, clock=None, writer=None, encode=None):
         self.log_level = log_level
         self.stream = stream if stream is not None else sys.stdout
-        self.clock = clock or (lambda: datetime.now(timezone.utc))
-
-    def timestamp(self):
-        return self.clock().strftime("%Y-%m-%d %H:%M:%S")
+        self.clock = clock
+        self.timestamp = CachedTimestamp(clock)
+        self.writer = writer if writer is not None else StreamLogWriter(self.stream)
+        self.encode = encode or json.dumps
 
     def info(self, message):
-        self._emit({
-            "ts": self.timestamp(),
-            "type": "info",
-            "msg": message,
-        })
+        self._emit(
+            {
+                "ts": self.timestamp(),
+                "type": "info",
+                "msg": message,
+            },
+            critical=True,
+        )
+
+    def enabled(self, always=False):
+        """Whether `event(entry, always)` would emit; check before building entries."""
+        return always or self.log_level != "quiet"
 
-    def event(self, entry, always=False):
+    def event(self, entry, always=False, critical=False):
         if self.log_level == "quiet" and not always:
             return
-        self._emit(entry)
+        self._emit(entry, critical=critical or always)
+
+    def close(self):
+        self.writer.close()
+
+    def _emit(self, entry, critical=False):
+        self.writer.write(self.encode(entry), critical)
+
+
+class DecisionCache:
+    """Bounded LRU of policy decisions.
 
-    def _emit(self, entry):
-        print(json.dumps(entry), file=self.stream, flush=True)
+    Keys carry the enforcer's policy generation, so entries computed against a
+    replaced matcher can never be returned. `clear()` drops them eagerly when
+    a new matcher is installed. Counters are cumulative across generations.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        decision = self._entries.get(key)
+        if decision is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return decision
+
+    def put(self, key, decision):
+        self._entries[key] = decision
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries = OrderedDict()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class _BlockWindow:
+    __slots__ = ("decision", "opened", "first_ts", "last_ts", "count")
+
+    def __init__(self, decision, opened, ts):
+        self.decision = decision
+        self.opened = opened
+        self.first_ts = ts
+        self.last_ts = ts
+        self.count = 1
+
+
+class BlockLogCoalescer:
+    """Suppression windows for repeated blocked-request log lines.
+
+    The first blocked event for a key opens a window and is logged in full;
+    later events for the same key inside the window only bump its counter.
+    `expire()` hands back the closed windows so the caller can emit one
+    summary per window that suppressed anything.
+    """
+
+    def __init__(self, window, monotonic=time.monotonic):
+        self.window = window
+        self.monotonic = monotonic
+        # Insertion order is opening order, so expired windows are always a
+        # prefix of the dict.
+        self._windows = {}
+
+    def observe(self, key, decision, ts):
+        """Record one blocked event and return True if it should be logged."""
+        current = self._windows.get(key)
+        if current is not None and self.monotonic() - current.opened < self.window:
+            current.count += 1
+            current.last_ts = ts
+            return False
+        self._windows.pop(key, None)
+        self._windows[key] = _BlockWindow(decision, self.monotonic(), ts)
+        return True
+
+    def expire(self, force=False):
+        """Remove closed windows and return those that suppressed events."""
+        closed = []
+        now = self.monotonic()
+        while self._windows:
+            key, current = next(iter(self._windows.items()))
+            if not force and now - current.opened < self.window:
+                break
+            del self._windows[key]
+            if current.count > 1:
+                closed.append(current)
+        return closed
 
 
 class PolicyEnforcer:
@@ -116,37 +641,173 @@ class PolicyEnforcer:
         mode=None,
         log_level=None,
         policy_path=None,
+        policy_artifact_path=None,
         matcher=None,
         logger=None,
         response_factory=None,
         reload_renderer=None,
         secret_resolver=None,
         secret_resolver_factory=None,
+        decision_cache_size=None,
+        block_log_window=None,
+        secret_resolve_timeout=None,
+        secret_prefetch=None,
+        policy_watch=None,
+        policy_watch_interval=None,
+        policy_reload_debounce=None,
+        policy_watch_paths=None,
+        reload_worker=None,
+        startup_render=None,
     ):
         self.mode = mode or os.getenv("PROXY_MODE", "log")
         self.log_level = log_level or os.getenv("PROXY_LOG_LEVEL", "normal")
-        self.logger = logger or JsonLogger(log_level=self.log_level)
+        if logger is None:
+            try:
+                logger = json_logger_from_env(self.log_level)
+            except ValueError as error:
+                JsonLogger(log_level=self.log_level).info(str(error))
+                sys.exit(1)
+        self.logger = logger
         self.response_factory = response_factory
         self.reload_renderer = reload_renderer
         self._secret_resolver = secret_resolver
         self._secret_resolver_factory = secret_resolver_factory or SecretResolver.from_env
+        self._secret_executor = None
+        self.secret_resolve_timeout = DEFAULT_SECRET_RESOLVE_TIMEOUT
+        self.secret_prefetch = False
         self.matcher = None
+        self.policy_generation = 0
+        self.decision_cache = None
+        self.block_log_coalescer = None
+        self._block_flush_handle = None
+        self._block_flush_loop = None
+        self._prefetch_task = None
         self.domain_records = []
         self.exact_host_count = 0
         self.wildcard_host_count = 0
         self._reload_lock = asyncio.Lock()
+        self._render_policy_modules = RenderPolicyModuleCache(RENDER_POLICY_PATH)
+        self.policy_watch = "off"
+        self.policy_watch_interval = DEFAULT_POLICY_WATCH_INTERVAL
+        self.policy_reload_debounce = DEFAULT_POLICY_RELOAD_DEBOUNCE
+        self._policy_watch_paths = policy_watch_paths
+        self._policy_watchers = []
+        self._policy_watch_started = False
+        self._policy_reload_handle = None
+        self.reload_worker = "thread"
+        self._reload_process_pool = None
         self._reload_tasks: set[asyncio.Task] = set()
+        self._reload_running = False
+        self._pending_reload_trigger = None
+        self._pending_reload_requests = 0
         self._signal_loop = None
 
+        if startup_render is None:
+            startup_render = os.getenv("PROXY_STARTUP_RENDER", "0").strip() == "1"
+
         if self.mode == "enforce":
+            if decision_cache_size is None:
+                decision_cache_size = os.getenv(
+                    "PROXY_DECISION_CACHE_SIZE", str(DEFAULT_DECISION_CACHE_SIZE)
+                )
+            try:
+                decision_cache_size = int(decision_cache_size)
+                if decision_cache_size < 0:
+                    raise ValueError
+            except ValueError:
+                self.logger.info(
+                    f"Invalid PROXY_DECISION_CACHE_SIZE '{decision_cache_size}'. "
+                    "Use a non-negative integer."
+                )
+                sys.exit(1)
+            if decision_cache_size > 0:
+                self.decision_cache = DecisionCache(decision_cache_size)
+
+            if block_log_window is None:
+                block_log_window = os.getenv(
+                    "PROXY_LOG_BLOCK_WINDOW", str(DEFAULT_LOG_BLOCK_WINDOW)
+                )
+            raw_block_log_window = block_log_window
+            try:
+                block_log_window = float(block_log_window)
+                if not block_log_window >= 0:
+                    raise ValueError
+            except ValueError:
+                self.logger.info(
+                    f"Invalid PROXY_LOG_BLOCK_WINDOW '{raw_block_log_window}'. "
+                    "Use a non-negative number of seconds."
+                )
+                sys.exit(1)
+            if block_log_window > 0:
+                self.block_log_coalescer = BlockLogCoalescer(block_log_window)
+
+            if secret_resolve_timeout is None:
+                secret_resolve_timeout = os.getenv(
+                    "PROXY_SECRET_RESOLVE_TIMEOUT", str(DEFAULT_SECRET_RESOLVE_TIMEOUT)
+                )
+            raw_secret_resolve_timeout = secret_resolve_timeout
+            try:
+                secret_resolve_timeout = float(secret_resolve_timeout)
+                if not secret_resolve_timeout > 0:
+                    raise ValueError
+            except ValueError:
+                self.logger.info(
+                    f"Invalid PROXY_SECRET_RESOLVE_TIMEOUT '{raw_secret_resolve_timeout}'. "
+                    "Use a positive number of seconds."
+                )
+                sys.exit(1)
+            self.secret_resolve_timeout = secret_resolve_timeout
+
+            if policy_watch is None:
+                policy_watch = os.getenv("PROXY_POLICY_WATCH", "off")
+            policy_watch = policy_watch.strip().lower()
+            if policy_watch not in POLICY_WATCH_MODES:
+                self.logger.info(
+                    f"Invalid PROXY_POLICY_WATCH '{policy_watch}'. "
+                    f"Use one of: {', '.join(POLICY_WATCH_MODES)}."
+                )
+                sys.exit(1)
+            self.policy_watch = policy_watch
+            self.policy_watch_interval = self._seconds_option(
+                policy_watch_interval,
+                "PROXY_POLICY_WATCH_INTERVAL",
+                DEFAULT_POLICY_WATCH_INTERVAL,
+            )
+            self.policy_reload_debounce = self._seconds_option(
+                policy_reload_debounce,
+                "PROXY_POLICY_RELOAD_DEBOUNCE",
+                DEFAULT_POLICY_RELOAD_DEBOUNCE,
+                allow_zero=True,
+            )
+
+            if reload_worker is None:
+                reload_worker = os.getenv("PROXY_RELOAD_WORKER", "thread")
+            reload_worker = reload_worker.strip().lower()
+            if reload_worker not in RELOAD_WORKER_MODES:
+                self.logger.info(
+                    f"Invalid PROXY_RELOAD_WORKER '{reload_worker}'. "
+                    f"Use one of: {', '.join(RELOAD_WORKER_MODES)}."
+                )
+                sys.exit(1)
+            self.reload_worker = reload_worker
+
+            if secret_prefetch is None:
+                secret_prefetch = os.getenv("PROXY_SECRET_PREFETCH", "1").strip() != "0"
+            self.secret_prefetch = bool(secret_prefetch)
+
             resolved_matcher = matcher
+            if resolved_matcher is None and startup_render:
+                resolved_matcher = self._render_startup_matcher()
             if resolved_matcher is None:
                 resolved_policy_path = policy_path or os.getenv(
                     "POLICY_PATH", DEFAULT_POLICY_PATH
                 )
+                if policy_artifact_path is None:
+                    policy_artifact_path = os.getenv("POLICY_ARTIFACT_PATH", "").strip()
                 try:
-                    resolved_matcher = PolicyMatcher.from_policy_path(
-                        resolved_policy_path
+                    resolved_matcher = self._load_policy_matcher(
+                        resolved_policy_path,
+                        policy_artifact_path,
                     )
                 except PolicyError as error:
                     self.logger.info(str(error))
@@ -156,12 +817,54 @@ class PolicyEnforcer:
             self._log_loaded_policy()
         elif self.mode == "log":
             self.logger.info("Running in log mode (no enforcement)")
+            if startup_render:
+                # Nothing is enforced, but the agent still needs the credential
+                # shim and public allowlist the render writes.
+                self._render_startup_matcher()
         else:
             self.logger.info(
                 f"Unknown PROXY_MODE '{self.mode}'. Use 'enforce' or 'log'."
             )
             sys.exit(1)
 
+    def _seconds_option(self, value, env_name, default, allow_zero=False):
+        if value is None:
+            value = os.getenv(env_name, str(default))
+        try:
+            seconds = float(value)
+            if not (seconds >= 0 if allow_zero else seconds > 0):
+                raise ValueError
+        except ValueError:
+            kind = "non-negative" if allow_zero else "positive"
+            self.logger.info(f"Invalid {env_name} '{value}'. Use a {kind} number of seconds.")
+            sys.exit(1)
+        return seconds
+
+    def _render_startup_matcher(self):
+        # Rendering here also warms the module cache the first reload uses.
+        try:
+            matcher, timings = render_matcher(
+                self._render_policy_modules,
+                renderer=self.reload_renderer,
+                source_description="rendered policy",
+            )
+        except Exception as error:
+            self.logger.info(f"Policy render failed: {error}")
+            sys.exit(1)
+        self.logger.info(
+            f"Policy rendered in-process: render {timings['render_ms']} ms, "
+            f"compile {timings['compile_ms']} ms"
+        )
+        return matcher
+
+    def _load_policy_matcher(self, policy_path, artifact_path):
+        if artifact_path:
+            try:
+                return PolicyMatcher.from_artifact_path(artifact_path, policy_path)
+            except PolicyArtifactError as error:
+                self.logger.info(f"Compiled policy not used ({error}); loading {policy_path}")
+        return PolicyMatcher.from_policy_path(policy_path)
+
     def _default_response_factory(self):
         if http is None:
             raise RuntimeError(
@@ -171,6 +874,9 @@ class PolicyEnforcer:
 
     def _set_matcher(self, matcher):
         self.matcher = matcher
+        self.policy_generation += 1
+        if self.decision_cache is not None:
+            self.decision_cache.clear()
         self.domain_records = [{"host": record.host} for record in matcher.host_records]
         self.exact_host_count = matcher.exact_host_count
         self.wildcard_host_count = matcher.wildcard_host_count
@@ -192,6 +898,14 @@ class PolicyEnforcer:
         except RuntimeError:  # pragma: no cover - only hit outside an asyncio context.
             return
         self._signal_loop = loop
+        self._start_secret_prefetch(loop)
+        if self.block_log_coalescer is not None:
+            # Kept apart from the signal state: the flush timer must keep
+            # running even where SIGHUP handling is unavailable.
+            self._block_flush_loop = loop
+            self._schedule_block_flush()
+        if self.policy_watch != "off":
+            self._start_policy_watch(loop)
         try:
             loop.add_signal_handler(RELOAD_SIGNAL, self._handle_reload_signal)
         except (NotImplementedError, RuntimeError) as error:
@@ -203,64 +917,269 @@ class PolicyEnforcer:
     def done(self):
         loop = self._signal_loop
         self._signal_loop = None
-        if loop is None:
-            return
-        try:
-            loop.remove_signal_handler(RELOAD_SIGNAL)
-        except (NotImplementedError, RuntimeError, ValueError):  # pragma: no cover - best-effort cleanup.
-            pass
+        if loop is not None:
+            try:
+                loop.remove_signal_handler(RELOAD_SIGNAL)
+            except (NotImplementedError, RuntimeError, ValueError):  # pragma: no cover - best-effort cleanup.
+                pass
+        self._block_flush_loop = None
+        if self._block_flush_handle is not None:
+            self._block_flush_handle.cancel()
+            self._block_flush_handle = None
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+        self._stop_policy_watch()
+        if self._reload_process_pool is not None:
+            self._reload_process_pool.shutdown(wait=False, cancel_futures=True)
+            self._reload_process_pool = None
+        self._flush_block_summaries(force=True)
+        if self._secret_executor is not None:
+            self._secret_executor.shutdown(wait=False, cancel_futures=True)
+            self._secret_executor = None
+        close_resolver = getattr(self._secret_resolver, "close", None)
+        if close_resolver is not None:
+            close_resolver()
+        self.logger.close()
+
+    def _schedule_block_flush(self):
+        self._block_flush_handle = self._block_flush_loop.call_later(
+            self.block_log_coalescer.window,
+            self._run_block_flush,
+        )
+
+    def _run_block_flush(self):
+        self._flush_block_summaries()
+        if self._block_flush_loop is not None:
+            self._schedule_block_flush()
 
     def _handle_reload_signal(self):
-        task = asyncio.create_task(self.reload())
+        self._start_reload("sighup")
+
+    def _start_reload(self, trigger):
+        # At most one render runs and at most one is pending. Requests that
+        # arrive while a render is running fold into the pending reload, which
+        # starts once the running one finishes and reads the files as they are
+        # then, so a burst of signals costs at most two renders.
+        if self._reload_running:
+            self._pending_reload_trigger = trigger
+            self._pending_reload_requests += 1
+            return
+        self._reload_running = True
+        task = asyncio.create_task(self._run_reloads(trigger))
         self._reload_tasks.add(task)
         task.add_done_callback(self._reload_tasks.discard)
 
-    async def reload(self):
+    async def _run_reloads(self, trigger):
+        requests = 1
+        try:
+            while True:
+                await self.reload(trigger=trigger, coalesced_requests=requests)
+                if not self._pending_reload_requests:
+                    return
+                trigger = self._pending_reload_trigger
+                requests = self._pending_reload_requests
+                self._pending_reload_trigger = None
+                self._pending_reload_requests = 0
+        finally:
+            self._reload_running = False
+
+    def _start_policy_watch(self, loop):
+        try:
+            paths = self._policy_watch_paths
+            if paths is None:
+                paths = self._render_policy_modules.get().policy_source_paths()
+        except Exception as error:
+            self.logger.info(f"Policy file watch unavailable: {error}")
+            return
+
+        names_by_directory = {}
+        for path in paths:
+            path = Path(path)
+            names_by_directory.setdefault(path.parent, set()).add(path.name)
+        for directory, names in names_by_directory.items():
+            watcher = DirectoryWatcher(
+                directory,
+                lambda name, names=names: self._handle_policy_file_change(loop, names, name),
+                mode=self.policy_watch,
+                poll_interval=self.policy_watch_interval,
+                thread_name="agentbox-policy-watcher",
+            )
+            watcher.start()
+            self._policy_watchers.append(watcher)
+        # Only changes reported after startup should trigger a reload.
+        self._policy_watch_started = True
+        modes = sorted({watcher.mode for watcher in self._policy_watchers})
+        self.logger.info(
+            f"Watching policy files for changes ({', '.join(modes)}): "
+            f"{', '.join(str(path) for path in paths)}"
+        )
+
+    def _stop_policy_watch(self):
+        self._policy_watch_started = False
+        for watcher in self._policy_watchers:
+            watcher.stop()
+        self._policy_watchers = []
+        if self._policy_reload_handle is not None:
+            self._policy_reload_handle.cancel()
+            self._policy_reload_handle = None
+
+    def _handle_policy_file_change(self, loop, names, name):
+        # Called on a watcher thread. Other files in the same directory, such
+        # as editor swap and backup files, are ignored.
+        if not self._policy_watch_started or (name is not None and name not in names):
+            return
+        try:
+            loop.call_soon_threadsafe(self._schedule_policy_reload, loop)
+        except RuntimeError:  # pragma: no cover - the loop is already closed.
+            pass
+
+    def _schedule_policy_reload(self, loop):
+        # Each change restarts the debounce timer, so an editor that writes a
+        # file in several steps triggers one reload after the last step.
+        if not self._policy_watch_started:
+            return
+        if self._policy_reload_handle is not None:
+            self._policy_reload_handle.cancel()
+        self._policy_reload_handle = loop.call_later(
+            self.policy_reload_debounce,
+            self._run_policy_file_reload,
+        )
+
+    def _run_policy_file_reload(self):
+        self._policy_reload_handle = None
+        self._start_reload("policy_watch")
+
+    async def reload(self, trigger=None, coalesced_requests=None):
         if self.mode != "enforce":
             return
         async with self._reload_lock:
+            previous = self.matcher
             try:
-                matcher = await asyncio.to_thread(self._render_matcher)
+                if self.reload_worker == "process" and self.reload_renderer is None:
+                    matcher, timings = await self._render_matcher_in_worker(previous)
+                else:
+                    matcher, timings = await asyncio.to_thread(self._render_matcher, previous)
             except Exception as error:
                 self.logger.event(
-                    self._reload_event("rejected", error=str(error)),
+                    self._reload_event(
+                        "rejected",
+                        error=str(error),
+                        trigger=trigger,
+                        coalesced_requests=coalesced_requests,
+                    ),
                     always=True,
                 )
                 return
             self._set_matcher(matcher)
-            self.logger.event(
-                self._reload_event("applied"),
-                always=True,
+            entry = self._reload_event("applied", trigger=trigger, coalesced_requests=coalesced_requests)
+            entry.update(timings)
+            self.logger.event(entry, always=True)
+        # Outside the reload lock, so a slow secret source cannot hold up the
+        # next reload.
+        self._start_secret_prefetch(asyncio.get_running_loop())
+
+    def _start_secret_prefetch(self, loop):
+        """Prefetch the current policy's secrets in a task, replacing any older one."""
+        if not self.secret_prefetch:
+            return
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+        self._prefetch_task = loop.create_task(self._prefetch_secrets())
+
+    def _render_matcher(self, previous):
+        matcher, details = render_matcher(
+            self._render_policy_modules,
+            previous=previous,
+            renderer=self.reload_renderer,
+        )
+        return matcher, {"host_changes": matcher.host_record_changes(previous), **details}
+
+    @staticmethod
+    def _decode_worker_matcher(artifact, previous):
+        started = time.monotonic()
+        matcher = PolicyMatcher.from_artifact_bytes(artifact, "reloaded policy", previous)
+        decode_ms = round((time.monotonic() - started) * 1000, 3)
+        return matcher, {"host_changes": matcher.host_record_changes(previous), "decode_ms": decode_ms}
+
+    async def _render_matcher_in_worker(self, previous):
+        # The worker renders and compiles; this process only decodes the host
+        # records that changed and swaps the matcher.
+        if self._reload_process_pool is None:
+            self._reload_process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
             )
-
-    def _render_matcher(self):
-        module = None
-        if self.reload_renderer is not None:
-            rendered_policy = self.reload_renderer()
-        else:
-            module = _load_render_policy_module(RENDER_POLICY_PATH)
-            rendered_policy = module.render_policy()
-        matcher = PolicyMatcher.from_policy_data(rendered_policy, path="reloaded policy")
-        if module is not None and hasattr(module, "write_credential_shim_init"):
-            module.write_credential_shim_init(rendered_policy)
-        if module is not None and hasattr(module, "write_public_policy"):
-            module.write_public_policy(rendered_policy)
-        return matcher
-
-    def _reload_event(self, action, error=None):
+        loop = asyncio.get_running_loop()
+        try:
+            artifact, timings = await loop.run_in_executor(
+                self._reload_process_pool,
+                render_compiled_policy,
+                str(RENDER_POLICY_PATH),
+            )
+        except concurrent.futures.BrokenExecutor:
+            # The worker died; start a fresh one on the next reload.
+            self._reload_process_pool.shutdown(wait=False, cancel_futures=True)
+            self._reload_process_pool = None
+            raise
+        matcher, details = await asyncio.to_thread(self._decode_worker_matcher, artifact, previous)
+        return matcher, {**details, **timings}
+
+    def _reload_event(self, action, error=None, trigger=None, coalesced_requests=None):
         entry = {
             "ts": self.logger.timestamp(),
             "type": "reload",
             "action": action,
         }
+        if trigger is not None:
+            entry["trigger"] = trigger
+        if coalesced_requests is not None:
+            entry["coalesced_requests"] = coalesced_requests
         if action == "applied":
             entry["host_records"] = len(self.domain_records)
             entry["exact_host_count"] = self.exact_host_count
             entry["wildcard_host_count"] = self.wildcard_host_count
+            entry["policy_generation"] = self.policy_generation
+        if self.decision_cache is not None:
+            entry["decision_cache"] = self.decision_cache.stats()
         if error is not None:
             entry["error"] = error
         return entry
 
+    def _evaluate_connect(self, host):
+        cache = self.decision_cache
+        if cache is None:
+            return self.matcher.evaluate_connect(host)
+
+        key = (self.policy_generation, "connect", host)
+        decision = cache.get(key)
+        if decision is None:
+            decision = self.matcher.evaluate_connect(host)
+            cache.put(key, decision)
+        return decision
+
+    def _evaluate_request(self, host, scheme, method, request_target):
+        cache = self.decision_cache
+        if cache is None:
+            return self.matcher.evaluate_request(
+                host=host,
+                scheme=scheme,
+                method=method,
+                request_target=request_target,
+            )
+
+        key = (self.policy_generation, "request", host, scheme, method, request_target)
+        decision = cache.get(key)
+        if decision is None:
+            decision = self.matcher.evaluate_request(
+                host=host,
+                scheme=scheme,
+                method=method,
+                request_target=request_target,
+            )
+            cache.put(key, decision)
+        return decision
+
     def _make_response(self, status_code, body):
         factory = self.response_factory or self._default_response_factory()
         return factory(status_code, body)
@@ -281,45 +1200,55 @@ class PolicyEnforcer:
         return metadata
 
     def _store_decision(self, flow, decision):
-        self._get_flow_metadata(flow)[FLOW_DECISION_METADATA_KEY] = decision.to_metadata()
+        # PolicyDecision is immutable, so the object itself (including its
+        # rule_transform) is kept on the flow and may be shared across flows.
+        self._get_flow_metadata(flow)[FLOW_DECISION_METADATA_KEY] = decision
 
     def _get_stored_decision(self, flow):
-        metadata = self._get_flow_metadata(flow)
-        payload = metadata.get(FLOW_DECISION_METADATA_KEY)
-        if payload is None:
-            return None
-        return PolicyDecision.from_metadata(payload)
+        return self._get_flow_metadata(flow).get(FLOW_DECISION_METADATA_KEY)
 
     def _clear_stored_decision(self, flow):
         self._get_flow_metadata(flow).pop(FLOW_DECISION_METADATA_KEY, None)
 
     def _decision_log_entry(self, decision):
+        entry = {"ts": self.logger.timestamp()}
+        entry.update(decision.log_fields())
+        return entry
+
+    def _log_blocked_decision(self, decision):
+        if not self.logger.enabled():
+            return
+        coalescer = self.block_log_coalescer
+        if coalescer is None:
+            self.logger.event(self._decision_log_entry(decision), critical=True)
+            return
+
+        self._flush_block_summaries()
+        key = (decision.host, decision.reason, decision.method)
+        if coalescer.observe(key, decision, self.logger.timestamp()):
+            self.logger.event(self._decision_log_entry(decision), critical=True)
+
+    def _flush_block_summaries(self, force=False):
+        if self.block_log_coalescer is None:
+            return
+        for closed in self.block_log_coalescer.expire(force=force):
+            self.logger.event(self._block_summary_entry(closed), critical=True)
+
+    def _block_summary_entry(self, closed):
+        decision = closed.decision
         entry = {
             "ts": self.logger.timestamp(),
+            "type": "block_summary",
             "phase": decision.phase,
             "action": decision.action,
             "reason": decision.reason,
             "host": decision.host,
-            "scheme": decision.scheme,
         }
-
-        if decision.matched_host is not None:
-            entry["matched_host"] = decision.matched_host
         if decision.method is not None:
             entry["method"] = decision.method
-        if decision.path is not None:
-            entry["path"] = decision.path
-        if decision.matched_rule_index is not None:
-            entry["matched_rule_index"] = decision.matched_rule_index
-        if decision.detail is not None:
-            entry["detail"] = decision.detail
-        if decision.header is not None:
-            entry["header"] = decision.header
-        if decision.secret is not None:
-            entry["secret"] = decision.secret
-        if decision.error is not None:
-            entry["error"] = decision.error
-
+        entry["count"] = closed.count
+        entry["first_ts"] = closed.first_ts
+        entry["last_ts"] = closed.last_ts
         return entry
 
     def _request_path_for_log(self, request):
@@ -364,31 +1293,137 @@ class PolicyEnforcer:
 
     def _get_secret_resolver(self):
         if self._secret_resolver is None:
-            self._secret_resolver = self._secret_resolver_factory()
+            resolver = self._secret_resolver_factory()
+            start_watching = getattr(resolver, "start_watching", None)
+            if start_watching is not None:
+                watch_mode = start_watching(
+                    self._log_secret_rotated,
+                    self._log_secret_watch_reset,
+                )
+                if watch_mode is not None:
+                    self.logger.info(f"Secret source watcher started ({watch_mode})")
+            self._secret_resolver = resolver
         return self._secret_resolver
 
-    def _header_transform_config(self, header):
-        transform = {"type": header.transform_type}
-        if header.transform_type == "basic":
-            transform["username"] = header.username
-        return transform
+    async def _prefetch_secrets(self):
+        """Resolve every policy secret concurrently to warm the resolver cache.
+
+        Runs on the event loop: the resolver is created here, and the
+        resolutions run on the secret executor until they all finish or
+        `secret_resolve_timeout` passes. Failures are only reported; the
+        affected requests still fail closed when they arrive.
+        """
+        if not self.secret_prefetch:
+            return
+        secret_ids = self.matcher.secret_ids()
+        if not secret_ids:
+            return
 
-    def _find_existing_header_name(self, headers, target_name):
-        target = target_name.lower()
+        generation = self.policy_generation
+        started = time.monotonic()
+        failures = []
+        try:
+            resolver = self._get_secret_resolver()
+        except SecretResolverError as error:
+            failures = [{"secret": secret_id, "error": str(error)} for secret_id in secret_ids]
+            self._log_secret_prefetch(generation, secret_ids, failures, started, [])
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_secret_executor()
+
+        def timed_resolve(secret_id):
+            resolve_started = time.monotonic()
+            resolver.resolve(secret_id)
+            return time.monotonic() - resolve_started
+
+        futures = {
+            loop.run_in_executor(executor, timed_resolve, secret_id): secret_id
+            for secret_id in secret_ids
+        }
+        try:
+            _, not_done = await asyncio.wait(futures, timeout=self.secret_resolve_timeout)
+        except asyncio.CancelledError:
+            # Superseded by a newer policy's prefetch; drop these results.
+            for future in futures:
+                future.cancel()
+            raise
+        durations = []
+        for future, secret_id in futures.items():
+            if future in not_done:
+                future.cancel()
+                failures.append({
+                    "secret": secret_id,
+                    "error": f"secret resolution timed out after {self.secret_resolve_timeout:g}s",
+                })
+                continue
+            try:
+                durations.append(future.result())
+            except Exception as error:
+                failures.append({"secret": secret_id, "error": str(error)})
+        self._log_secret_prefetch(generation, secret_ids, failures, started, durations)
+
+    def _log_secret_prefetch(self, generation, secret_ids, failures, started, durations):
+        entry = {
+            "ts": self.logger.timestamp(),
+            "type": "secret_prefetch",
+            "policy_generation": generation,
+            "secrets": len(secret_ids),
+            "resolved": len(secret_ids) - len(failures),
+            "failed": len(failures),
+            "duration_ms": round((time.monotonic() - started) * 1000, 3),
+            "slowest_ms": round(max(durations, default=0.0) * 1000, 3),
+        }
+        if failures:
+            entry["failures"] = failures
+        self.logger.event(entry, always=True)
+
+    def _log_secret_rotated(self, secret_id):
+        # Called from the watcher thread. Only the secret ID is logged.
+        self.logger.event(
+            {
+                "ts": self.logger.timestamp(),
+                "type": "secret_rotated",
+                "secret": secret_id,
+            },
+            always=True,
+        )
+
+    def _log_secret_watch_reset(self, invalidated):
+        # Called from the watcher thread when events may have been lost.
+        self.logger.event(
+            {
+                "ts": self.logger.timestamp(),
+                "type": "secret_watch_reset",
+                "invalidated": invalidated,
+            },
+            always=True,
+        )
+
+    def _find_existing_header_names(self, headers, request_transform):
+        """Map each injected header's lowercased name to the request's own spelling.
+
+        One pass over the request headers checks every injected name; the
+        first matching spelling wins.
+        """
+        target_names = request_transform.target_names
+        found = {}
         try:
             keys = headers.keys()
         except AttributeError:
-            keys = []
+            # Not a mapping; fall back to exact-name membership tests.
+            for header in request_transform.headers:
+                try:
+                    if header.name in headers:
+                        found.setdefault(header.lower_name, header.name)
+                except TypeError:
+                    pass
+            return found
         for existing_name in keys:
-            if str(existing_name).lower() == target:
-                return existing_name
-
-        try:
-            if target_name in headers:
-                return target_name
-        except TypeError:
-            pass
-        return None
+            lower_name = str(existing_name).lower()
+            if lower_name in target_names and lower_name not in found:
+                found[lower_name] = existing_name
+        return found
 
     def _set_request_header(self, headers, name, value, existing_name=None):
         if existing_name is not None and str(existing_name).lower() == name.lower():
@@ -443,22 +1478,16 @@ class PolicyEnforcer:
             entry["warnings"] = warnings
         return entry
 
-    def _apply_request_transform(self, flow, decision):
-        rule_transform = decision.rule_transform
-        request_transform = (
-            rule_transform.request if rule_transform is not None else None
-        )
-        if request_transform is None:
-            return None
-
+    def _check_existing_headers(self, flow, decision, request_transform):
         headers = getattr(flow.request, "headers", None)
         if headers is None:
             headers = {}
             flow.request.headers = headers
 
+        found = self._find_existing_header_names(headers, request_transform)
         existing_headers = []
         for header in request_transform.headers:
-            existing_name = self._find_existing_header_name(headers, header.name)
+            existing_name = found.get(header.lower_name)
             if (
                 existing_name is not None
                 and request_transform.on_existing_header == "fail"
@@ -468,27 +1497,51 @@ class PolicyEnforcer:
                     detail="existing_header_present",
                     header=header.name,
                     secret=header.secret,
-                )
+                ), None
             existing_headers.append(existing_name)
+        return None, existing_headers
 
-        try:
-            resolver = self._get_secret_resolver()
-        except SecretResolverError as error:
-            first_header = request_transform.headers[0]
-            return self._injection_failure_decision(
-                decision,
-                detail="secret_resolver_unavailable",
-                header=first_header.name,
-                secret=first_header.secret,
-                error=str(error),
+    def _cached_resolutions(self, resolver, request_transform):
+        peek = getattr(resolver, "peek", None)
+        if peek is None:
+            return None
+        resolutions = []
+        for header in request_transform.headers:
+            resolution = peek(header.secret)
+            if resolution is None:
+                return None
+            resolutions.append(resolution)
+        return resolutions
+
+    def _get_secret_executor(self):
+        if self._secret_executor is None:
+            self._secret_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=SECRET_RESOLVE_WORKERS,
+                thread_name_prefix="agentbox-secret",
             )
+        return self._secret_executor
 
-        staged_headers = []
-        injected = []
-        warnings = []
-        for header, existing_name in zip(request_transform.headers, existing_headers):
+    async def _resolve_secrets(self, decision, request_transform, resolver):
+        loop = asyncio.get_running_loop()
+        resolutions = []
+        for header in request_transform.headers:
             try:
-                resolution = resolver.resolve(header.secret)
+                resolution = await asyncio.wait_for(
+                    loop.run_in_executor(
+                        self._get_secret_executor(),
+                        resolver.resolve,
+                        header.secret,
+                    ),
+                    timeout=self.secret_resolve_timeout,
+                )
+            except asyncio.TimeoutError:
+                return self._injection_failure_decision(
+                    decision,
+                    detail="secret_resolution_timeout",
+                    header=header.name,
+                    secret=header.secret,
+                    error=f"secret resolution timed out after {self.secret_resolve_timeout:g}s",
+                ), None
             except SecretResolverError as error:
                 return self._injection_failure_decision(
                     decision,
@@ -496,13 +1549,18 @@ class PolicyEnforcer:
                     header=header.name,
                     secret=header.secret,
                     error=str(error),
-                )
+                ), None
+            resolutions.append(resolution)
+        return None, resolutions
 
+    def _apply_request_transform(self, flow, decision, request_transform, existing_headers, resolutions):
+        headers = flow.request.headers
+        staged_headers = []
+        for header, existing_name, resolution in zip(
+            request_transform.headers, existing_headers, resolutions
+        ):
             try:
-                rendered_value = render_header_value(
-                    resolution.value,
-                    self._header_transform_config(header),
-                )
+                rendered_value = render_compiled_header_value(resolution.value, header.render_key)
             except SecretResolverError as error:
                 return self._injection_failure_decision(
                     decision,
@@ -513,22 +1571,29 @@ class PolicyEnforcer:
                 )
 
             staged_headers.append((header.name, rendered_value, existing_name))
-            injected.append({
-                "name": header.name,
-                "secret": header.secret,
-                "transform": header.transform_type,
-            })
-            for warning in resolution.warnings:
-                warnings.append({
-                    "code": warning.code,
-                    "path": warning.path,
-                    "secret": header.secret,
-                })
 
         for name, rendered_value, existing_name in staged_headers:
             self._set_request_header(headers, name, rendered_value, existing_name)
 
-        self.logger.event(self._header_injection_event(decision, injected, warnings))
+        # Log fields are only gathered when the log level keeps the event.
+        if self.logger.enabled():
+            injected = []
+            warnings = []
+            for header, resolution in zip(request_transform.headers, resolutions):
+                # A fresh dict per event: the background writer serializes
+                # log entries after this hook returns.
+                injected.append({
+                    "name": header.name,
+                    "secret": header.secret,
+                    "transform": header.transform_type,
+                })
+                for warning in resolution.warnings:
+                    warnings.append({
+                        "code": warning.code,
+                        "path": warning.path,
+                        "secret": header.secret,
+                    })
+            self.logger.event(self._header_injection_event(decision, injected, warnings))
         return None
 
     def http_connect(self, flow):
@@ -536,9 +1601,9 @@ class PolicyEnforcer:
         if self.mode != "enforce":
             return
 
-        decision = self.matcher.evaluate_connect(flow.request.host)
+        decision = self._evaluate_connect(flow.request.host)
         if decision.is_blocked():
-            self.logger.event(self._decision_log_entry(decision))
+            self._log_blocked_decision(decision)
             self._store_decision(flow, decision)
             self._set_block_response(flow)
             return
@@ -546,14 +1611,19 @@ class PolicyEnforcer:
         self._clear_stored_decision(flow)
 
     def _handle_request_decision(self, flow):
+        """Decide the request and apply its header transform.
+
+        Returns None when the flow was handled inline, or a coroutine that
+        finishes the flow once uncached secrets have been resolved.
+        """
         if self.mode != "enforce":
-            return
+            return None
 
         existing_decision = self._get_stored_decision(flow)
         if existing_decision is not None:
-            return
+            return None
 
-        decision = self.matcher.evaluate_request(
+        decision = self._evaluate_request(
             host=flow.request.host,
             scheme=flow.request.scheme,
             method=flow.request.method,
@@ -561,27 +1631,88 @@ class PolicyEnforcer:
         )
 
         if decision.is_blocked():
-            self.logger.event(self._decision_log_entry(decision))
+            self._log_blocked_decision(decision)
             self._store_decision(flow, decision)
             self._set_block_response(flow)
+            return None
+
+        rule_transform = decision.rule_transform
+        request_transform = (
+            rule_transform.request if rule_transform is not None else None
+        )
+        if request_transform is None:
+            self._store_decision(flow, decision)
+            return None
+
+        failure, existing_headers = self._check_existing_headers(
+            flow, decision, request_transform
+        )
+        if failure is not None:
+            self._block_injection_failure(flow, failure)
+            return None
+
+        try:
+            resolver = self._get_secret_resolver()
+        except SecretResolverError as error:
+            first_header = request_transform.headers[0]
+            self._block_injection_failure(
+                flow,
+                self._injection_failure_decision(
+                    decision,
+                    detail="secret_resolver_unavailable",
+                    header=first_header.name,
+                    secret=first_header.secret,
+                    error=str(error),
+                ),
+            )
+            return None
+
+        resolutions = self._cached_resolutions(resolver, request_transform)
+        if resolutions is not None:
+            self._finish_request_transform(
+                flow, decision, request_transform, existing_headers, resolutions
+            )
+            return None
+        return self._resolve_and_finish_request_transform(
+            flow, decision, request_transform, existing_headers, resolver
+        )
+
+    async def _resolve_and_finish_request_transform(
+        self, flow, decision, request_transform, existing_headers, resolver
+    ):
+        failure, resolutions = await self._resolve_secrets(
+            decision, request_transform, resolver
+        )
+        if failure is not None:
+            self._block_injection_failure(flow, failure)
             return
+        self._finish_request_transform(
+            flow, decision, request_transform, existing_headers, resolutions
+        )
 
-        injection_failure = self._apply_request_transform(flow, decision)
+    def _finish_request_transform(
+        self, flow, decision, request_transform, existing_headers, resolutions
+    ):
+        injection_failure = self._apply_request_transform(
+            flow, decision, request_transform, existing_headers, resolutions
+        )
         if injection_failure is not None:
-            self.logger.event(self._decision_log_entry(injection_failure))
-            self._store_decision(flow, injection_failure)
-            self._set_block_response(flow)
+            self._block_injection_failure(flow, injection_failure)
             return
-
         self._store_decision(flow, decision)
 
+    def _block_injection_failure(self, flow, injection_failure):
+        self.logger.event(self._decision_log_entry(injection_failure), critical=True)
+        self._store_decision(flow, injection_failure)
+        self._set_block_response(flow)
+
     def requestheaders(self, flow):
         """Handle HTTP and decrypted HTTPS requests before any body streams upstream."""
-        self._handle_request_decision(flow)
+        return self._handle_request_decision(flow)
 
     def request(self, flow):
         """Handle HTTP and decrypted HTTPS requests."""
-        self._handle_request_decision(flow)
+        return self._handle_request_decision(flow)
 
     def responseheaders(self, flow):
         """Stream response bodies without enabling mitmproxy request-body streaming."""
@@ -590,6 +1721,8 @@ class PolicyEnforcer:
 
     def response(self, flow):
         """Log completed requests with full details."""
+        if not self.logger.enabled():
+            return
         if self.mode != "enforce":
             self.logger.event({
                 "ts": self.logger.timestamp(),
@@ -625,6 +1758,8 @@ class PolicyEnforcer:
 
     def error(self, flow):
         """Log errors."""
+        if not self.logger.enabled():
+            return
         entry = {
             "ts": self.logger.timestamp(),
             "host": flow.request.host if flow.request else "unknown",
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import mmap
 import os
+import re
+import struct
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from urllib.parse import unquote_plus, urlsplit
 
 import yaml
@@ -27,17 +32,45 @@ DEFAULT_RULE_SCHEMES = ("http", "https")
 _UNRESERVED_URI_CHARS = frozenset(
     "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
 )
+_PERCENT_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+
+# Compiled policy artifact: a fixed header followed by a JSON payload of
+# interned strings, a rule table and the host records (with the digest of the
+# domain entry each came from) in precedence order.
+# The header carries the payload SHA-256 and the SHA-256 of the rendered YAML
+# the artifact was compiled from, so a corrupt or stale artifact is detected
+# before any of it is trusted.
+POLICY_ARTIFACT_MAGIC = b"AGBXPOL\n"
+# Bump the version with every payload format change so a stale artifact fails
+# the version check instead of being misread:
+#   1  host entries are [host, rule IDs]
+#   2  host entries gain the SHA-256 digest of their domain entry
+#   3  domain entry digests are BLAKE2b-128
+POLICY_ARTIFACT_VERSION = 3
+_POLICY_ARTIFACT_HEADER = struct.Struct("<8sIQ32s32s")
+
+
+def _normalize_percent_escape(match):
+    encoded = match.group(1)
+    character = chr(int(encoded, 16))
+    if character in _UNRESERVED_URI_CHARS:
+        return character
+    return "%" + encoded.upper()
 
 
 class PolicyError(Exception):
     """Raised when rendered proxy policy cannot be loaded safely."""
 
 
+class PolicyArtifactError(PolicyError):
+    """Raised when a compiled policy artifact is missing, corrupt or stale."""
+
+
 def _fail_policy(message):
     raise PolicyError(message)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PolicyDecision:
     phase: str
     action: str
@@ -53,10 +86,43 @@ class PolicyDecision:
     header: str | None = None
     secret: str | None = None
     error: str | None = None
+    _log_fields: dict | None = field(default=None, init=False, repr=False, compare=False)
 
     def is_blocked(self):
         return self.action == "blocked"
 
+    def log_fields(self):
+        """Return the decision's non-empty log fields, built on first use.
+
+        Decisions are immutable and shared through the decision cache, so the
+        fields are computed once per decision rather than once per log line.
+        Callers copy them into a new entry and must not mutate the result.
+        """
+        fields = self._log_fields
+        if fields is None:
+            fields = {
+                "phase": self.phase,
+                "action": self.action,
+                "reason": self.reason,
+                "host": self.host,
+                "scheme": self.scheme,
+            }
+            for name in (
+                "matched_host",
+                "method",
+                "path",
+                "matched_rule_index",
+                "detail",
+                "header",
+                "secret",
+                "error",
+            ):
+                value = getattr(self, name)
+                if value is not None:
+                    fields[name] = value
+            object.__setattr__(self, "_log_fields", fields)
+        return fields
+
     def to_metadata(self):
         return {
             "phase": self.phase,
@@ -93,26 +159,70 @@ class PolicyDecision:
         )
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class HeaderInjection:
     name: str
     secret: str
     transform_type: str
     username: str | None = None
+    # Derived once at policy load. `render_key` identifies the validated
+    # transform for `render_compiled_header_value`, which caches the rendered
+    # value per secret version under it.
+    lower_name: str = field(init=False, repr=False, compare=False)
+    render_key: tuple[str, str | None] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        username = self.username if self.transform_type == "basic" else None
+        object.__setattr__(self, "lower_name", self.name.lower())
+        object.__setattr__(self, "render_key", (self.transform_type, username))
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RequestTransform:
+    """A rule's header injections, with what the request hooks need precomputed.
+
+    `target_names` holds the lowercased injected header names, so existing
+    request headers are checked against all of them in one pass.
+    """
+
     headers: tuple[HeaderInjection, ...]
     on_existing_header: str
+    target_names: frozenset[str] = field(init=False, repr=False, compare=False)
 
+    def __post_init__(self):
+        object.__setattr__(
+            self,
+            "target_names",
+            frozenset(header.lower_name for header in self.headers),
+        )
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class RuleTransform:
     request: RequestTransform | None = None
 
 
-@dataclass(frozen=True)
+class RequestQuery:
+    """Raw request query string, normalized on first use.
+
+    Only rules with a `query_exact` matcher read the normalized form, so
+    requests that match on path alone never pay for splitting and decoding
+    long signed-URL or pagination query strings.
+    """
+
+    __slots__ = ("raw", "_normalized")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._normalized = None
+
+    def normalized(self):
+        if self._normalized is None:
+            self._normalized = PolicyMatcher._normalize_query(self.raw)
+        return self._normalized
+
+
+@dataclass(frozen=True, slots=True)
 class RuntimeRule:
     schemes: tuple[str, ...]
     methods: tuple[str, ...] | None = None
@@ -137,7 +247,7 @@ class RuntimeRule:
     def allows_connect_fast_path(self, scheme):
         return self.matches_scheme(scheme) and not self.needs_request_inspection()
 
-    def matches_request(self, scheme, method, path, normalized_query):
+    def matches_request(self, scheme, method, path, query):
         if not self.matches_scheme(scheme):
             return False
 
@@ -157,17 +267,203 @@ class RuntimeRule:
             return False
 
         # query_exact is strict: the full normalized parameter set must match.
-        if self.query_exact is not None and normalized_query != self.query_exact:
+        if self.query_exact is not None and query.normalized() != self.query_exact:
             return False
 
         return True
 
 
-@dataclass(frozen=True)
+class _PrefixTrieNode:
+    """Radix trie node; `children` maps an edge's first character to `(label, node)`."""
+
+    __slots__ = ("children", "rule_indices")
+
+    def __init__(self):
+        self.children = {}
+        self.rule_indices = []
+
+    def insert(self, prefix, rule_index):
+        node = self
+        position = 0
+        while position < len(prefix):
+            edge = node.children.get(prefix[position])
+            if edge is None:
+                child = _PrefixTrieNode()
+                node.children[prefix[position]] = (prefix[position:], child)
+                node = child
+                break
+
+            label, child = edge
+            common = 0
+            limit = min(len(label), len(prefix) - position)
+            while common < limit and label[common] == prefix[position + common]:
+                common += 1
+
+            if common < len(label):
+                split = _PrefixTrieNode()
+                split.children[label[common]] = (label[common:], child)
+                node.children[prefix[position]] = (label[:common], split)
+                child = split
+
+            node = child
+            position += common
+        node.rule_indices.append(rule_index)
+
+    def collect(self, path, candidates):
+        node = self
+        position = 0
+        candidates.extend(node.rule_indices)
+        while position < len(path):
+            edge = node.children.get(path[position])
+            if edge is None:
+                return
+            label, node = edge
+            if not path.startswith(label, position):
+                return
+            position += len(label)
+            candidates.extend(node.rule_indices)
+
+
+class _PathIndex:
+    """Rule indices for one scheme/method bucket, keyed by path matcher.
+
+    Every list holds rule indices in ascending order. Case-insensitive rules
+    store lowercased matchers (see `_compile_rule`), so they live in separate
+    `*_folded` tables that are probed with the lowercased request path.
+    """
+
+    __slots__ = (
+        "any_path",
+        "exact",
+        "exact_folded",
+        "prefixes",
+        "prefixes_folded",
+    )
+
+    def __init__(self):
+        self.any_path = []
+        self.exact = {}
+        self.exact_folded = {}
+        self.prefixes = None
+        self.prefixes_folded = None
+
+    def add(self, rule_index, rule):
+        if rule.path_exact is not None:
+            table = self.exact_folded if rule.path_case_insensitive else self.exact
+            table.setdefault(rule.path_exact, []).append(rule_index)
+            return
+
+        if rule.path_prefix is not None:
+            if rule.path_case_insensitive:
+                if self.prefixes_folded is None:
+                    self.prefixes_folded = _PrefixTrieNode()
+                node = self.prefixes_folded
+            else:
+                if self.prefixes is None:
+                    self.prefixes = _PrefixTrieNode()
+                node = self.prefixes
+            node.insert(rule.path_prefix, rule_index)
+            return
+
+        self.any_path.append(rule_index)
+
+    def candidates(self, path):
+        candidates = list(self.any_path)
+        matches = self.exact.get(path)
+        if matches:
+            candidates.extend(matches)
+        if self.prefixes is not None:
+            self.prefixes.collect(path, candidates)
+
+        if self.exact_folded or self.prefixes_folded is not None:
+            folded_path = path.lower()
+            matches = self.exact_folded.get(folded_path)
+            if matches:
+                candidates.extend(matches)
+            if self.prefixes_folded is not None:
+                self.prefixes_folded.collect(folded_path, candidates)
+
+        candidates.sort()
+        return candidates
+
+
+class RuleIndex:
+    """Per-host rule lookup that returns the lowest-index matching rule.
+
+    Rules are bucketed by scheme, then by method. A rule without a method
+    constraint is added to every method bucket of its schemes plus a default
+    bucket used for methods no rule names. Inside a bucket the path tables
+    narrow the candidates to rules whose path matcher already matched, so only
+    the query matcher is left to check, in rule order.
+    """
+
+    __slots__ = ("rules", "_schemes")
+
+    def __init__(self, rules):
+        self.rules = rules
+        self._schemes = {}
+
+        for scheme in DEFAULT_RULE_SCHEMES:
+            scheme_rules = [
+                (rule_index, rule)
+                for rule_index, rule in enumerate(rules)
+                if scheme in rule.schemes
+            ]
+            if not scheme_rules:
+                continue
+
+            methods = sorted({
+                method
+                for _, rule in scheme_rules
+                if rule.methods is not None
+                for method in rule.methods
+            })
+            by_method = {method: _PathIndex() for method in methods}
+            default = _PathIndex()
+            for rule_index, rule in scheme_rules:
+                if rule.methods is None:
+                    default.add(rule_index, rule)
+                    for path_index in by_method.values():
+                        path_index.add(rule_index, rule)
+                    continue
+                for method in rule.methods:
+                    by_method[method].add(rule_index, rule)
+            self._schemes[scheme] = (by_method, default)
+
+    def find(self, scheme, method, path, query):
+        """Return `(rule_index, rule)` for the first matching rule, or None.
+
+        `scheme` must be lowercase and `method` uppercase, as normalized by
+        `PolicyMatcher.evaluate_request`. `query` is a `RequestQuery`; it is
+        only normalized if a candidate rule has a query matcher.
+        """
+        bucket = self._schemes.get(scheme)
+        if bucket is None:
+            return None
+
+        by_method, default = bucket
+        path_index = by_method.get(method, default)
+        for rule_index in path_index.candidates(path):
+            rule = self.rules[rule_index]
+            if rule.query_exact is None or rule.query_exact == query.normalized():
+                return rule_index, rule
+        return None
+
+
+@dataclass(frozen=True, slots=True)
 class HostRecord:
     host: str
     wildcard_suffix: str | None
     rules: tuple[RuntimeRule, ...]
+    rule_index: RuleIndex = field(init=False, repr=False, compare=False)
+    connect_decision: PolicyDecision = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "rule_index", RuleIndex(self.rules))
+        # Preallocated CONNECT outcome for the common case where the client
+        # names the host exactly as the policy does. Decisions are immutable,
+        # so every such flow can share this one object.
+        object.__setattr__(self, "connect_decision", _connect_decision(self, self.host))
 
     def matches_host(self, host):
         normalized_host = host.lower()
@@ -192,14 +488,257 @@ class HostRecord:
         return has_fast_path_rule and not has_inspected_rule
 
 
+def _connect_decision(record, host):
+    if record.allows_connect_fast_path("https"):
+        return PolicyDecision(
+            phase="connect",
+            action="allowed",
+            reason="connect_fast_path",
+            host=host,
+            scheme="https",
+            matched_host=record.host,
+        )
+
+    if record.can_match_scheme("https"):
+        return PolicyDecision(
+            phase="connect",
+            action="allowed",
+            reason="connect_inspect_request",
+            host=host,
+            scheme="https",
+            matched_host=record.host,
+        )
+
+    return PolicyDecision(
+        phase="connect",
+        action="blocked",
+        reason="https_not_permitted",
+        host=host,
+        scheme="https",
+        matched_host=record.host,
+    )
+
+
+class _SuffixTrieNode:
+    __slots__ = ("children", "record")
+
+    def __init__(self):
+        self.children = {}
+        self.record = None
+
+
+class HostIndex:
+    """Host lookup over compiled host records.
+
+    Exact hosts are served from a dict. Wildcard records are stored in a trie
+    keyed by reversed DNS labels, so `*.api.github.com` lives under
+    `com -> github -> api`. Every wildcard that can match a host sits on the
+    path walked for that host, and a deeper node is always a longer suffix, so
+    the deepest record seen wins. That is the same precedence
+    `PolicyMatcher._host_sort_key` encodes: exact first, then longest wildcard
+    suffix, then original policy order.
+    """
+
+    def __init__(self, host_records):
+        self._exact = {}
+        self._wildcards = _SuffixTrieNode()
+
+        for record in host_records:
+            if record.wildcard_suffix is None:
+                self._exact.setdefault(record.host, record)
+                continue
+
+            node = self._wildcards
+            for label in reversed(record.wildcard_suffix.split(".")):
+                child = node.children.get(label)
+                if child is None:
+                    child = _SuffixTrieNode()
+                    node.children[label] = child
+                node = child
+            if node.record is None:
+                node.record = record
+
+    def find(self, host):
+        normalized_host = host.lower()
+        record = self._exact.get(normalized_host)
+        if record is not None:
+            return record
+
+        match = None
+        node = self._wildcards
+        for label in reversed(normalized_host.split(".")):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if node.record is not None:
+                match = node.record
+        return match
+
+
+class _ArtifactStrings:
+    """String table for the compiled policy artifact; each value is stored once."""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def ref(self, value):
+        if value is None:
+            return None
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self._ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+
+def _encode_artifact_rule(rule, strings):
+    query = None
+    if rule.query_exact is not None:
+        query = [
+            [strings.ref(name), [strings.ref(value) for value in values]]
+            for name, values in rule.query_exact
+        ]
+    transform = None
+    if rule.transform is not None and rule.transform.request is not None:
+        request = rule.transform.request
+        transform = [
+            strings.ref(request.on_existing_header),
+            [
+                [
+                    strings.ref(header.name),
+                    strings.ref(header.secret),
+                    strings.ref(header.transform_type),
+                    strings.ref(header.username),
+                ]
+                for header in request.headers
+            ],
+        ]
+    return [
+        [strings.ref(scheme) for scheme in rule.schemes],
+        None if rule.methods is None else [strings.ref(method) for method in rule.methods],
+        strings.ref(rule.path_exact),
+        strings.ref(rule.path_prefix),
+        rule.path_case_insensitive,
+        query,
+        transform,
+    ]
+
+
+def _decode_artifact_rule(entry, strings):
+    schemes, methods, path_exact, path_prefix, path_case_insensitive, query, transform = entry
+    query_exact = None
+    if query is not None:
+        query_exact = tuple(
+            (strings[name], tuple(strings[value] for value in values))
+            for name, values in query
+        )
+    rule_transform = None
+    if transform is not None:
+        on_existing_header, headers = transform
+        rule_transform = RuleTransform(
+            request=RequestTransform(
+                headers=tuple(
+                    HeaderInjection(
+                        name=strings[name],
+                        secret=strings[secret],
+                        transform_type=strings[transform_type],
+                        username=None if username is None else strings[username],
+                    )
+                    for name, secret, transform_type, username in headers
+                ),
+                on_existing_header=strings[on_existing_header],
+            ),
+        )
+    return RuntimeRule(
+        schemes=tuple(strings[scheme] for scheme in schemes),
+        methods=None if methods is None else tuple(strings[method] for method in methods),
+        path_exact=None if path_exact is None else strings[path_exact],
+        path_prefix=None if path_prefix is None else strings[path_prefix],
+        path_case_insensitive=bool(path_case_insensitive),
+        query_exact=query_exact,
+        transform=rule_transform,
+    )
+
+
+def _read_artifact_payload(artifact_path, source_digest):
+    try:
+        handle = open(artifact_path, "rb")
+    except FileNotFoundError:
+        raise PolicyArtifactError(f"no compiled policy artifact at {artifact_path}") from None
+    except OSError as error:
+        raise PolicyArtifactError(f"cannot open {artifact_path}: {error}") from None
+
+    with handle:
+        try:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files cannot be mapped, and some filesystems do not
+            # support mmap; the header checks below reject or accept the
+            # bytes the same way either way.
+            buffer = handle.read()
+        try:
+            return _decode_artifact_buffer(buffer, artifact_path, source_digest)
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+
+
+def _decode_artifact_buffer(buffer, artifact_path, source_digest):
+    if len(buffer) < _POLICY_ARTIFACT_HEADER.size:
+        raise PolicyArtifactError(f"{artifact_path} is truncated")
+    magic, version, payload_size, payload_digest, artifact_source_digest = (
+        _POLICY_ARTIFACT_HEADER.unpack_from(buffer, 0)
+    )
+    if magic != POLICY_ARTIFACT_MAGIC:
+        raise PolicyArtifactError(f"{artifact_path} is not a compiled policy artifact")
+    if version != POLICY_ARTIFACT_VERSION:
+        raise PolicyArtifactError(
+            f"{artifact_path} has artifact version {version}, expected {POLICY_ARTIFACT_VERSION}"
+        )
+    if source_digest is not None and artifact_source_digest != source_digest:
+        raise PolicyArtifactError(f"{artifact_path} was compiled from a different policy")
+    start = _POLICY_ARTIFACT_HEADER.size
+    if len(buffer) - start != payload_size:
+        raise PolicyArtifactError(f"{artifact_path} is truncated")
+    with memoryview(buffer) as view:
+        payload = view[start:]
+        try:
+            if hashlib.sha256(payload).digest() != payload_digest:
+                raise PolicyArtifactError(f"{artifact_path} failed its checksum")
+            return json.loads(payload.tobytes())
+        finally:
+            payload.release()
+
+
 class PolicyMatcher:
-    def __init__(self, host_records, source_description="rendered policy"):
+    def __init__(self, host_records, source_description="rendered policy", record_digests=None):
         self.host_records = tuple(host_records)
         self.source_description = source_description
+        # Content digest of the rendered domain entry each record was compiled
+        # from, parallel to `host_records` (None where unknown). A reload
+        # reuses any record whose entry digest is unchanged.
+        if record_digests is None:
+            record_digests = (None,) * len(self.host_records)
+        self.record_digests = tuple(record_digests)
         self.exact_host_count = sum(
             1 for record in self.host_records if record.wildcard_suffix is None
         )
         self.wildcard_host_count = len(self.host_records) - self.exact_host_count
+        self._host_index = HostIndex(self.host_records)
+
+    def secret_ids(self):
+        """Return every secret ID referenced by a header transform, in policy order."""
+        seen = {}
+        for record in self.host_records:
+            for rule in record.rules:
+                request_transform = rule.transform.request if rule.transform is not None else None
+                if request_transform is None:
+                    continue
+                for header in request_transform.headers:
+                    seen.setdefault(header.secret, None)
+        return tuple(seen)
 
     @classmethod
     def from_policy_path(cls, path):
@@ -212,7 +751,13 @@ class PolicyMatcher:
         return cls.from_policy_data(policy, path=path)
 
     @classmethod
-    def from_policy_data(cls, policy, path=None):
+    def from_policy_data(cls, policy, path=None, previous=None):
+        """Compile rendered policy data into a matcher.
+
+        When `previous` is given, host records whose rendered domain entry is
+        byte-for-byte unchanged are taken from it instead of being recompiled,
+        together with their rule indexes and preallocated CONNECT decisions.
+        """
         policy_context = f"Policy at {path}" if path else "Policy"
         if not isinstance(policy, dict):
             raise PolicyError(f"{policy_context} must be a YAML mapping")
@@ -223,85 +768,220 @@ class PolicyMatcher:
                 f"{policy_context} field 'domains' must be a YAML list"
             )
 
+        reusable_records = previous._records_by_digest() if previous is not None else {}
+        compiled = cls._compile_host_records(domains, reusable_records)
         source_description = path or "rendered policy"
         return cls(
-            cls._compile_host_records(domains),
+            [record for record, _ in compiled],
             source_description=source_description,
+            record_digests=[digest for _, digest in compiled],
         )
 
-    @staticmethod
-    def _normalize_uri_component_for_match(value):
-        normalized = []
-        index = 0
-
-        while index < len(value):
-            if (
-                value[index] == "%"
-                and index + 2 < len(value)
-                and all(character in "0123456789ABCDEFabcdef" for character in value[index + 1 : index + 3])
-            ):
-                encoded = value[index + 1 : index + 3]
-                character = chr(int(encoded, 16))
-                if character in _UNRESERVED_URI_CHARS:
-                    normalized.append(character)
-                else:
-                    normalized.append("%" + encoded.upper())
-                index += 3
-                continue
+    def _records_by_digest(self):
+        return {
+            digest: record
+            for record, digest in zip(self.host_records, self.record_digests)
+            if digest is not None
+        }
+
+    def host_record_changes(self, previous):
+        """Count host changes relative to `previous`, keyed by host pattern.
+
+        `changed` hosts exist in both generations with different content;
+        `reused` counts host records carried over from `previous` unchanged.
+        """
+        previous_digests = {}
+        for record, digest in zip(previous.host_records, previous.record_digests):
+            previous_digests.setdefault(record.host, digest)
+        current_digests = {}
+        for record, digest in zip(self.host_records, self.record_digests):
+            current_digests.setdefault(record.host, digest)
+
+        changed = sum(
+            1
+            for host, digest in current_digests.items()
+            if host in previous_digests and (digest is None or digest != previous_digests[host])
+        )
+        previous_records = {id(record) for record in previous.host_records}
+        return {
+            "added": len(current_digests.keys() - previous_digests.keys()),
+            "removed": len(previous_digests.keys() - current_digests.keys()),
+            "changed": changed,
+            "reused": sum(1 for record in self.host_records if id(record) in previous_records),
+        }
+
+    @classmethod
+    def from_artifact_path(cls, artifact_path, policy_path):
+        """Load a matcher from a compiled artifact of the YAML at `policy_path`.
+
+        The artifact is only used when its header, checksum and source digest
+        all match; anything else raises `PolicyArtifactError` so the caller
+        can fall back to `from_policy_path`.
+        """
+        try:
+            with open(policy_path, "rb") as handle:
+                source_digest = hashlib.sha256(handle.read()).digest()
+        except OSError as error:
+            raise PolicyArtifactError(f"cannot read {policy_path}: {error}") from None
+
+        payload = _read_artifact_payload(artifact_path, source_digest)
+        return cls._from_artifact_payload(
+            payload,
+            artifact_path,
+            f"{artifact_path} (compiled from {policy_path})",
+        )
+
+    @classmethod
+    def from_artifact_bytes(cls, data, source_description="rendered policy", previous=None):
+        """Load a matcher from artifact bytes produced in another process.
+
+        The source digest is not checked. Host records whose digest matches a
+        record in `previous` are reused instead of being rebuilt, so only
+        changed hosts cost anything to decode.
+        """
+        payload = _decode_artifact_buffer(data, source_description, None)
+        return cls._from_artifact_payload(payload, source_description, source_description, previous)
 
-            normalized.append(value[index])
-            index += 1
+    @classmethod
+    def _from_artifact_payload(cls, payload, label, source_description, previous=None):
+        reusable_records = previous._records_by_digest() if previous is not None else {}
+        try:
+            strings = payload["strings"]
+            rule_entries = payload["rules"]
+            rules = {}
+            host_records = []
+            record_digests = []
+            for host, rule_ids, digest in payload["hosts"]:
+                record = reusable_records.get(digest) if digest is not None else None
+                if record is None:
+                    for rule_id in rule_ids:
+                        if rule_id not in rules:
+                            rules[rule_id] = _decode_artifact_rule(rule_entries[rule_id], strings)
+                    record = HostRecord(
+                        host=strings[host],
+                        wildcard_suffix=strings[host][2:] if strings[host].startswith("*.") else None,
+                        rules=tuple(rules[rule_id] for rule_id in rule_ids),
+                    )
+                host_records.append(record)
+                record_digests.append(digest)
+        except (KeyError, IndexError, TypeError, ValueError) as error:
+            raise PolicyArtifactError(f"{label} is malformed: {error!r}") from None
+
+        return cls(
+            host_records,
+            source_description=source_description,
+            record_digests=record_digests,
+        )
+
+    def to_artifact(self, source_bytes):
+        """Serialize the compiled host records for `from_artifact_path`.
+
+        `source_bytes` is the rendered YAML exactly as written to disk; its
+        digest ties the artifact to that file. Identical rules are stored once
+        in the rule table and share one `RuntimeRule` when loaded.
+        """
+        strings = _ArtifactStrings()
+        rules = []
+        rule_ids = {}
+        hosts = []
+        for record, digest in zip(self.host_records, self.record_digests):
+            record_rule_ids = []
+            for rule in record.rules:
+                rule_id = rule_ids.get(rule)
+                if rule_id is None:
+                    rule_id = len(rules)
+                    rule_ids[rule] = rule_id
+                    rules.append(_encode_artifact_rule(rule, strings))
+                record_rule_ids.append(rule_id)
+            hosts.append([strings.ref(record.host), record_rule_ids, digest])
+
+        payload = json.dumps(
+            {"strings": strings.values, "rules": rules, "hosts": hosts},
+            separators=(",", ":"),
+        ).encode("utf-8")
+        header = _POLICY_ARTIFACT_HEADER.pack(
+            POLICY_ARTIFACT_MAGIC,
+            POLICY_ARTIFACT_VERSION,
+            len(payload),
+            hashlib.sha256(payload).digest(),
+            hashlib.sha256(source_bytes).digest(),
+        )
+        return header + payload
 
-        return "".join(normalized)
+    @staticmethod
+    def _normalize_uri_component_for_match(value):
+        # Decode percent-escaped unreserved characters and uppercase the hex
+        # digits of every other escape (RFC 3986 section 6.2.2). Most request
+        # paths carry no escapes at all and are returned as-is.
+        if "%" not in value:
+            return value
+        return _PERCENT_ESCAPE.sub(_normalize_percent_escape, value)
 
     @staticmethod
     def _normalize_query_string_for_match(value):
         return unquote_plus(value, encoding="utf-8", errors="replace")
 
     @staticmethod
-    def _compile_host_records(domains):
+    def _domain_digest(domain):
+        try:
+            encoded = json.dumps(domain, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            # Not plain rendered IR (e.g. a YAML date). Never reuse it; the
+            # compile below reports the problem.
+            return None
+        # 128 bits is ample to tell policy entries apart and keeps the
+        # per-host digests in compiled artifacts small.
+        return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _compile_host_records(domains, reusable_records=None):
+        """Return `(HostRecord, digest)` pairs in host precedence order."""
         compiled = []
 
         for index, domain in enumerate(domains):
-            context = f"Policy domains[{index}]"
-
-            if isinstance(domain, str):
-                host = PolicyMatcher._normalize_host_pattern(domain, context)
-                compiled.append(
-                    HostRecord(
-                        host=host,
-                        wildcard_suffix=host[2:] if host.startswith("*.") else None,
-                        rules=(RuntimeRule(schemes=DEFAULT_RULE_SCHEMES),),
-                    )
-                )
+            digest = PolicyMatcher._domain_digest(domain)
+            if reusable_records and digest in reusable_records:
+                compiled.append((reusable_records[digest], digest))
                 continue
 
-            if not isinstance(domain, dict):
-                raise PolicyError(
-                    f"{context} must be a string or mapping, "
-                    f"got {type(domain).__name__}: {domain!r}"
-                )
-
-            unknown_keys = sorted(set(domain) - {"host", "rules"})
-            if unknown_keys:
-                raise PolicyError(f"{context} contains unsupported keys: {unknown_keys}")
-
-            host = PolicyMatcher._normalize_host_pattern(domain.get("host"), f"{context}.host")
-            rules = PolicyMatcher._compile_rules(domain.get("rules"), context)
-            compiled.append(
-                HostRecord(
-                    host=host,
-                    wildcard_suffix=host[2:] if host.startswith("*.") else None,
-                    rules=rules,
-                )
-            )
+            compiled.append((PolicyMatcher._compile_host_record(domain, index), digest))
 
         indexed_records = list(enumerate(compiled))
         sorted_records = sorted(
             indexed_records,
-            key=lambda item: PolicyMatcher._host_sort_key(item[1].host, item[0]),
+            key=lambda item: PolicyMatcher._host_sort_key(item[1][0].host, item[0]),
+        )
+        return [item for _, item in sorted_records]
+
+    @staticmethod
+    def _compile_host_record(domain, index):
+        context = f"Policy domains[{index}]"
+
+        if isinstance(domain, str):
+            host = PolicyMatcher._normalize_host_pattern(domain, context)
+            return HostRecord(
+                host=host,
+                wildcard_suffix=host[2:] if host.startswith("*.") else None,
+                rules=(RuntimeRule(schemes=DEFAULT_RULE_SCHEMES),),
+            )
+
+        if not isinstance(domain, dict):
+            raise PolicyError(
+                f"{context} must be a string or mapping, "
+                f"got {type(domain).__name__}: {domain!r}"
+            )
+
+        unknown_keys = sorted(set(domain) - {"host", "rules"})
+        if unknown_keys:
+            raise PolicyError(f"{context} contains unsupported keys: {unknown_keys}")
+
+        host = PolicyMatcher._normalize_host_pattern(domain.get("host"), f"{context}.host")
+        rules = PolicyMatcher._compile_rules(domain.get("rules"), context)
+        return HostRecord(
+            host=host,
+            wildcard_suffix=host[2:] if host.startswith("*.") else None,
+            rules=rules,
         )
-        return [record for _, record in sorted_records]
 
     @staticmethod
     def _normalize_host_pattern(value, context):
@@ -528,8 +1208,12 @@ class PolicyMatcher:
         log_path = path
         if parsed.query:
             log_path = f"{path}?{parsed.query}"
+        return path, RequestQuery(parsed.query), log_path
+
+    @staticmethod
+    def _normalize_query(raw_query):
         query_map = {}
-        for pair in parsed.query.split("&"):
+        for pair in raw_query.split("&"):
             if not pair:
                 continue
             if "=" in pair:
@@ -539,20 +1223,16 @@ class PolicyMatcher:
             normalized_name = PolicyMatcher._normalize_query_string_for_match(name)
             normalized_value = PolicyMatcher._normalize_query_string_for_match(value)
             query_map.setdefault(normalized_name, []).append(normalized_value)
-        normalized_query = tuple(
+        return tuple(
             (name, tuple(sorted(values)))
             for name, values in sorted(query_map.items())
         )
-        return path, normalized_query, log_path
 
     def is_allowed(self, host):
         return self._find_host_record(host) is not None
 
     def _find_host_record(self, host):
-        for record in self.host_records:
-            if record.matches_host(host):
-                return record
-        return None
+        return self._host_index.find(host)
 
     def evaluate_connect(self, host):
         record = self._find_host_record(host)
@@ -564,40 +1244,14 @@ class PolicyMatcher:
                 host=host,
                 scheme="https",
             )
-
-        if record.allows_connect_fast_path("https"):
-            return PolicyDecision(
-                phase="connect",
-                action="allowed",
-                reason="connect_fast_path",
-                host=host,
-                scheme="https",
-                matched_host=record.host,
-            )
-
-        if record.can_match_scheme("https"):
-            return PolicyDecision(
-                phase="connect",
-                action="allowed",
-                reason="connect_inspect_request",
-                host=host,
-                scheme="https",
-                matched_host=record.host,
-            )
-
-        return PolicyDecision(
-            phase="connect",
-            action="blocked",
-            reason="https_not_permitted",
-            host=host,
-            scheme="https",
-            matched_host=record.host,
-        )
+        if host == record.host:
+            return record.connect_decision
+        return _connect_decision(record, host)
 
     def evaluate_request(self, host, scheme, method, request_target):
         normalized_scheme = scheme.lower()
         normalized_method = method.upper()
-        path, normalized_query, log_path = self._normalize_request_target(request_target)
+        path, query, log_path = self._normalize_request_target(request_target)
         record = self._find_host_record(host)
 
         if record is None:
@@ -611,25 +1265,26 @@ class PolicyMatcher:
                 path=log_path,
             )
 
-        for rule_index, rule in enumerate(record.rules):
-            if rule.matches_request(
-                normalized_scheme,
-                normalized_method,
-                path,
-                normalized_query,
-            ):
-                return PolicyDecision(
-                    phase="request",
-                    action="allowed",
-                    reason="request_rule_matched",
-                    host=host,
-                    scheme=normalized_scheme,
-                    matched_host=record.host,
-                    method=normalized_method,
-                    path=log_path,
-                    matched_rule_index=rule_index,
-                    rule_transform=rule.transform,
-                )
+        match = record.rule_index.find(
+            normalized_scheme,
+            normalized_method,
+            path,
+            query,
+        )
+        if match is not None:
+            rule_index, rule = match
+            return PolicyDecision(
+                phase="request",
+                action="allowed",
+                reason="request_rule_matched",
+                host=host,
+                scheme=normalized_scheme,
+                matched_host=record.host,
+                method=normalized_method,
+                path=log_path,
+                matched_rule_index=rule_index,
+                rule_transform=rule.transform,
+            )
 
         reason = "scheme_not_permitted"
         if record.can_match_scheme(normalized_scheme):
@@ -0,0 +1,130 @@
+"""
+Render and compile the proxy policy, in-process or in a worker process.
+
+The enforcer's reload path calls `render-policy` as a library. Rendering and
+compiling a large policy is CPU-bound and holds the GIL, so with
+`PROXY_RELOAD_WORKER=process` the enforcer runs `render_compiled_policy` in a
+persistent single-worker process pool instead. The worker returns the compiled
+policy artifact bytes (see `PolicyMatcher.to_artifact`), and the enforcer only
+decodes the host records that changed and swaps the matcher.
+
+This module must stay importable without mitmproxy and without side effects:
+the worker process imports it by name.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import os
+import sys
+import time
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+
+ADDON_DIR = Path(__file__).resolve().parent
+if str(ADDON_DIR) not in sys.path:
+    sys.path.insert(0, str(ADDON_DIR))
+
+from policy_matcher import PolicyMatcher  # noqa: E402
+
+
+def load_render_policy_module(path):
+    original_sys_path = list(sys.path)
+    loader = SourceFileLoader("agent_sandbox_render_policy", str(path))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        loader.exec_module(module)
+    finally:
+        sys.path[:] = original_sys_path
+    return module
+
+
+class RenderPolicyModuleCache:
+    """The loaded `render-policy` module, re-executed only when the file changes.
+
+    Each reload stats the file. While its mtime, size and inode are unchanged
+    the cached module is returned as-is. When the stat changes, the file is
+    hashed and re-executed only if the content differs, so a `touch` or an
+    identical copy does not re-import it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.module = None
+        self._stat_key = None
+        self._digest = None
+
+    def get(self):
+        stat = os.stat(self.path)
+        stat_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if self.module is not None and stat_key == self._stat_key:
+            return self.module
+
+        digest = hashlib.sha256(self.path.read_bytes()).digest()
+        if self.module is None or digest != self._digest:
+            self.module = load_render_policy_module(self.path)
+            self._digest = digest
+        self._stat_key = stat_key
+        return self.module
+
+
+def render_matcher(module_cache, previous=None, renderer=None, source_description="reloaded policy"):
+    """Render the policy and compile it, reusing unchanged records from `previous`.
+
+    Also writes the credential shim and public allowlist exports, as
+    `render-policy` does on the command line. Returns the matcher and
+    per-stage timings.
+    """
+    started = time.monotonic()
+    module = None
+    if renderer is not None:
+        rendered_policy = renderer()
+    else:
+        module = module_cache.get()
+        rendered_policy = module.render_policy()
+    rendered = time.monotonic()
+    # Hosts whose rendered entry is unchanged keep their compiled record,
+    # so a one-domain edit only compiles that domain.
+    matcher = PolicyMatcher.from_policy_data(
+        rendered_policy,
+        path=source_description,
+        previous=previous,
+    )
+    compiled = time.monotonic()
+    # Each writer leaves an identical file untouched and reports whether it
+    # wrote, so the reload event can say which agent-visible outputs changed.
+    changed_outputs = []
+    if module is not None and hasattr(module, "write_credential_shim_init"):
+        if module.write_credential_shim_init(rendered_policy):
+            changed_outputs.append("credential_shim")
+    if module is not None and hasattr(module, "write_public_policy"):
+        if module.write_public_policy(rendered_policy):
+            changed_outputs.append("public_policy")
+    return matcher, {
+        "render_ms": round((rendered - started) * 1000, 3),
+        "compile_ms": round((compiled - rendered) * 1000, 3),
+        "changed_outputs": changed_outputs,
+    }
+
+
+# Worker-process state. The module cache and the last compiled matcher live
+# for as long as the worker does, so later reloads skip re-executing
+# render-policy and recompiling unchanged hosts, exactly as in-process reloads do.
+_worker_modules = None
+_worker_matcher = None
+
+
+def render_compiled_policy(render_policy_path):
+    """Worker-process entry point: return `(artifact_bytes, timings)`."""
+    global _worker_modules, _worker_matcher
+    if _worker_modules is None or _worker_modules.path != Path(render_policy_path):
+        _worker_modules = RenderPolicyModuleCache(render_policy_path)
+    matcher, timings = render_matcher(_worker_modules, previous=_worker_matcher)
+    _worker_matcher = matcher
+    started = time.monotonic()
+    artifact = matcher.to_artifact(b"")
+    timings["serialize_ms"] = round((time.monotonic() - started) * 1000, 3)
+    return artifact, timings
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Per-flow allocation benchmark for PolicyEnforcer decision storage.
+
+Drives allowed flows through `requestheaders`, `request`, `responseheaders`
+and `response` and reports flows per second plus the memory blocks and bytes
+each flow keeps alive. The `legacy` variant restores the previous behaviour of
+serializing the decision to a metadata dict and rebuilding it on every hook.
+
+    python images/proxy/benchmarks/bench_flow_allocations.py [--quick] [--json out.json]
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+import benchlib
+
+
+HOST = "api.anthropic.com"
+TARGET = "/v1/messages?beta=true"
+
+
+def make_enforcer(enforcer_module, legacy):
+    class LegacyPolicyEnforcer(enforcer_module.PolicyEnforcer):
+        def _store_decision(self, flow, decision):
+            self._get_flow_metadata(flow)[
+                enforcer_module.FLOW_DECISION_METADATA_KEY
+            ] = decision.to_metadata()
+
+        def _get_stored_decision(self, flow):
+            payload = self._get_flow_metadata(flow).get(
+                enforcer_module.FLOW_DECISION_METADATA_KEY
+            )
+            if payload is None:
+                return None
+            return enforcer_module.PolicyDecision.from_metadata(payload)
+
+    enforcer_class = LegacyPolicyEnforcer if legacy else enforcer_module.PolicyEnforcer
+    matcher = enforcer_module.PolicyMatcher.from_policy_data({
+        "domains": [
+            {
+                "host": HOST,
+                "rules": [
+                    {"schemes": ["https"], "methods": ["POST"], "path": {"prefix": "/v1/"}},
+                ],
+            }
+        ]
+    })
+    null_stream = open(os.devnull, "w", encoding="utf-8")
+    return enforcer_class(
+        mode="enforce",
+        matcher=matcher,
+        logger=enforcer_module.JsonLogger(stream=null_stream),
+        response_factory=benchlib.FakeResponse,
+    )
+
+
+def run_flow(enforcer):
+    flow = benchlib.FakeFlow(HOST, method="POST", path=TARGET)
+    enforcer.requestheaders(flow)
+    enforcer.request(flow)
+    flow.response = benchlib.FakeResponse(200)
+    enforcer.responseheaders(flow)
+    enforcer.response(flow)
+    return flow
+
+
+def retained_per_flow(enforcer, flow_count):
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    flows = [run_flow(enforcer) for _ in range(flow_count)]
+    retained_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+    del flows
+    return (blocks_after - blocks_before) / flow_count, retained_bytes / flow_count
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    enforcer_module = benchlib.load_enforcer()
+    number = 2_000 if args.quick else 20_000
+
+    rows = []
+    for variant in ("legacy", "current"):
+        enforcer = make_enforcer(enforcer_module, legacy=variant == "legacy")
+        # Warm the decision cache and any lazily built state first.
+        run_flow(enforcer)
+        flows_per_s = benchlib.measure(lambda: run_flow(enforcer), number=number)
+        blocks, retained_bytes = retained_per_flow(enforcer, number)
+        rows.append({
+            "variant": variant,
+            "flows_per_s": flows_per_s,
+            "retained_blocks_per_flow": blocks,
+            "retained_bytes_per_flow": retained_bytes,
+        })
+
+    benchlib.report("flow_allocations", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Header injection benchmark: the per-request work for a transform-bearing rule.
+
+Each operation checks the request for existing target headers, takes the
+cached secret resolutions, renders the header values, and sets them on a
+request carrying 20 unrelated headers. Secrets are already cached, so this is
+the steady-state cost. Rules inject 1, 3 or 10 headers. Variants:
+
+  legacy  previous behaviour: one scan of the request headers per injected
+          header, and a transform dict built and re-keyed for every render
+  plan    the injection plan compiled at policy load (lowercased target-name
+          set checked in one pass, render key precomputed per header)
+
+The logger runs at `quiet`, so log serialization is not counted.
+
+    python images/proxy/benchmarks/bench_header_injection.py [--quick] [--json out.json]
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import benchlib
+
+
+HOST = "api.example.com"
+HEADER_COUNTS = (1, 3, 10)
+REQUEST_HEADERS = {f"X-Request-Header-{index}": f"value-{index}" for index in range(20)}
+
+
+def make_enforcer(enforcer_module, legacy, header_count, secret_root):
+    # The module the enforcer imported, so SecretValue types match.
+    secret_resolver = sys.modules[enforcer_module.SecretResolver.__module__]
+
+    class LegacyPolicyEnforcer(enforcer_module.PolicyEnforcer):
+        def _find_existing_header_name(self, headers, target_name):
+            target = target_name.lower()
+            for existing_name in headers.keys():
+                if str(existing_name).lower() == target:
+                    return existing_name
+            if target_name in headers:
+                return target_name
+            return None
+
+        def _check_existing_headers(self, flow, decision, request_transform):
+            headers = flow.request.headers
+            existing_headers = []
+            for header in request_transform.headers:
+                existing_headers.append(self._find_existing_header_name(headers, header.name))
+            return None, existing_headers
+
+        def _apply_request_transform(self, flow, decision, request_transform, existing_headers, resolutions):
+            headers = flow.request.headers
+            staged_headers = []
+            injected = []
+            for header, existing_name, resolution in zip(request_transform.headers, existing_headers, resolutions):
+                transform = {"type": header.transform_type}
+                if header.transform_type == "basic":
+                    transform["username"] = header.username
+                rendered_value = secret_resolver.render_header_value(resolution.value, transform)
+                staged_headers.append((header.name, rendered_value, existing_name))
+                injected.append({"name": header.name, "secret": header.secret, "transform": header.transform_type})
+            for name, rendered_value, existing_name in staged_headers:
+                self._set_request_header(headers, name, rendered_value, existing_name)
+            self.logger.event(self._header_injection_event(decision, injected, []))
+            return None
+
+    headers = {}
+    for index in range(header_count):
+        transform = {"type": "basic", "username": "x-access-token"} if index % 2 else {"type": "bearer"}
+        headers[f"X-Injected-{index}"] = {"secret": f"token-{index}", "transform": transform}
+    matcher = enforcer_module.PolicyMatcher.from_policy_data({
+        "domains": [
+            {
+                "host": HOST,
+                "rules": [
+                    {
+                        "schemes": ["https"],
+                        "transform": {"request": {"headers": headers, "on_existing_header": "replace"}},
+                    }
+                ],
+            }
+        ]
+    })
+    enforcer_class = LegacyPolicyEnforcer if legacy else enforcer_module.PolicyEnforcer
+    null_stream = open(os.devnull, "w", encoding="utf-8")
+    return enforcer_class(
+        mode="enforce",
+        matcher=matcher,
+        logger=enforcer_module.JsonLogger(log_level="quiet", stream=null_stream),
+        response_factory=benchlib.FakeResponse,
+        secret_resolver=secret_resolver.FileSecretResolver(secret_root, cache_ttl=60.0),
+        secret_prefetch=False,
+    )
+
+
+def make_operation(enforcer):
+    decision = enforcer.matcher.evaluate_request(HOST, "https", "GET", "/")
+    request_transform = decision.rule_transform.request
+    resolver = enforcer._get_secret_resolver()
+    flow = benchlib.FakeFlow(HOST)
+
+    def operation():
+        flow.request.headers = dict(REQUEST_HEADERS)
+        _, existing_headers = enforcer._check_existing_headers(flow, decision, request_transform)
+        resolutions = enforcer._cached_resolutions(resolver, request_transform)
+        enforcer._apply_request_transform(flow, decision, request_transform, existing_headers, resolutions)
+
+    # Warm the secret cache and rendered values.
+    for header in request_transform.headers:
+        resolver.resolve(header.secret)
+    operation()
+    assert all(header.name in flow.request.headers for header in request_transform.headers)
+    return operation
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    enforcer_module = benchlib.load_enforcer()
+    number = 2_000 if args.quick else 20_000
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        secret_root = Path(tempdir)
+        secret_root.chmod(0o700)
+        for index in range(max(HEADER_COUNTS)):
+            path = secret_root / f"token-{index}"
+            path.write_text(f"secret-token-{index}", encoding="utf-8")
+            path.chmod(0o600)
+
+        for header_count in HEADER_COUNTS:
+            for variant in ("legacy", "plan"):
+                enforcer = make_enforcer(enforcer_module, variant == "legacy", header_count, secret_root)
+                ops_per_s = benchlib.measure(make_operation(enforcer), number)
+                rows.append({
+                    "headers": header_count,
+                    "variant": variant,
+                    "injections_per_s": ops_per_s,
+                    "us_per_request": 1_000_000 / ops_per_s,
+                })
+                enforcer.done()
+
+    benchlib.report("header_injection", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
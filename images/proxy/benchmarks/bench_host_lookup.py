@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Host lookup benchmark for PolicyMatcher.
+
+Compares the hash/trie host index against the linear `matches_host` scan it
+replaced, at 10, 1k and 100k host records. Four lookups are timed per policy
+size: an exact hit, a wildcard hit, a nested wildcard hit and a miss.
+
+    python images/proxy/benchmarks/bench_host_lookup.py [--quick] [--json out.json]
+"""
+
+import benchlib
+
+
+SIZES = (10, 1_000, 100_000)
+WILDCARD_EVERY = 5
+
+
+def build_domains(size):
+    domains = []
+    for index in range(size):
+        if index % WILDCARD_EVERY == 0:
+            domains.append(f"*.svc{index}.example.net")
+        else:
+            domains.append(f"host{index}.example.com")
+    return domains
+
+
+def lookup_hosts(size):
+    last_exact = max(index for index in range(size) if index % WILDCARD_EVERY)
+    last_wildcard = max(index for index in range(size) if index % WILDCARD_EVERY == 0)
+    return {
+        "exact_hit": f"host{last_exact}.example.com",
+        "wildcard_hit": f"api.svc{last_wildcard}.example.net",
+        "nested_wildcard_hit": f"a.b.c.svc{last_wildcard}.example.net",
+        "miss": "blocked.invalid",
+    }
+
+
+def linear_find(host_records, host):
+    for record in host_records:
+        if record.matches_host(host):
+            return record
+    return None
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    policy_matcher = benchlib.load_policy_matcher()
+
+    rows = []
+    for size in SIZES:
+        matcher = policy_matcher.PolicyMatcher.from_policy_data(
+            {"domains": build_domains(size)}
+        )
+        records = matcher.host_records
+        for case, host in lookup_hosts(size).items():
+            assert matcher._find_host_record(host) is linear_find(records, host)
+
+            linear_number = max(1, 20_000 // size)
+            index_number = 20_000
+            if args.quick:
+                linear_number = max(1, linear_number // 10)
+                index_number //= 10
+
+            linear_ops = benchlib.measure(
+                lambda: linear_find(records, host),
+                number=linear_number,
+                repeat=3,
+            )
+            index_ops = benchlib.measure(
+                lambda: matcher._find_host_record(host),
+                number=index_number,
+            )
+            rows.append({
+                "records": size,
+                "case": case,
+                "linear_ops_per_s": linear_ops,
+                "index_ops_per_s": index_ops,
+                "speedup": index_ops / linear_ops,
+            })
+
+    benchlib.report("host_lookup", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Log serialization benchmark for JsonLogger.
+
+Formats and encodes typical request log entries into a writer that discards
+them, reporting lines per second. The `legacy` variant formats the timestamp
+with `datetime.now().strftime()` on every line, as JsonLogger used to. The
+other variants use the per-second cached timestamp with each schema and
+encoder; orjson variants are skipped when orjson is not installed.
+
+    python images/proxy/benchmarks/bench_log_serialization.py [--quick] [--json out.json]
+"""
+
+from datetime import datetime, timezone
+
+import benchlib
+
+
+class NullWriter:
+    def write(self, line, critical=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def legacy_timestamp():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_logger(enforcer_module, schema, encoder, legacy=False):
+    logger = enforcer_module.JsonLogger(
+        writer=NullWriter(),
+        encode=enforcer_module.make_log_encoder(schema, encoder),
+    )
+    if legacy:
+        logger.timestamp = legacy_timestamp
+    return logger
+
+
+def request_entry(logger):
+    return {
+        "ts": logger.timestamp(),
+        "type": "request",
+        "phase": "request",
+        "action": "allowed",
+        "reason": "rule_match",
+        "host": "api.anthropic.com",
+        "scheme": "https",
+        "matched_host": "api.anthropic.com",
+        "method": "POST",
+        "path": "/v1/messages",
+        "matched_rule_index": 0,
+    }
+
+
+def log_request(logger):
+    logger.event(request_entry(logger))
+
+
+def orjson_available(enforcer_module):
+    try:
+        enforcer_module.make_log_encoder("full", "orjson")
+    except ValueError:
+        return False
+    return True
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    enforcer_module = benchlib.load_enforcer()
+    number = 20_000 if args.quick else 200_000
+
+    variants = [
+        ("legacy", "full", "json", True),
+        ("cached_ts", "full", "json", False),
+        ("compact", "compact", "json", False),
+    ]
+    if orjson_available(enforcer_module):
+        variants += [
+            ("orjson", "full", "orjson", False),
+            ("orjson_compact", "compact", "orjson", False),
+        ]
+
+    rows = []
+    for variant, schema, encoder, legacy in variants:
+        logger = make_logger(enforcer_module, schema, encoder, legacy=legacy)
+        rows.append({
+            "variant": variant,
+            "lines_per_s": benchlib.measure(lambda: log_request(logger), number=number),
+            "line_bytes": len(logger.encode(request_entry(logger))),
+        })
+
+    benchlib.report("log_serialization", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Policy reload latency benchmark.
+
+Times the synchronous part of a `SIGHUP` reload: getting the render-policy
+module, rendering the policy, and compiling the matcher. The policy enables
+every catalog service plus a growing list of plain domains. Variants:
+
+  reexec       re-execute render-policy and compile every host on each reload
+               (the behaviour before the module cache)
+  cached       reuse the module through RenderPolicyModuleCache
+  incremental  cached module, and reuse unchanged host records from the
+               previous matcher (what the enforcer does now)
+
+    python images/proxy/benchmarks/bench_policy_reload.py [--quick] [--json out.json]
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+import benchlib
+
+
+DOMAIN_COUNTS = (100, 2_000)
+
+
+def write_policy(path, service_names, domain_count):
+    policy = {
+        "services": sorted(service_names),
+        "domains": [f"host{index}.example.com" for index in range(domain_count)],
+    }
+    path.write_text(yaml.safe_dump(policy, sort_keys=False), encoding="utf-8")
+
+
+def time_reloads(reload_once, number):
+    latencies = []
+    for _ in range(number):
+        started = time.perf_counter()
+        reload_once()
+        latencies.append(time.perf_counter() - started)
+    return benchlib.latency_summary(latencies)
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    enforcer_module = benchlib.load_enforcer()
+    load_render_policy_module = benchlib.load_policy_worker().load_render_policy_module
+    PolicyMatcher = enforcer_module.PolicyMatcher
+    render_policy_path = benchlib.RENDER_POLICY_PATH
+    service_names = load_render_policy_module(render_policy_path).service_catalog.KNOWN_SERVICES
+    number = 10 if args.quick else 50
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        policy_path = Path(tempdir) / "policy.yaml"
+        previous_source = os.environ.get("AGENTBOX_POLICY_SOURCE_PATH")
+        os.environ["AGENTBOX_POLICY_SOURCE_PATH"] = str(policy_path)
+        try:
+            for domain_count in DOMAIN_COUNTS:
+                write_policy(policy_path, service_names, domain_count)
+                module_cache = enforcer_module.RenderPolicyModuleCache(render_policy_path)
+                state = {"matcher": PolicyMatcher.from_policy_data(module_cache.get().render_policy())}
+
+                def reexec():
+                    module = load_render_policy_module(render_policy_path)
+                    PolicyMatcher.from_policy_data(module.render_policy())
+
+                def cached():
+                    PolicyMatcher.from_policy_data(module_cache.get().render_policy())
+
+                def incremental():
+                    state["matcher"] = PolicyMatcher.from_policy_data(
+                        module_cache.get().render_policy(),
+                        previous=state["matcher"],
+                    )
+
+                host_records = len(state["matcher"].host_records)
+                for variant, reload_once in (("reexec", reexec), ("cached", cached), ("incremental", incremental)):
+                    summary = time_reloads(reload_once, number)
+                    rows.append({
+                        "host_records": host_records,
+                        "variant": variant,
+                        "p50_ms": summary["p50_ms"],
+                        "p99_ms": summary["p99_ms"],
+                        "mean_ms": summary["mean_ms"],
+                    })
+        finally:
+            if previous_source is None:
+                os.environ.pop("AGENTBOX_POLICY_SOURCE_PATH", None)
+            else:
+                os.environ["AGENTBOX_POLICY_SOURCE_PATH"] = previous_source
+
+    benchlib.report("policy_reload", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Policy startup benchmark: rendered YAML versus the compiled policy artifact.
+
+Times what the enforcer does at startup to get a PolicyMatcher: parsing and
+validating the rendered YAML with `from_policy_path`, or loading the artifact
+`render-policy --compiled-output` writes with `from_artifact_path` (checksum,
+source digest and decode included). Also reports how long `render-policy`
+spends compiling the artifact and both file sizes. Policies mix exact hosts,
+wildcards and hosts with path, query and header-injection rules.
+
+    python images/proxy/benchmarks/bench_policy_startup.py [--quick] [--json out.json]
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+import benchlib
+
+
+SIZES = (1_000, 10_000)
+
+
+def build_domains(size):
+    domains = []
+    for index in range(size):
+        if index % 5 == 0:
+            domains.append(f"*.svc{index}.example.net")
+        elif index % 5 == 1:
+            domains.append({
+                "host": f"api{index}.example.org",
+                "rules": [
+                    {"schemes": ["https"], "methods": ["GET"], "path": {"prefix": "/v1/"}},
+                    {
+                        "schemes": ["https"],
+                        "methods": ["POST"],
+                        "path": {"exact": f"/v1/items/{index}"},
+                        "query": {"exact": {"page": ["1"]}},
+                        "transform": {
+                            "request": {
+                                "headers": {
+                                    "Authorization": {
+                                        "secret": f"token-{index % 7}",
+                                        "transform": {"type": "bearer"},
+                                    },
+                                },
+                                "on_existing_header": "fail",
+                            },
+                        },
+                    },
+                ],
+            })
+        else:
+            domains.append({"host": f"host{index}.example.com", "rules": [{"schemes": ["https"]}]})
+    return domains
+
+
+def best_seconds(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    policy_matcher = benchlib.load_policy_matcher()
+    sizes = SIZES[:1] if args.quick else SIZES
+    repeat = 1 if args.quick else 3
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        policy_path = Path(tempdir) / "policy.yaml"
+        artifact_path = Path(tempdir) / "policy.compiled"
+        for size in sizes:
+            policy_text = yaml.safe_dump({"domains": build_domains(size)}, sort_keys=False)
+            policy_path.write_text(policy_text, encoding="utf-8")
+            matcher = policy_matcher.PolicyMatcher.from_policy_path(str(policy_path))
+
+            compile_s = best_seconds(lambda: matcher.to_artifact(policy_text.encode("utf-8")), repeat)
+            artifact_path.write_bytes(matcher.to_artifact(policy_text.encode("utf-8")))
+            loaded = policy_matcher.PolicyMatcher.from_artifact_path(str(artifact_path), str(policy_path))
+            assert loaded.host_records == matcher.host_records
+
+            yaml_s = best_seconds(lambda: policy_matcher.PolicyMatcher.from_policy_path(str(policy_path)), repeat)
+            artifact_s = best_seconds(
+                lambda: policy_matcher.PolicyMatcher.from_artifact_path(str(artifact_path), str(policy_path)),
+                repeat,
+            )
+            rows.append({
+                "hosts": size,
+                "yaml_kb": policy_path.stat().st_size / 1024,
+                "artifact_kb": artifact_path.stat().st_size / 1024,
+                "yaml_load_ms": yaml_s * 1000,
+                "artifact_load_ms": artifact_s * 1000,
+                "speedup": yaml_s / artifact_s,
+                "compile_ms": compile_s * 1000,
+            })
+
+    benchlib.report("policy_startup", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Proxy cold start benchmark: the policy steps `entrypoint.sh` runs before
+mitmdump accepts traffic.
+
+Each variant runs in fresh Python processes, so interpreter start-up and
+imports are counted the way the container pays for them. The policy enables
+every catalog service plus a list of plain domains. Variants:
+
+  subprocess  `render-policy` writes the rendered YAML, credential shim, public
+              allowlist and compiled artifact; a second process loads the
+              enforcer addon from the artifact (PROXY_STARTUP_RENDER=0)
+  in_process  one process loads the enforcer addon, which renders, compiles
+              and writes the shim and public allowlist itself
+              (PROXY_STARTUP_RENDER=1, the entrypoint default)
+
+When mitmproxy is installed, CA generation is timed too: `ca_direct` creates
+the CA through mitmproxy's certificate store, and `ca_probe` is the old
+`timeout 5 mitmdump` run (only when mitmdump is on PATH).
+
+    python images/proxy/benchmarks/bench_proxy_startup.py [--quick] [--json out.json]
+"""
+
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+import benchlib
+
+
+DOMAIN_COUNTS = (100, 2_000)
+
+# Stands in for mitmdump loading the addon: import it and build the enforcer.
+# With mitmproxy installed the import already builds one, so only one is built
+# either way.
+LOAD_ENFORCER = """
+import importlib.util
+import sys
+
+spec = importlib.util.spec_from_file_location("enforcer", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+if not module.addons:
+    module.PolicyEnforcer(response_factory=lambda *args: None)
+"""
+
+CREATE_CA = """
+import sys
+from mitmproxy.certs import CertStore
+
+CertStore.from_store(sys.argv[1], "mitmproxy", 2048)
+"""
+
+
+def write_policy(path, service_names, domain_count):
+    policy = {
+        "services": sorted(service_names),
+        "domains": [f"host{index}.example.com" for index in range(domain_count)],
+    }
+    path.write_text(yaml.safe_dump(policy, sort_keys=False), encoding="utf-8")
+
+
+def run(command, env):
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def best_seconds(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def policy_rows(service_names, domain_counts, repeat):
+    rows = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        root = Path(tempdir)
+        source_path = root / "policy.yaml"
+        rendered_path = root / "rendered.yaml"
+        compiled_path = root / "rendered.compiled"
+        env = dict(
+            os.environ,
+            AGENTBOX_POLICY_SOURCE_PATH=str(source_path),
+            AGENTBOX_RENDER_POLICY_PATH=str(benchlib.RENDER_POLICY_PATH),
+            AGENTBOX_CREDENTIAL_SHIM_INIT_PATH=str(root / "credential-shims" / "init.zsh"),
+            AGENTBOX_PUBLIC_POLICY_PATH=str(root / "public.yaml"),
+            POLICY_PATH=str(rendered_path),
+            POLICY_ARTIFACT_PATH=str(compiled_path),
+            PROXY_MODE="enforce",
+            PROXY_LOG_QUEUE_SIZE="0",
+            PROXY_SECRET_PREFETCH="0",
+        )
+        render_command = [
+            sys.executable,
+            str(benchlib.RENDER_POLICY_PATH),
+            "--output", str(rendered_path),
+            "--credential-shim-output", env["AGENTBOX_CREDENTIAL_SHIM_INIT_PATH"],
+            "--public-output", env["AGENTBOX_PUBLIC_POLICY_PATH"],
+            "--compiled-output", str(compiled_path),
+        ]
+        load_command = [sys.executable, "-c", LOAD_ENFORCER, str(benchlib.ENFORCER_PATH)]
+
+        for domain_count in domain_counts:
+            write_policy(source_path, service_names, domain_count)
+
+            def separate():
+                run(render_command, env)
+                run(load_command, dict(env, PROXY_STARTUP_RENDER="0"))
+
+            def in_process():
+                run(load_command, dict(env, PROXY_STARTUP_RENDER="1"))
+
+            for variant, start in (("subprocess", separate), ("in_process", in_process)):
+                rows.append({
+                    "step": "policy",
+                    "domains": domain_count,
+                    "variant": variant,
+                    "startup_ms": best_seconds(start, repeat) * 1000,
+                })
+    return rows
+
+
+def ca_rows(repeat):
+    if importlib.util.find_spec("mitmproxy") is None:
+        return []
+    variants = [("ca_direct", [sys.executable, "-c", CREATE_CA])]
+    if shutil.which("mitmdump") and shutil.which("timeout"):
+        variants.append(("ca_probe", ["timeout", "5", "mitmdump", "--set"]))
+
+    rows = []
+    for variant, command in variants:
+
+        def generate():
+            with tempfile.TemporaryDirectory() as confdir:
+                argument = f"confdir={confdir}" if variant == "ca_probe" else confdir
+                subprocess.run(command + [argument], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        rows.append({
+            "step": "ca",
+            "domains": 0,
+            "variant": variant,
+            "startup_ms": best_seconds(generate, repeat) * 1000,
+        })
+    return rows
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    enforcer_module = benchlib.load_enforcer()
+    service_names = benchlib.load_policy_worker().load_render_policy_module(benchlib.RENDER_POLICY_PATH).service_catalog.KNOWN_SERVICES
+    domain_counts = DOMAIN_COUNTS[:1] if args.quick else DOMAIN_COUNTS
+    repeat = 1 if args.quick else 3
+
+    rows = ca_rows(1) + policy_rows(service_names, domain_counts, repeat)
+    benchlib.report("proxy_startup", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
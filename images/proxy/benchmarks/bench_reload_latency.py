@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Request latency while a policy reload is running.
+
+Drives simulated flows through `requestheaders` and `request` on the event
+loop, one every 0.5 ms, while `PolicyEnforcer.reload()` re-renders a large
+single-file policy (every catalog service plus thousands of domains). Each
+flow's latency runs from its scheduled arrival to the end of its hooks, so
+time the event loop spends waiting for the GIL shows up directly. The
+policy gains one domain per reload, so compiles are incremental.
+
+Variants:
+  idle     no reload running (baseline)
+  thread   PROXY_RELOAD_WORKER=thread (render and compile on a thread)
+  process  PROXY_RELOAD_WORKER=process (persistent worker process; warmed
+           up before measuring)
+
+    python images/proxy/benchmarks/bench_reload_latency.py [--quick] [--json out.json]
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+import benchlib
+
+
+ARRIVAL_INTERVAL = 0.0005
+HOST = "host1.example.com"
+
+
+def policy_text(service_names, domain_count, generation):
+    policy = {
+        "services": sorted(service_names),
+        "domains": [f"host{index}.example.com" for index in range(domain_count)]
+        + [f"extra{index}.example.org" for index in range(generation)],
+    }
+    return yaml.safe_dump(policy, sort_keys=False)
+
+
+def make_enforcer(enforcer_module, reload_worker):
+    null_stream = open(os.devnull, "w", encoding="utf-8")
+    enforcer = enforcer_module.PolicyEnforcer(
+        mode="enforce",
+        matcher=enforcer_module.PolicyMatcher.from_policy_data({"domains": []}),
+        logger=enforcer_module.JsonLogger(stream=null_stream),
+        response_factory=benchlib.FakeResponse,
+        reload_worker=reload_worker,
+        secret_prefetch=False,
+        policy_watch="off",
+    )
+    return enforcer
+
+
+async def drive_flows(enforcer, stop):
+    latencies = []
+    started = time.perf_counter()
+    index = 0
+    while not stop.is_set():
+        arrival = started + index * ARRIVAL_INTERVAL
+        delay = arrival - time.perf_counter()
+        await asyncio.sleep(delay if delay > 0 else 0)
+        flow = benchlib.FakeFlow(HOST, path=f"/items/{index % 64}")
+        enforcer.requestheaders(flow)
+        enforcer.request(flow)
+        latencies.append(time.perf_counter() - arrival)
+        index += 1
+    return latencies
+
+
+async def measure(enforcer, reloads, idle_seconds):
+    stop = asyncio.Event()
+    traffic = asyncio.create_task(drive_flows(enforcer, stop))
+    await asyncio.sleep(0.05)
+    reload_seconds = []
+    if reloads:
+        for reload_once in reloads:
+            started = time.perf_counter()
+            await reload_once()
+            reload_seconds.append(time.perf_counter() - started)
+    else:
+        await asyncio.sleep(idle_seconds)
+    stop.set()
+    latencies = await traffic
+    # Drop the warm-up before the first reload started.
+    warmup = int(0.05 / ARRIVAL_INTERVAL)
+    return latencies[warmup:], reload_seconds
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    enforcer_module = benchlib.load_enforcer()
+    enforcer_module.RENDER_POLICY_PATH = benchlib.RENDER_POLICY_PATH
+    service_names = benchlib.load_policy_worker().load_render_policy_module(benchlib.RENDER_POLICY_PATH).service_catalog.KNOWN_SERVICES
+    domain_count = 2_000 if args.quick else 10_000
+    reload_count = 2 if args.quick else 5
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tempdir:
+        policy_path = Path(tempdir) / "policy.yaml"
+        previous_source = os.environ.get("AGENTBOX_POLICY_SOURCE_PATH")
+        os.environ["AGENTBOX_POLICY_SOURCE_PATH"] = str(policy_path)
+        try:
+            for variant in ("idle", "thread", "process"):
+                # Serialize every generation up front so the benchmark's own
+                # YAML dumping does not stall the event loop being measured.
+                texts = [policy_text(service_names, domain_count, generation) for generation in range(reload_count + 1)]
+                policy_path.write_text(texts[0], encoding="utf-8")
+                enforcer = make_enforcer(enforcer_module, "process" if variant == "process" else "thread")
+                generation = {"value": 0}
+
+                async def reload_once():
+                    generation["value"] += 1
+                    policy_path.write_text(texts[generation["value"]], encoding="utf-8")
+                    await enforcer.reload()
+
+                async def run():
+                    # Warm the module cache, the worker process and the
+                    # previous-generation matcher before measuring.
+                    await enforcer.reload()
+                    if variant == "idle":
+                        return await measure(enforcer, [], idle_seconds=1.0)
+                    return await measure(enforcer, [reload_once] * reload_count, idle_seconds=0)
+
+                latencies, reload_seconds = asyncio.run(run())
+                enforcer.done()
+                summary = benchlib.latency_summary(latencies)
+                rows.append({
+                    "variant": variant,
+                    "host_records": len(enforcer.matcher.host_records),
+                    "flows": summary["count"],
+                    "p50_ms": summary["p50_ms"],
+                    "p99_ms": summary["p99_ms"],
+                    "max_ms": max(latencies) * 1000,
+                    "reload_ms": (sum(reload_seconds) / len(reload_seconds) * 1000) if reload_seconds else 0.0,
+                })
+        finally:
+            if previous_source is None:
+                os.environ.pop("AGENTBOX_POLICY_SOURCE_PATH", None)
+            else:
+                os.environ["AGENTBOX_POLICY_SOURCE_PATH"] = previous_source
+
+    benchlib.report("reload_latency", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Per-host rule lookup benchmark for PolicyMatcher.
+
+Builds an `api.github.com` host record shaped like the GitHub catalog's
+repo-scoped expansion (an exact and a prefix rule per repo, both
+case-insensitive) and compares the compiled rule index against the linear
+`matches_request` scan it replaced.
+
+    python images/proxy/benchmarks/bench_rule_index.py [--quick] [--json out.json]
+"""
+
+import benchlib
+
+
+REPO_COUNTS = (10, 100, 500)
+
+
+def github_api_rules(repo_count):
+    rules = []
+    for index in range(repo_count):
+        base = f"/repos/owner{index}/repo{index}"
+        for path in ({"exact": base}, {"prefix": base + "/"}):
+            rules.append({
+                "schemes": ["https"],
+                "methods": ["GET", "HEAD"],
+                "path": path,
+                "path_case_insensitive": True,
+            })
+    return rules
+
+
+def linear_find(record, scheme, method, path, query):
+    for rule_index, rule in enumerate(record.rules):
+        if rule.matches_request(scheme, method, path, query):
+            return rule_index, rule
+    return None
+
+
+def main():
+    args = benchlib.argument_parser(__doc__.strip().splitlines()[0]).parse_args()
+    policy_matcher = benchlib.load_policy_matcher()
+    number = 2_000 if args.quick else 20_000
+
+    rows = []
+    for repo_count in REPO_COUNTS:
+        matcher = policy_matcher.PolicyMatcher.from_policy_data(
+            {"domains": [{"host": "api.github.com", "rules": github_api_rules(repo_count)}]}
+        )
+        record = matcher.host_records[0]
+        last = repo_count - 1
+        targets = {
+            "first_repo": "/repos/owner0/repo0/pulls?state=open",
+            "last_repo": f"/repos/Owner{last}/Repo{last}/contents/README.md",
+            "miss": "/repos/someone/else/issues",
+        }
+        for case, target in targets.items():
+            path, query, _ = matcher._normalize_request_target(target)
+            request = ("https", "GET", path, query)
+            assert record.rule_index.find(*request) == linear_find(record, *request)
+
+            linear_ops = benchlib.measure(
+                lambda: linear_find(record, *request),
+                number=max(10, number // repo_count),
+                repeat=3,
+            )
+            index_ops = benchlib.measure(
+                lambda: record.rule_index.find(*request),
+                number=number,
+            )
+            rows.append({
+                "rules": len(record.rules),
+                "case": case,
+                "linear_ops_per_s": linear_ops,
+                "index_ops_per_s": index_ops,
+                "speedup": index_ops / linear_ops,
+            })
+
+    benchlib.report("rule_index", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
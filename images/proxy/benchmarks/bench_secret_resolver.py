@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Secret resolution and header rendering benchmark for FileSecretResolver.
+
+Each operation resolves one secret and renders a `Basic` Authorization value,
+which is what header injection does per transformed request. Operations are
+spread over 1, 4 and 16 threads; the report gives overall resolves per second
+plus per-operation p50/p99 latency.
+
+Scenarios:
+  cold        cache invalidated before every resolve (full read path)
+  revalidate  AGENTBOX_SECRET_CACHE_TTL=0 (stat check, no re-read)
+  ttl_hit     default TTL (served from memory)
+  *_unsafe    same, with group/other-readable root and files so every read
+              builds permission warnings
+
+`--latency-ms` injects a sleep into each `stat`/`open`/`fstat`/`read` the
+resolver makes, standing in for a slow bind mount or network filesystem.
+
+    python images/proxy/benchmarks/bench_secret_resolver.py [--latency-ms 0,1] [--quick] [--json out.json]
+"""
+
+import concurrent.futures
+import contextlib
+import os
+import tempfile
+import time
+import types
+from pathlib import Path
+
+import benchlib
+
+
+SECRET_COUNT = 8
+CONCURRENCY = (1, 4, 16)
+TRANSFORM = {"type": "basic", "username": "x-access-token"}
+
+
+def slow_os(latency):
+    """Return an `os` stand-in whose filesystem calls sleep for `latency` seconds first."""
+
+    def delayed(func):
+        def call(*args, **kwargs):
+            time.sleep(latency)
+            return func(*args, **kwargs)
+
+        return call
+
+    namespace = types.SimpleNamespace(**{name: getattr(os, name) for name in dir(os) if not name.startswith("__")})
+    for name in ("stat", "open", "fstat", "read"):
+        setattr(namespace, name, delayed(getattr(os, name)))
+    return namespace
+
+
+@contextlib.contextmanager
+def injected_latency(secret_resolver, latency):
+    if not latency:
+        yield
+        return
+    original = secret_resolver.os
+    secret_resolver.os = slow_os(latency)
+    try:
+        yield
+    finally:
+        secret_resolver.os = original
+
+
+def make_secret_root(unsafe):
+    tempdir = tempfile.TemporaryDirectory()
+    root = Path(tempdir.name)
+    root.chmod(0o755 if unsafe else 0o700)
+    for index in range(SECRET_COUNT):
+        path = root / f"service-token-{index}"
+        path.write_text(f"secret-token-{index}", encoding="utf-8")
+        path.chmod(0o644 if unsafe else 0o600)
+    return tempdir, root
+
+
+def make_operation(secret_resolver, resolver, scenario):
+    secret_ids = [f"service-token-{index}" for index in range(SECRET_COUNT)]
+    invalidate = scenario.startswith("cold")
+
+    def operation(index):
+        secret_id = secret_ids[index % SECRET_COUNT]
+        if invalidate:
+            resolver.invalidate(secret_id)
+        resolution = resolver.resolve(secret_id)
+        secret_resolver.render_header_value(resolution.value, TRANSFORM)
+
+    return operation
+
+
+def run_concurrent(operation, total_ops, concurrency):
+    per_worker = max(1, total_ops // concurrency)
+
+    def worker(offset):
+        latencies = []
+        for index in range(per_worker):
+            started = time.perf_counter()
+            operation(offset + index)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(0, concurrency * per_worker, per_worker)))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for result in results for latency in result]
+    return len(latencies) / elapsed, benchlib.latency_summary(latencies)
+
+
+def main():
+    parser = benchlib.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--latency-ms",
+        default="0,1",
+        help="Comma-separated per-syscall latencies to inject, in milliseconds (default 0,1)",
+    )
+    args = parser.parse_args()
+    secret_resolver = benchlib.load_module("bench_secret_resolver", benchlib.SECRET_RESOLVER_PATH)
+    latencies_ms = [float(value) for value in args.latency_ms.split(",") if value.strip()]
+
+    rows = []
+    for unsafe in (False, True):
+        tempdir, root = make_secret_root(unsafe)
+        with tempdir:
+            for base_scenario, cache_ttl in (("cold", 0.0), ("revalidate", 0.0), ("ttl_hit", 60.0)):
+                scenario = f"{base_scenario}_unsafe" if unsafe else base_scenario
+                for latency_ms in latencies_ms:
+                    total_ops = 2_000 if latency_ms == 0 else 200
+                    if args.quick:
+                        total_ops //= 10
+                    for concurrency in CONCURRENCY:
+                        resolver = secret_resolver.FileSecretResolver(root, cache_ttl=cache_ttl)
+                        operation = make_operation(secret_resolver, resolver, scenario)
+                        for index in range(SECRET_COUNT):
+                            operation(index)
+                        with injected_latency(secret_resolver, latency_ms / 1000):
+                            ops_per_s, summary = run_concurrent(operation, total_ops, concurrency)
+                        resolver.close()
+                        rows.append({
+                            "scenario": scenario,
+                            "latency_ms": latency_ms,
+                            "concurrency": concurrency,
+                            "resolves_per_s": ops_per_s,
+                            "p50_ms": summary["p50_ms"],
+                            "p99_ms": summary["p99_ms"],
+                        })
+
+    benchlib.report("secret_resolver", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+URI path normalization benchmark for PolicyMatcher.
+
+Compares `PolicyMatcher._normalize_uri_component_for_match` against the
+character-by-character loop it replaced, over a corpus of request paths.
+The default corpus is `data/request_paths.txt`. `--corpus` accepts either
+plain request targets or the proxy's JSON log lines (the `path` field is used),
+so paths exported from `agentbox proxy logs` can be replayed directly.
+
+    python images/proxy/benchmarks/bench_uri_normalization.py [--corpus FILE] [--quick] [--json out.json]
+"""
+
+import json
+from pathlib import Path
+
+import benchlib
+
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "data" / "request_paths.txt"
+UNRESERVED_URI_CHARS = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+
+
+def legacy_normalize(value):
+    normalized = []
+    index = 0
+
+    while index < len(value):
+        if (
+            value[index] == "%"
+            and index + 2 < len(value)
+            and all(character in "0123456789ABCDEFabcdef" for character in value[index + 1 : index + 3])
+        ):
+            encoded = value[index + 1 : index + 3]
+            character = chr(int(encoded, 16))
+            if character in UNRESERVED_URI_CHARS:
+                normalized.append(character)
+            else:
+                normalized.append("%" + encoded.upper())
+            index += 3
+            continue
+
+        normalized.append(value[index])
+        index += 1
+
+    return "".join(normalized)
+
+
+def load_corpus(path):
+    paths = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    line = json.loads(line).get("path") or ""
+                except ValueError:
+                    continue
+                if not line:
+                    continue
+            paths.append(line.partition("?")[0] or "/")
+    return paths
+
+
+def main():
+    parser = benchlib.argument_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=str(DEFAULT_CORPUS), help="Request path corpus")
+    args = parser.parse_args()
+
+    normalize = benchlib.load_policy_matcher().PolicyMatcher._normalize_uri_component_for_match
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"corpus {args.corpus} contains no request paths")
+
+    for path in corpus:
+        assert normalize(path) == legacy_normalize(path), path
+
+    subsets = {
+        "all": corpus,
+        "unescaped": [path for path in corpus if "%" not in path],
+        "escaped": [path for path in corpus if "%" in path],
+    }
+    number = 200 if args.quick else 2_000
+
+    rows = []
+    for subset, paths in subsets.items():
+        if not paths:
+            continue
+
+        def run_legacy():
+            for path in paths:
+                legacy_normalize(path)
+
+        def run_current():
+            for path in paths:
+                normalize(path)
+
+        legacy_paths_per_s = benchlib.measure(run_legacy, number=number) * len(paths)
+        current_paths_per_s = benchlib.measure(run_current, number=number) * len(paths)
+        rows.append({
+            "subset": subset,
+            "paths": len(paths),
+            "legacy_paths_per_s": legacy_paths_per_s,
+            "current_paths_per_s": current_paths_per_s,
+            "speedup": current_paths_per_s / legacy_paths_per_s,
+        })
+
+    benchlib.report("uri_normalization", rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
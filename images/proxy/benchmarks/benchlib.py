@@ -0,0 +1,163 @@
+"""
+Shared helpers for proxy microbenchmarks.
+
+Benchmarks are plain scripts, not unit tests. They load proxy modules the same
+way the unit tests do (straight from the source tree) and report throughput so
+results from two revisions can be compared side by side.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from importlib.machinery import SourceFileLoader
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+PROXY_DIR = REPO_ROOT / "images" / "proxy"
+POLICY_MATCHER_PATH = PROXY_DIR / "addons" / "policy_matcher.py"
+ENFORCER_PATH = PROXY_DIR / "addons" / "enforcer.py"
+POLICY_WORKER_PATH = PROXY_DIR / "addons" / "policy_worker.py"
+RENDER_POLICY_PATH = PROXY_DIR / "render-policy"
+SECRET_RESOLVER_PATH = PROXY_DIR / "secret_resolver.py"
+
+
+def load_module(name, path):
+    loader = SourceFileLoader(name, str(path))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[loader.name] = module
+    loader.exec_module(module)
+    return module
+
+
+def load_policy_matcher():
+    return load_module("bench_policy_matcher", POLICY_MATCHER_PATH)
+
+
+def load_policy_worker():
+    return load_module("bench_policy_worker", POLICY_WORKER_PATH)
+
+
+def load_enforcer():
+    # Mirror the unit tests: import in log mode without a startup render so a
+    # locally installed mitmproxy does not build an enforcing addon, or render
+    # the real policy, at import time.
+    overrides = {"PROXY_MODE": "log", "PROXY_STARTUP_RENDER": "0"}
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return load_module("bench_enforcer", ENFORCER_PATH)
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class FakeRequest:
+    def __init__(self, host, scheme="https", method="GET", path="/", headers=None):
+        self.host = host
+        self.scheme = scheme
+        self.method = method
+        self.path = path
+        self.url = f"{scheme}://{host}{path}"
+        self.headers = dict(headers or {})
+        self.stream = False
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=""):
+        self.status_code = status_code
+        self.body = body
+        self.stream = False
+
+
+class FakeFlow:
+    def __init__(self, host, scheme="https", method="GET", path="/", headers=None):
+        self.request = FakeRequest(host, scheme, method, path, headers)
+        self.response = None
+        self.error = None
+        self.metadata = {}
+
+
+def measure(func, number, repeat=5):
+    """Return the best observed operations per second for `func`.
+
+    `func` is called `number` times per sample. The best of `repeat` samples is
+    reported because it is the least disturbed by unrelated machine load.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append(time.perf_counter() - started)
+    return number / min(samples)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(latencies):
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def argument_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="Also write results to this JSON file for comparison across revisions",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Run fewer iterations; useful as a smoke test",
+    )
+    return parser
+
+
+def report(name, rows, json_path=None):
+    """Print `rows` (a list of flat dicts) as a table and optionally dump JSON."""
+    if rows:
+        columns = list(rows[0])
+        widths = {
+            column: max(len(column), *(len(_format_cell(row[column])) for row in rows))
+            for column in columns
+        }
+        print(name)
+        print("  ".join(column.ljust(widths[column]) for column in columns).rstrip())
+        for row in rows:
+            print("  ".join(_format_cell(row[column]).ljust(widths[column]) for column in columns).rstrip())
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as handle:
+            json.dump({"benchmark": name, "results": rows}, handle, indent=2)
+            handle.write("\n")
+
+
+def _format_cell(value):
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
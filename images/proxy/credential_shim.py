@@ -10,6 +10,7 @@ resolved secret values.
 import json
 import os
 import shlex
+import tempfile
 
 import policy_injection
 
@@ -273,34 +274,67 @@ def render_git_askpass_fragment(payload=None, fail=_default_fail):
     )
 
 
-def _write_file(path, body):
-    if not path:
-        return
+def write_file_if_changed(path, data):
+    """Atomically replace `path` with `data` unless it already holds exactly that.
+
+    Returns whether the file was written. Readers never see a partially
+    written file, and an unchanged file keeps its mtime, so agent-side
+    watchers of the shared volume are not woken by reloads that change
+    nothing. render-policy writes its exports through this too.
+    """
+    try:
+        with open(path, "rb") as handle:
+            # One byte past `data` is enough to tell a longer file apart.
+            if handle.read(len(data) + 1) == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    output_dir = os.path.dirname(path) or "."
+    os.makedirs(output_dir, exist_ok=True)
+
+    # A unique temp file in the same directory, so concurrent writers never
+    # share one and os.replace stays on one filesystem.
+    fd, tmp_path = tempfile.mkstemp(
+        dir=output_dir,
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return True
 
-    output_dir = os.path.dirname(path)
-    if output_dir:
-        os.makedirs(output_dir, exist_ok=True)
 
-    tmp_path = path + ".tmp"
-    with open(tmp_path, "w", encoding="utf-8") as handle:
-        handle.write(body)
-    os.chmod(tmp_path, 0o644)
-    os.replace(tmp_path, path)
+def _write_file(path, body):
+    if not path:
+        return False
+    return write_file_if_changed(path, body.encode("utf-8"))
 
 
 def write_init(init_path, payload=None, fail=_default_fail):
+    """Write the init script and its fragments; return whether any changed."""
     if not init_path:
-        return
+        return False
 
     hints = hints_from_payload(payload, fail)
     base_dir = os.path.dirname(init_path)
     git_askpass_path = os.path.join(base_dir, GIT_ASKPASS_ENV_RELATIVE_PATH)
 
-    _write_file(
+    fragment_changed = _write_file(
         git_askpass_path,
         render_git_askpass_fragment_from_hints(hints),
     )
-    _write_file(
+    init_changed = _write_file(
         init_path,
         render_init_fragment_from_hints(init_path, hints),
     )
+    return fragment_changed or init_changed
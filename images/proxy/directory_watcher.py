@@ -0,0 +1,222 @@
+"""
+Directory change watcher shared by the secret resolver and the policy reloader.
+
+`DirectoryWatcher` reports changes to the direct entries of one directory from
+a background thread, using inotify on Linux and periodic `scandir` snapshots
+elsewhere or when asked to poll.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from pathlib import Path
+
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def _entry_key(entry_stat):
+    return (
+        entry_stat.st_dev,
+        entry_stat.st_ino,
+        entry_stat.st_mtime_ns,
+        entry_stat.st_size,
+        entry_stat.st_mode,
+    )
+
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+_INOTIFY_FILE_EVENTS = (
+    _IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+    | _IN_CREATE | _IN_DELETE
+)
+_INOTIFY_ROOT_EVENTS = _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_Q_OVERFLOW | _IN_IGNORED
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        return libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+
+class DirectoryWatcher:
+    """Background watcher that reports changes to the entries of one directory.
+
+    `on_change(name)` is called from the watcher thread with the file
+    name that changed, or with None when the whole directory must be treated
+    as changed (the root was replaced, the event queue overflowed, or the
+    watch was re-established). A watch established on the first attempt is
+    not reported. `active` is True only while changes are
+    guaranteed to be reported; callers fall back to their own validation
+    otherwise.
+
+    `auto` uses inotify where available and polls the directory every
+    `poll_interval` seconds elsewhere. `poll` always polls, which is needed
+    for bind mounts whose host-side writes do not raise inotify events.
+    """
+
+    def __init__(
+        self,
+        root,
+        on_change,
+        mode="auto",
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        thread_name="agentbox-directory-watcher",
+    ):
+        self.root = Path(root)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.thread_name = thread_name
+        self._inotify = _load_inotify() if mode == "auto" else None
+        self.mode = "inotify" if self._inotify is not None else "poll"
+        self.active = False
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self._wake_fd = None
+
+    def start(self):
+        """Start the watcher thread and wait for its first watch or snapshot.
+
+        Waiting means a change made after `start()` returns is never missed.
+        """
+        if self._thread is not None:
+            return
+        target = self._run_inotify if self.mode == "inotify" else self._run_poll
+        self._thread = threading.Thread(
+            target=target,
+            name=self.thread_name,
+            daemon=True,
+        )
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+
+    def stop(self):
+        self._stop.set()
+        if self._wake_fd is not None:
+            try:
+                os.write(self._wake_fd, b"\0")
+            except OSError:  # pragma: no cover - the thread already closed the pipe.
+                pass
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=max(self.poll_interval, 1.0) + 1.0)
+        self.active = False
+
+    def _notify(self, name):
+        try:
+            self.on_change(name)
+        except Exception:  # pragma: no cover - a callback bug must not kill the watcher.
+            pass
+
+    def _run_poll(self):
+        previous = self._snapshot()
+        self.active = previous is not None
+        self._ready.set()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            if current is None or previous is None:
+                if current != previous:
+                    self._notify(None)
+            else:
+                for name in previous.keys() | current.keys():
+                    if previous.get(name) != current.get(name):
+                        self._notify(name)
+            previous = current
+            self.active = current is not None
+        self.active = False
+
+    def _snapshot(self):
+        try:
+            root_stat = self.root.stat()
+            entries = {}
+            with os.scandir(self.root) as iterator:
+                for entry in iterator:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    entries[entry.name] = _entry_key(entry_stat)
+        except OSError:
+            return None
+        entries[None] = (root_stat.st_dev, root_stat.st_ino, root_stat.st_mode)
+        return entries
+
+    def _run_inotify(self):
+        inotify_init1, inotify_add_watch = self._inotify
+        fd = inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            self.mode = "poll"
+            self._run_poll()
+            return
+        wake_read_fd, self._wake_fd = os.pipe()
+        # Nothing can have been missed before the first attempt to watch.
+        missed_changes = False
+        try:
+            while not self._stop.is_set():
+                watch = inotify_add_watch(
+                    fd,
+                    os.fsencode(self.root),
+                    _INOTIFY_FILE_EVENTS | _INOTIFY_ROOT_EVENTS | _IN_ONLYDIR,
+                )
+                if watch < 0:
+                    missed_changes = True
+                    self._ready.set()
+                    self._stop.wait(self.poll_interval)
+                    continue
+                if missed_changes:
+                    # Changes made while there was no watch were not reported.
+                    self._notify(None)
+                self.active = True
+                self._ready.set()
+                self._read_inotify_events(fd, wake_read_fd)
+                self.active = False
+                self._notify(None)
+                missed_changes = True
+        finally:
+            self.active = False
+            self._ready.set()
+            os.close(fd)
+            os.close(wake_read_fd)
+            wake_fd, self._wake_fd = self._wake_fd, None
+            os.close(wake_fd)
+
+    def _read_inotify_events(self, fd, wake_read_fd):
+        while not self._stop.is_set():
+            readable, _, _ = select.select([fd, wake_read_fd], [], [])
+            if fd not in readable:
+                continue
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(data):
+                _, mask, _, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = data[offset:offset + name_length].rstrip(b"\0")
+                offset += name_length
+                if mask & _INOTIFY_ROOT_EVENTS:
+                    # The watch is gone or events were lost; re-establish it.
+                    return
+                if name:
+                    self._notify(os.fsdecode(name))
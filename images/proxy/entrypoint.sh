@@ -7,14 +7,19 @@ set -e
 CA_DIR="/home/mitmproxy/.mitmproxy"
 EXPORT_DIR="/ca-export"
 RENDERED_POLICY_PATH="${AGENTBOX_RENDERED_POLICY_PATH:-/tmp/agent-sandbox-policy.yaml}"
+# Compiled form of the rendered policy; the enforcer loads it at startup and
+# falls back to the YAML if it is missing or does not match.
+COMPILED_POLICY_PATH="${AGENTBOX_COMPILED_POLICY_PATH:-/tmp/agent-sandbox-policy.compiled}"
 CREDENTIAL_SHIM_INIT_PATH="${AGENTBOX_CREDENTIAL_SHIM_INIT_PATH:-/run/agentbox/credential-shims/init.zsh}"
 # Sanitized allowlist exported to a volume the agent container mounts read-only.
 PUBLIC_POLICY_PATH="${AGENTBOX_PUBLIC_POLICY_PATH:-/run/agentbox/policy.yaml}"
 
-# Generate the CA if it doesn't exist yet
+# Generate the CA if it doesn't exist yet. mitmproxy's certificate store
+# creates it directly; running mitmdump until a timeout kills it is only the
+# fallback, since it always costs the full 5 seconds.
 if [ ! -f "$CA_DIR/mitmproxy-ca-cert.pem" ]; then
-  # Run mitmdump briefly to trigger CA generation
-  timeout 5 mitmdump --set confdir="$CA_DIR" || true
+  python3 -c 'import sys; from mitmproxy.certs import CertStore; CertStore.from_store(sys.argv[1], "mitmproxy", 2048)' "$CA_DIR" \
+    || timeout 5 mitmdump --set confdir="$CA_DIR" || true
 fi
 
 # Copy only the public certificate to the export volume
@@ -22,13 +27,24 @@ if [ -f "$CA_DIR/mitmproxy-ca-cert.pem" ] && [ -d "$EXPORT_DIR" ]; then
   cp "$CA_DIR/mitmproxy-ca-cert.pem" "$EXPORT_DIR/ca.crt"
 fi
 
-/usr/local/bin/render-policy --output "$RENDERED_POLICY_PATH" --credential-shim-output "$CREDENTIAL_SHIM_INIT_PATH" --public-output "$PUBLIC_POLICY_PATH"
-export POLICY_PATH="$RENDERED_POLICY_PATH"
 export AGENTBOX_CREDENTIAL_SHIM_INIT_PATH="$CREDENTIAL_SHIM_INIT_PATH"
 # Exported so the in-process SIGHUP reload path refreshes the agent-visible
 # allowlist too, keeping it in sync with hot policy reloads (not just restarts).
 export AGENTBOX_PUBLIC_POLICY_PATH="$PUBLIC_POLICY_PATH"
 
+# By default the enforcer renders and compiles the policy itself when mitmdump
+# loads it, in log mode too, writing the credential shim and public allowlist
+# on the way. That saves a separate render-policy interpreter and the rendered
+# YAML round trip, so RENDERED_POLICY_PATH is only written by the
+# PROXY_STARTUP_RENDER=0 path below.
+if [ "${PROXY_STARTUP_RENDER:-1}" = "0" ]; then
+  /usr/local/bin/render-policy --output "$RENDERED_POLICY_PATH" --credential-shim-output "$CREDENTIAL_SHIM_INIT_PATH" --public-output "$PUBLIC_POLICY_PATH" --compiled-output "$COMPILED_POLICY_PATH"
+  export POLICY_PATH="$RENDERED_POLICY_PATH"
+  export POLICY_ARTIFACT_PATH="$COMPILED_POLICY_PATH"
+else
+  export PROXY_STARTUP_RENDER=1
+fi
+
 # Run mitmdump with all passed arguments, using the same confdir
 # --quiet suppresses mitmproxy's built-in logging (we use our own JSON logs)
 exec mitmdump --quiet --set confdir="$CA_DIR" "$@"
@@ -3,26 +3,61 @@ Backend-neutral secret resolution for proxy-side header injection.
 
 The first backend is intentionally small: `file:<absolute-root>` maps each
 logical secret ID to one direct child file under the root. File-backed secrets
-are read at request time. A file created or modified inside an already-mounted
-source is visible on the next `resolve()` call without a proxy reload.
+are read at request time through a small cache: a resolved secret is reused for
+up to `AGENTBOX_SECRET_CACHE_TTL` seconds (default 1), and after that only while
+the file's device, inode, mtime and size are unchanged. A file created or
+modified inside an already-mounted source is visible once the TTL lapses,
+without a proxy reload.
+
+With `AGENTBOX_SECRET_WATCH` set to `auto` (inotify on Linux, polling
+elsewhere) or `poll`, a background watcher invalidates cached secrets when
+their files change instead, and cached values are reused with no filesystem
+access until then.
+
+`unix:<absolute-socket-path>` asks a local daemon instead, so secrets never
+touch disk. The protocol is one JSON object per line in each direction over a
+persistent Unix stream connection:
+
+    -> {"op": "get", "id": "<secret-id>"}
+    <- {"ok": true, "value": "<secret text>", "ttl": 30}
+    <- {"ok": false, "error": "not_found"}
+
+`ttl` is optional and overrides the cache TTL for that secret. `error` is a
+short code; it is echoed in resolver errors, so it must never carry secret
+material.
 """
 
 from __future__ import annotations
 
 import base64
 import errno
+import json
 import os
+import socket
 import stat
 import sys
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 
 sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
 import policy_injection  # noqa: E402
+from directory_watcher import DirectoryWatcher  # noqa: E402
 
 
 SECRET_SOURCE_ENV = "AGENTBOX_SECRET_SOURCE"
+SECRET_CACHE_TTL_ENV = "AGENTBOX_SECRET_CACHE_TTL"
+DEFAULT_SECRET_CACHE_TTL = 1.0
+SECRET_WATCH_ENV = "AGENTBOX_SECRET_WATCH"
+SECRET_WATCH_INTERVAL_ENV = "AGENTBOX_SECRET_WATCH_INTERVAL"
+SECRET_WATCH_MODES = ("off", "auto", "poll")
+DEFAULT_SECRET_WATCH_INTERVAL = 2.0
 FILE_SOURCE_SCHEME = "file"
+UNIX_SOURCE_SCHEME = "unix"
+DEFAULT_UNIX_POOL_SIZE = 4
+DEFAULT_UNIX_TIMEOUT = 2.0
+_UNIX_MAX_RESPONSE_BYTES = 64 * 1024
 DEFAULT_SECRET_SOURCE = "file:/run/secrets/agentbox"
 _SECRET_READ_SIZE = 64 * 1024
 
@@ -54,6 +89,9 @@ class SecretResolutionWarning:
 @dataclass(frozen=True, repr=False)
 class SecretValue:
     _text: str
+    # Rendered header values keyed by transform. Filled by render_header_value
+    # so a cached SecretValue also caches its Bearer/Basic strings.
+    _rendered: dict = field(default_factory=dict, compare=False, hash=False)
 
     @classmethod
     def from_text(cls, text):
@@ -86,10 +124,30 @@ class SecretResolver:
         source = env.get(SECRET_SOURCE_ENV)
         if source is None or not str(source).strip():
             source = DEFAULT_SECRET_SOURCE
-        return cls.from_source(source)
+
+        watch_mode = str(env.get(SECRET_WATCH_ENV) or "off").strip().lower()
+        if watch_mode not in SECRET_WATCH_MODES:
+            raise SecretResolverError(
+                f"{SECRET_WATCH_ENV} must be one of {list(SECRET_WATCH_MODES)}, "
+                f"got {watch_mode!r}"
+            )
+        return cls.from_source(
+            source,
+            cache_ttl=_env_seconds(env, SECRET_CACHE_TTL_ENV, DEFAULT_SECRET_CACHE_TTL),
+            watch_mode=watch_mode,
+            watch_interval=_env_seconds(
+                env, SECRET_WATCH_INTERVAL_ENV, DEFAULT_SECRET_WATCH_INTERVAL
+            ),
+        )
 
     @classmethod
-    def from_source(cls, source):
+    def from_source(
+        cls,
+        source,
+        cache_ttl=DEFAULT_SECRET_CACHE_TTL,
+        watch_mode="off",
+        watch_interval=DEFAULT_SECRET_WATCH_INTERVAL,
+    ):
         if source is None or not str(source).strip():
             raise SecretResolverError(
                 f"{SECRET_SOURCE_ENV} must be set to a secret source such as "
@@ -104,26 +162,109 @@ class SecretResolver:
             )
 
         scheme = scheme.lower()
+        if scheme == UNIX_SOURCE_SCHEME:
+            if watch_mode != "off":
+                raise SecretResolverError(
+                    f"{SECRET_WATCH_ENV} only applies to file secret sources"
+                )
+            return UnixSocketSecretResolver(Path(value.strip()), cache_ttl=cache_ttl)
         if scheme != FILE_SOURCE_SCHEME:
             raise SecretResolverError(
-                f"Unsupported secret source scheme {scheme!r}; only 'file' is supported"
+                f"Unsupported secret source scheme {scheme!r}; expected 'file' or 'unix'"
             )
 
         root = Path(value.strip())
-        return FileSecretResolver(root)
+        return FileSecretResolver(
+            root,
+            cache_ttl=cache_ttl,
+            watch_mode=watch_mode,
+            watch_interval=watch_interval,
+        )
 
     def resolve(self, secret_id, context=None):
         raise NotImplementedError
 
 
+def _env_seconds(env, name, default):
+    value = env.get(name)
+    if value is None or not str(value).strip():
+        return default
+    try:
+        seconds = float(value)
+        if not seconds >= 0:
+            raise ValueError
+    except ValueError:
+        raise SecretResolverError(
+            f"{name} must be a non-negative number of seconds, got {value!r}"
+        ) from None
+    return seconds
+
+
+@dataclass
+class _CachedSecret:
+    resolution: SecretResolution
+    # (st_dev, st_ino, st_mtime_ns, st_size) of the file that was read.
+    file_key: tuple
+    # Root and file modes the permission warnings were computed from; a chmod
+    # does not touch mtime, so these are compared separately.
+    modes: tuple
+    checked_at: float
+
+
 class FileSecretResolver(SecretResolver):
-    def __init__(self, root):
+    """Resolve secrets from direct child files of one root directory.
+
+    The root is held open as a directory fd and secret files are looked up
+    relative to it (`lstat`/`open` with `dir_fd`), so each lookup is a single
+    path component that cannot traverse out of the root. The fd is reopened
+    when the root path starts pointing at a different directory.
+
+    Resolutions are cached per secret ID. Within `cache_ttl` seconds of the
+    last validation a cached value is returned without touching the
+    filesystem; after that the file is `lstat`ed and re-read only when its
+    identity, mtime or size changed. A symlink or non-regular file at the
+    secret path is rejected on every validation, cached or not.
+
+    The lock only guards the cache and root fd bookkeeping; filesystem reads
+    run outside it. Concurrent `resolve()` calls for the same ID wait for the
+    lookup already in flight, while other IDs, `invalidate()` and `close()`
+    proceed. A root fd replaced or closed while reads are in flight is only
+    closed once they finish.
+
+    `start_watching()` replaces the TTL with a `DirectoryWatcher`: while
+    its watch is established, cached values are only dropped when the watcher
+    reports a change.
+    """
+
+    def __init__(
+        self,
+        root,
+        cache_ttl=DEFAULT_SECRET_CACHE_TTL,
+        monotonic=time.monotonic,
+        watch_mode="off",
+        watch_interval=DEFAULT_SECRET_WATCH_INTERVAL,
+    ):
         root = Path(root)
         if not root.is_absolute():
             raise SecretResolverError(
                 f"file secret source root must be an absolute path, got {str(root)!r}"
             )
         self.root = root
+        self.cache_ttl = cache_ttl
+        self.monotonic = monotonic
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._inflight = {}
+        self._generation = 0
+        self._root_fd = None
+        self._root_identity = None
+        self._stale_root_fds = []
+        self._closed = False
+        self.watch_mode = watch_mode
+        self.watch_interval = watch_interval
+        self._watcher = None
+        self._on_rotated = None
+        self._on_reset = None
 
     def resolve(self, secret_id, context=None):
         del context
@@ -133,23 +274,149 @@ class FileSecretResolver(SecretResolver):
             _fail_secret,
         )
 
-        root_stat = self._stat_root()
+        cached = self.peek(normalized_id)
+        if cached is not None:
+            return cached
+
+        now = self.monotonic()
+        secret_path = self.root / normalized_id
+        if secret_path.parent != self.root:
+            raise SecretResolverError(
+                f"Secret ID {normalized_id!r} does not map to a direct child file"
+            )
+
+        with self._lock:
+            inflight = self._inflight.get(normalized_id)
+            leader = inflight is None
+            if leader:
+                inflight = _InflightLookup()
+                self._inflight[normalized_id] = inflight
+                generation = self._generation
+
+        if not leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise SecretResolverError(str(inflight.error))
+            return inflight.resolution
+
+        try:
+            inflight.resolution = self._resolve_uncached(
+                normalized_id, secret_path, now, generation
+            )
+        except BaseException as error:
+            inflight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[normalized_id]
+                if isinstance(inflight.error, SecretResolverError):
+                    self._cache.pop(normalized_id, None)
+                if not self._inflight:
+                    self._release_root_fds()
+            inflight.done.set()
+        return inflight.resolution
+
+    def peek(self, secret_id):
+        """Return the cached resolution if it is usable without any I/O.
+
+        Returns None when the secret must go through `resolve()`.
+        """
+        cached = self._cache.get(secret_id)
+        if cached is None:
+            return None
+        watcher = self._watcher
+        if watcher is not None and watcher.active:
+            return cached.resolution
+        if self.monotonic() - cached.checked_at < self.cache_ttl:
+            return cached.resolution
+        return None
+
+    def invalidate(self, secret_id=None):
+        """Drop the cached resolution for one secret ID, or all of them.
+
+        Returns the secret IDs that were actually cached.
+        """
+        with self._lock:
+            # Reads in flight started before this call must not cache what they read.
+            self._generation += 1
+            if secret_id is None:
+                dropped = list(self._cache)
+                self._cache.clear()
+            elif self._cache.pop(secret_id, None) is not None:
+                dropped = [secret_id]
+            else:
+                dropped = []
+        return dropped
+
+    def start_watching(self, on_rotated=None, on_reset=None):
+        """Start the directory watcher if `watch_mode` enables one.
+
+        Both callbacks run on the watcher thread. `on_rotated(secret_id)` is
+        called for every cached secret whose file changed. When the watcher
+        can only report that the whole directory may have changed (the watch
+        was lost or re-established), the cache is dropped and
+        `on_reset(count)` is called once with the number of secrets dropped.
+        Returns the watcher mode in use (`inotify` or `poll`), or None when
+        watching is off.
+        """
+        if self.watch_mode == "off":
+            return None
+        if self._watcher is None:
+            self._on_rotated = on_rotated
+            self._on_reset = on_reset
+            self._watcher = DirectoryWatcher(
+                self.root,
+                self._handle_watch_change,
+                mode=self.watch_mode,
+                poll_interval=self.watch_interval,
+                thread_name="agentbox-secret-watcher",
+            )
+            self._watcher.start()
+        return self._watcher.mode
+
+    def _handle_watch_change(self, secret_id):
+        dropped = self.invalidate(secret_id)
+        if secret_id is None:
+            # Nothing says which secrets changed, so none are named.
+            if dropped and self._on_reset is not None:
+                self._on_reset(len(dropped))
+            return
+        for dropped_id in dropped:
+            if self._on_rotated is not None:
+                self._on_rotated(dropped_id)
+
+    def close(self):
+        watcher = self._watcher
+        self._watcher = None
+        if watcher is not None:
+            watcher.stop()
+        with self._lock:
+            self._closed = True
+            self._generation += 1
+            self._cache.clear()
+            if not self._inflight:
+                self._release_root_fds()
+
+    def _resolve_uncached(self, secret_id, secret_path, now, generation):
+        root_fd, root_mode, generation = self._open_root(generation)
         warnings = list(
             _permission_warnings(
                 self.root,
-                root_stat.st_mode,
+                root_mode,
                 subject="secret source directory",
                 recommended_mode="700",
             )
         )
 
-        secret_path = self.root / normalized_id
-        if secret_path.parent != self.root:
-            raise SecretResolverError(
-                f"Secret ID {normalized_id!r} does not map to a direct child file"
-            )
+        file_stat = self._lstat_secret(root_fd, secret_id)
+        file_key = _file_key(file_stat)
+        modes = (root_mode, file_stat.st_mode)
+        with self._lock:
+            cached = self._cache.get(secret_id)
+            if cached is not None and cached.file_key == file_key and cached.modes == modes:
+                cached.checked_at = now
+                return cached.resolution
 
-        file_stat = self._lstat_secret(secret_path, normalized_id)
         warnings.extend(
             _permission_warnings(
                 secret_path,
@@ -159,12 +426,67 @@ class FileSecretResolver(SecretResolver):
             )
         )
 
-        raw_secret = _read_regular_file(secret_path, normalized_id)
-        return SecretResolution(
-            secret_id=normalized_id,
-            value=SecretValue.from_text(_decode_secret_bytes(raw_secret, normalized_id)),
+        raw_secret, opened_stat = _read_regular_file(root_fd, secret_id)
+        resolution = SecretResolution(
+            secret_id=secret_id,
+            value=SecretValue.from_text(_decode_secret_bytes(raw_secret, secret_id)),
             warnings=tuple(warnings),
         )
+        with self._lock:
+            if generation == self._generation:
+                self._cache[secret_id] = _CachedSecret(
+                    resolution=resolution,
+                    file_key=_file_key(opened_stat),
+                    modes=modes,
+                    checked_at=now,
+                )
+        return resolution
+
+    def _open_root(self, generation):
+        root_stat = self._stat_root()
+        identity = (root_stat.st_dev, root_stat.st_ino)
+        with self._lock:
+            if self._root_fd is not None and identity == self._root_identity:
+                return self._root_fd, root_stat.st_mode, generation
+
+        flags = os.O_RDONLY
+        if hasattr(os, "O_DIRECTORY"):
+            flags |= os.O_DIRECTORY
+        try:
+            fd = os.open(self.root, flags)
+        except FileNotFoundError:
+            raise SecretResolverError(
+                f"Secret source root does not exist: {self.root}"
+            ) from None
+        except NotADirectoryError:
+            raise SecretResolverError(
+                f"Secret source root is not a directory: {self.root}"
+            ) from None
+        except OSError:
+            raise SecretResolverError(
+                f"Secret source root is not accessible: {self.root}"
+            ) from None
+
+        opened_stat = os.fstat(fd)
+        with self._lock:
+            if self._root_fd is not None:
+                self._stale_root_fds.append(self._root_fd)
+            self._root_fd = fd
+            self._root_identity = (opened_stat.st_dev, opened_stat.st_ino)
+            self._generation += 1
+            self._cache.clear()
+            generation = self._generation
+        return fd, opened_stat.st_mode, generation
+
+    def _release_root_fds(self):
+        # Called with the lock held once no reads are in flight.
+        if self._closed and self._root_fd is not None:
+            self._stale_root_fds.append(self._root_fd)
+            self._root_fd = None
+            self._root_identity = None
+        stale, self._stale_root_fds = self._stale_root_fds, []
+        for fd in stale:
+            os.close(fd)
 
     def _stat_root(self):
         try:
@@ -184,9 +506,9 @@ class FileSecretResolver(SecretResolver):
             )
         return root_stat
 
-    def _lstat_secret(self, secret_path, secret_id):
+    def _lstat_secret(self, root_fd, secret_id):
         try:
-            file_stat = secret_path.lstat()
+            file_stat = os.stat(secret_id, dir_fd=root_fd, follow_symlinks=False)
         except FileNotFoundError:
             raise SecretResolverError(
                 f"Secret file not found for secret ID {secret_id!r}"
@@ -207,6 +529,228 @@ class FileSecretResolver(SecretResolver):
         return file_stat
 
 
+def _file_key(file_stat):
+    return (file_stat.st_dev, file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+
+
+class _InflightLookup:
+    __slots__ = ("done", "resolution", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.resolution = None
+        self.error = None
+
+
+class _DaemonConnection:
+    def __init__(self, path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.sock.settimeout(timeout)
+            self.sock.connect(str(path))
+        except BaseException:
+            self.sock.close()
+            raise
+        self.reader = self.sock.makefile("rb")
+
+    def request(self, payload):
+        self.sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        line = self.reader.readline(_UNIX_MAX_RESPONSE_BYTES + 1)
+        if not line.endswith(b"\n"):
+            raise ConnectionError("secret daemon closed the connection or sent an oversized reply")
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class UnixSocketSecretResolver(SecretResolver):
+    """Resolve secrets from a local daemon over a Unix stream socket.
+
+    Up to `pool_size` persistent connections are kept open and reused. Each
+    resolution is cached until its TTL expires, and concurrent `resolve()`
+    calls for the same ID while a lookup is in flight wait for that lookup
+    instead of sending their own request. A pooled connection that fails is
+    discarded and the request is retried once on a fresh connection, which
+    covers a restarted daemon.
+    """
+
+    def __init__(
+        self,
+        socket_path,
+        cache_ttl=DEFAULT_SECRET_CACHE_TTL,
+        pool_size=DEFAULT_UNIX_POOL_SIZE,
+        timeout=DEFAULT_UNIX_TIMEOUT,
+        monotonic=time.monotonic,
+    ):
+        socket_path = Path(socket_path)
+        if not socket_path.is_absolute():
+            raise SecretResolverError(
+                f"unix secret source must be an absolute socket path, got {str(socket_path)!r}"
+            )
+        self.socket_path = socket_path
+        self.cache_ttl = cache_ttl
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.monotonic = monotonic
+        self._lock = threading.Lock()
+        self._pool_available = threading.Condition(self._lock)
+        self._idle = []
+        self._open_connections = 0
+        self._cache = {}
+        self._inflight = {}
+
+    def resolve(self, secret_id, context=None):
+        del context
+        normalized_id = policy_injection.normalize_secret_id(
+            secret_id,
+            "secret_id",
+            _fail_secret,
+        )
+        cached = self.peek(normalized_id)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            inflight = self._inflight.get(normalized_id)
+            leader = inflight is None
+            if leader:
+                inflight = _InflightLookup()
+                self._inflight[normalized_id] = inflight
+
+        if not leader:
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise SecretResolverError(str(inflight.error))
+            return inflight.resolution
+
+        try:
+            inflight.resolution = self._fetch(normalized_id)
+        except BaseException as error:
+            inflight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[normalized_id]
+            inflight.done.set()
+        return inflight.resolution
+
+    def peek(self, secret_id):
+        """Return the cached resolution if its TTL has not expired."""
+        cached = self._cache.get(secret_id)
+        if cached is None:
+            return None
+        resolution, expires_at = cached
+        if self.monotonic() >= expires_at:
+            return None
+        return resolution
+
+    def invalidate(self, secret_id=None):
+        with self._lock:
+            if secret_id is None:
+                dropped = list(self._cache)
+                self._cache.clear()
+            elif self._cache.pop(secret_id, None) is not None:
+                dropped = [secret_id]
+            else:
+                dropped = []
+        return dropped
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open_connections -= len(idle)
+            self._cache.clear()
+        for connection in idle:
+            connection.close()
+
+    def _fetch(self, secret_id):
+        reply = None
+        for attempt in range(2):
+            connection, reused = self._acquire_connection(secret_id)
+            try:
+                reply = connection.request({"op": "get", "id": secret_id})
+            except (OSError, ValueError) as error:
+                self._discard_connection(connection)
+                if reused and attempt == 0:
+                    continue
+                raise SecretResolverError(
+                    f"Secret daemon request failed for secret ID {secret_id!r}: "
+                    f"{type(error).__name__}"
+                ) from None
+            self._release_connection(connection)
+            break
+
+        if not isinstance(reply, dict):
+            raise SecretResolverError(
+                f"Secret daemon sent a malformed reply for secret ID {secret_id!r}"
+            )
+        if reply.get("ok") is not True:
+            code = reply.get("error")
+            if code == "not_found":
+                raise SecretResolverError(
+                    f"Secret daemon has no secret for secret ID {secret_id!r}"
+                )
+            if not isinstance(code, str) or not code.replace("_", "").isalnum():
+                code = "unknown_error"
+            raise SecretResolverError(
+                f"Secret daemon rejected secret ID {secret_id!r}: {code}"
+            )
+
+        value = reply.get("value")
+        if not isinstance(value, str):
+            raise SecretResolverError(
+                f"Secret daemon sent a malformed reply for secret ID {secret_id!r}"
+            )
+        _validate_secret_text(value, secret_id, source="Secret daemon value")
+
+        ttl = reply.get("ttl", self.cache_ttl)
+        if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl < 0:
+            ttl = self.cache_ttl
+        resolution = SecretResolution(
+            secret_id=secret_id,
+            value=SecretValue.from_text(value),
+        )
+        with self._lock:
+            self._cache[secret_id] = (resolution, self.monotonic() + ttl)
+        return resolution
+
+    def _acquire_connection(self, secret_id):
+        with self._lock:
+            while True:
+                if self._idle:
+                    return self._idle.pop(), True
+                if self._open_connections < self.pool_size:
+                    self._open_connections += 1
+                    break
+                if not self._pool_available.wait(timeout=self.timeout):
+                    raise SecretResolverError(
+                        f"Secret daemon connection pool exhausted for secret ID {secret_id!r}"
+                    )
+        try:
+            return _DaemonConnection(self.socket_path, self.timeout), False
+        except OSError as error:
+            with self._lock:
+                self._open_connections -= 1
+                self._pool_available.notify()
+            raise SecretResolverError(
+                f"Secret daemon is not reachable at {self.socket_path}: "
+                f"{error.strerror or type(error).__name__}"
+            ) from None
+
+    def _release_connection(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+            self._pool_available.notify()
+
+    def _discard_connection(self, connection):
+        connection.close()
+        with self._lock:
+            self._open_connections -= 1
+            self._pool_available.notify()
+
+
 def _permission_warnings(path, mode, subject, recommended_mode):
     unsafe_bits = stat.S_IMODE(mode) & (
         stat.S_IRGRP | stat.S_IWGRP | stat.S_IROTH | stat.S_IWOTH
@@ -227,13 +771,13 @@ def _permission_warnings(path, mode, subject, recommended_mode):
     )
 
 
-def _read_regular_file(secret_path, secret_id):
+def _read_regular_file(root_fd, secret_id):
     flags = os.O_RDONLY
     if hasattr(os, "O_NOFOLLOW"):
         flags |= os.O_NOFOLLOW
 
     try:
-        fd = os.open(secret_path, flags)
+        fd = os.open(secret_id, flags, dir_fd=root_fd)
     except FileNotFoundError:
         raise SecretResolverError(
             f"Secret file not found for secret ID {secret_id!r}"
@@ -265,7 +809,7 @@ def _read_regular_file(secret_path, secret_id):
             if not chunk:
                 break
             chunks.append(chunk)
-        return b"".join(chunks)
+        return b"".join(chunks), opened_stat
     finally:
         os.close(fd)
 
@@ -294,26 +838,73 @@ def _decode_secret_bytes(raw_secret, secret_id):
     return decoded
 
 
+def _validate_secret_text(text, secret_id, source):
+    if "\x00" in text or "\r" in text or "\n" in text:
+        raise SecretResolverError(
+            f"{source} for secret ID {secret_id!r} contains invalid secret bytes"
+        )
+    if not text:
+        raise SecretResolverError(
+            f"{source} for secret ID {secret_id!r} must not be empty"
+        )
+
+
 def render_header_value(secret_value, transform):
     if not isinstance(secret_value, SecretValue):
         raise SecretResolverError("secret_value must be a SecretValue")
 
+    try:
+        cache_key = tuple(sorted(transform.items()))
+        rendered = secret_value._rendered.get(cache_key)
+    except (AttributeError, TypeError):
+        cache_key = None
+        rendered = None
+    if rendered is not None:
+        return rendered
+
+    rendered = _render_header_value(secret_value, transform)
+    if cache_key is not None:
+        secret_value._rendered[cache_key] = rendered
+    return rendered
+
+
+def render_compiled_header_value(secret_value, render_key):
+    """Render a header value for a transform already validated at policy load.
+
+    `render_key` is `(type, username)` as precomputed on the policy's
+    `HeaderInjection`. Skips re-validating the transform and reuses the value
+    cached on this `SecretValue`, so each secret version renders once per
+    transform.
+    """
+    if not isinstance(secret_value, SecretValue):
+        raise SecretResolverError("secret_value must be a SecretValue")
+
+    rendered = secret_value._rendered.get(render_key)
+    if rendered is None:
+        transform_type, username = render_key
+        rendered = _render_transform(secret_value.as_text(), transform_type, username)
+        secret_value._rendered[render_key] = rendered
+    return rendered
+
+
+def _render_header_value(secret_value, transform):
     normalized = policy_injection.normalize_header_transform(
         transform,
         "header",
         _fail_secret,
     )
-    secret_text = secret_value.as_text()
+    return _render_transform(secret_value.as_text(), normalized["type"], normalized.get("username"))
+
 
-    if normalized["type"] == "bearer":
+def _render_transform(secret_text, transform_type, username):
+    if transform_type == "bearer":
         return f"Bearer {secret_text}"
 
-    if normalized["type"] == "basic":
-        username = normalized["username"]
+    if transform_type == "basic":
         credentials = f"{username}:{secret_text}".encode("utf-8")
         encoded = base64.b64encode(credentials).decode("ascii")
         return f"Basic {encoded}"
 
     raise SecretResolverError(
-        f"Unsupported header transform type {normalized['type']!r}"
+        f"Unsupported header transform type {transform_type!r}"
     )
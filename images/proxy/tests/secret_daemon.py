@@ -0,0 +1,121 @@
+"""Reference stand-in for a `unix:` secret source daemon.
+
+Speaks the line-delimited JSON protocol described in `secret_resolver.py` over
+a Unix stream socket. Tests start it in-process; it can also be run by hand to
+try `AGENTBOX_SECRET_SOURCE=unix:<path>` against a proxy:
+
+    python images/proxy/tests/secret_daemon.py /tmp/agentbox-secrets.sock \
+        --secret github.agent-sandbox.push-token=ghp_example
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+
+class StandInSecretDaemon:
+    """Threaded secret daemon holding secrets in memory.
+
+    `delay` sleeps before every reply so tests can hold lookups in flight.
+    `requests` and `connections` count what the resolver actually sent.
+    """
+
+    def __init__(self, socket_path, secrets=None, ttl=None, delay=0.0):
+        self.socket_path = str(socket_path)
+        self.secrets = dict(secrets or {})
+        self.ttl = ttl
+        self.delay = delay
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._clients = set()
+
+    def start(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with daemon._lock:
+                    daemon.connections += 1
+                    daemon._clients.add(self.connection)
+                for line in self.rfile:
+                    reply = daemon.reply(line)
+                    self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        # Drop open client connections too, like a daemon process exiting.
+        with self._lock:
+            clients, self._clients = self._clients, set()
+        for client in clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def reply(self, line):
+        with self._lock:
+            self.requests += 1
+        if self.delay:
+            time.sleep(self.delay)
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "bad_request"}
+        if not isinstance(request, dict) or request.get("op") != "get":
+            return {"ok": False, "error": "bad_request"}
+
+        value = self.secrets.get(request.get("id"))
+        if value is None:
+            return {"ok": False, "error": "not_found"}
+        reply = {"ok": True, "value": value}
+        if self.ttl is not None:
+            reply["ttl"] = self.ttl
+        return reply
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("socket_path")
+    parser.add_argument("--secret", action="append", default=[], metavar="ID=VALUE")
+    parser.add_argument("--ttl", type=float)
+    args = parser.parse_args()
+
+    secrets = dict(item.split("=", 1) for item in args.secret)
+    daemon = StandInSecretDaemon(args.socket_path, secrets, ttl=args.ttl).start()
+    try:
+        daemon._thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -154,6 +154,54 @@ class PolicyMatcherTests(unittest.TestCase):
         self.assertEqual(decision.action, "allowed")
         self.assertEqual(decision.matched_host, "*.api.github.com")
 
+    def test_wildcard_matches_apex_and_subdomains_but_not_label_fragments(self):
+        matcher = self.matcher_from_domains(["*.example.com"])
+
+        self.assertTrue(matcher.is_allowed("example.com"))
+        self.assertTrue(matcher.is_allowed("API.Example.COM"))
+        self.assertTrue(matcher.is_allowed("a.b.example.com"))
+        self.assertFalse(matcher.is_allowed("badexample.com"))
+        self.assertFalse(matcher.is_allowed("example.com.evil"))
+        self.assertFalse(matcher.is_allowed("com"))
+
+    def test_host_index_matches_linear_scan_precedence(self):
+        domains = [
+            "*.github.com",
+            "api.github.com",
+            "*.api.github.com",
+            "*.com",
+            "example.com",
+            "*.example.com",
+            "*.v3.api.github.com",
+            "*.github.com",
+        ]
+        matcher = self.matcher_from_domains(domains)
+        hosts = [
+            "github.com",
+            "api.github.com",
+            "API.GITHUB.COM",
+            "v3.api.github.com",
+            "x.v3.api.github.com",
+            "raw.github.com",
+            "example.com",
+            "www.example.com",
+            "other.com",
+            "example.org",
+            "",
+        ]
+
+        for host in hosts:
+            with self.subTest(host=host):
+                expected = next(
+                    (
+                        record
+                        for record in matcher.host_records
+                        if record.matches_host(host)
+                    ),
+                    None,
+                )
+                self.assertIs(matcher._find_host_record(host), expected)
+
     def test_connect_blocks_when_no_host_record_matches(self):
         matcher = self.matcher_from_domains(["api.openai.com"])
 
@@ -538,6 +586,26 @@ class PolicyMatcherTests(unittest.TestCase):
         self.assertEqual(raw.action, "blocked")
         self.assertEqual(raw.reason, "no_rule_matched")
 
+    def test_uri_component_normalization_handles_malformed_and_mixed_escapes(self):
+        normalize = self.policy_matcher.PolicyMatcher._normalize_uri_component_for_match
+        cases = {
+            "/v1/messages": "/v1/messages",
+            "/%7Esmith/%2d%5f%2E": "/~smith/-_.",
+            "/a%2fb%3a": "/a%2Fb%3A",
+            "/caf%c3%a9": "/caf%C3%A9",
+            "/%%41": "/%A",
+            "/100%": "/100%",
+            "/%4": "/%4",
+            "/%zz%41": "/%zzA",
+            "%41": "A",
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(normalize(value), expected)
+
+        unescaped = "/repos/owner/repo/contents/README.md"
+        self.assertIs(normalize(unescaped), unescaped)
+
     def test_request_matches_explicit_empty_query_constraint(self):
         matcher = self.matcher_from_domains(
             [
@@ -659,6 +727,193 @@ class PolicyMatcherTests(unittest.TestCase):
         self.assertEqual(encoded_plus.action, "allowed")
         self.assertEqual(raw_plus.action, "blocked")
 
+    def test_request_selects_lowest_index_rule_across_path_matcher_kinds(self):
+        matcher = self.matcher_from_domains(
+            [
+                {
+                    "host": "api.github.com",
+                    "rules": [
+                        {
+                            "schemes": ["https"],
+                            "methods": ["POST"],
+                            "path": {"prefix": "/repos/"},
+                        },
+                        {
+                            "schemes": ["https"],
+                            "path": {"prefix": "/repos/owner/"},
+                            "path_case_insensitive": True,
+                        },
+                        {
+                            "schemes": ["https"],
+                            "methods": ["GET"],
+                            "path": {"exact": "/repos/owner/repo/issues"},
+                        },
+                        {"schemes": ["https"]},
+                    ],
+                }
+            ]
+        )
+
+        cases = [
+            ("GET", "/repos/Owner/repo/issues", 1),
+            ("GET", "/repos/other/repo/issues", 3),
+            ("POST", "/repos/owner/repo/issues", 0),
+            ("DELETE", "/repos/OWNER/x", 1),
+            ("DELETE", "/", 3),
+        ]
+        for method, path, expected_index in cases:
+            with self.subTest(method=method, path=path):
+                decision = matcher.evaluate_request("api.github.com", "https", method, path)
+                self.assertEqual(decision.action, "allowed")
+                self.assertEqual(decision.matched_rule_index, expected_index)
+
+    def test_request_matches_overlapping_path_prefixes(self):
+        prefixes = ["/a/bcd", "/a/bc", "/a/bx/", "/a/b", "/"]
+        matcher = self.matcher_from_domains(
+            [
+                {
+                    "host": "example.com",
+                    "rules": [
+                        {"schemes": ["https"], "path": {"prefix": prefix}}
+                        for prefix in prefixes
+                    ],
+                }
+            ]
+        )
+
+        cases = [
+            ("/a/bcde", 0),
+            ("/a/bc", 1),
+            ("/a/bx/y", 2),
+            ("/a/bx", 3),
+            ("/a/b", 3),
+            ("/a/", 4),
+            ("/z", 4),
+        ]
+        for path, expected_index in cases:
+            with self.subTest(path=path):
+                decision = matcher.evaluate_request("example.com", "https", "GET", path)
+                self.assertEqual(decision.matched_rule_index, expected_index)
+
+    def test_rule_index_matches_linear_rule_scan(self):
+        rules = []
+        for owner in ("alpha", "beta"):
+            base = f"/repos/{owner}/repo"
+            rules.extend([
+                {
+                    "schemes": ["https"],
+                    "methods": ["GET", "HEAD"],
+                    "path": {"exact": base},
+                    "path_case_insensitive": True,
+                },
+                {
+                    "schemes": ["https"],
+                    "methods": ["GET", "HEAD"],
+                    "path": {"prefix": base + "/"},
+                    "path_case_insensitive": True,
+                },
+                {
+                    "schemes": ["https"],
+                    "methods": ["GET"],
+                    "path": {"exact": f"/{owner}/repo.git/info/refs"},
+                    "query": {"exact": {"service": ["git-upload-pack"]}},
+                },
+                {
+                    "schemes": ["http"],
+                    "path": {"prefix": f"/{owner}/"},
+                },
+            ])
+        rules.append({"schemes": ["https"], "methods": ["OPTIONS"]})
+        matcher = self.matcher_from_domains([{"host": "example.com", "rules": rules}])
+        record = matcher.host_records[0]
+
+        requests = []
+        for scheme in ("http", "https"):
+            for method in ("GET", "HEAD", "POST", "OPTIONS"):
+                for target in (
+                    "/",
+                    "/repos/alpha/repo",
+                    "/repos/ALPHA/Repo/pulls",
+                    "/repos/beta/repository",
+                    "/repos/beta/repo/",
+                    "/alpha/repo.git/info/refs?service=git-upload-pack",
+                    "/alpha/repo.git/info/refs?service=git-receive-pack",
+                    "/Alpha/repo.git/info/refs?service=git-upload-pack",
+                    "/beta/anything",
+                ):
+                    requests.append((scheme, method, target))
+
+        for scheme, method, target in requests:
+            with self.subTest(scheme=scheme, method=method, target=target):
+                path, query, _ = matcher._normalize_request_target(target)
+                expected = next(
+                    (
+                        (rule_index, rule)
+                        for rule_index, rule in enumerate(record.rules)
+                        if rule.matches_request(scheme, method, path, query)
+                    ),
+                    None,
+                )
+                self.assertEqual(
+                    record.rule_index.find(scheme, method, path, query),
+                    expected,
+                )
+
+    def test_request_query_is_normalized_only_when_a_candidate_rule_needs_it(self):
+        matcher = self.matcher_from_domains(
+            [
+                {
+                    "host": "api.github.com",
+                    "rules": [
+                        {"schemes": ["https"], "path": {"prefix": "/repos/"}},
+                    ],
+                },
+                {
+                    "host": "github.com",
+                    "rules": [
+                        {
+                            "schemes": ["https"],
+                            "path": {"exact": "/o/r.git/info/refs"},
+                            "query": {"exact": {"service": ["git-receive-pack"]}},
+                        },
+                        {
+                            "schemes": ["https"],
+                            "path": {"exact": "/o/r.git/info/refs"},
+                            "query": {"exact": {"service": ["git-upload-pack"]}},
+                        },
+                    ],
+                },
+            ]
+        )
+        long_query = "&".join(f"page{index}=%41" for index in range(200))
+
+        with mock.patch.object(
+            self.policy_matcher.PolicyMatcher,
+            "_normalize_query",
+            wraps=self.policy_matcher.PolicyMatcher._normalize_query,
+        ) as normalize_query:
+            path_only = matcher.evaluate_request(
+                "api.github.com",
+                "https",
+                "GET",
+                f"/repos/o/r/pulls?{long_query}",
+            )
+            self.assertEqual(normalize_query.call_count, 0)
+
+            git = matcher.evaluate_request(
+                "github.com",
+                "https",
+                "GET",
+                "/o/r.git/info/refs?service=git-upload-pack",
+            )
+            self.assertEqual(normalize_query.call_count, 1)
+
+        self.assertEqual(path_only.action, "allowed")
+        self.assertEqual(path_only.path, f"/repos/o/r/pulls?{long_query}")
+        self.assertEqual(git.action, "allowed")
+        self.assertEqual(git.matched_rule_index, 1)
+        self.assertEqual(git.path, "/o/r.git/info/refs?service=git-upload-pack")
+
     def test_request_blocks_with_scheme_not_permitted_when_host_matches_but_scheme_does_not(self):
         matcher = self.matcher_from_domains(
             [
@@ -716,6 +971,8 @@ class PolicyMatcherTests(unittest.TestCase):
         self.assertEqual(rule.transform.request.headers[0].name, "Authorization")
         self.assertEqual(rule.transform.request.headers[0].secret, "openai-api-token")
         self.assertEqual(rule.transform.request.headers[0].transform_type, "bearer")
+        self.assertEqual(rule.transform.request.headers[0].render_key, ("bearer", None))
+        self.assertEqual(rule.transform.request.target_names, frozenset({"authorization"}))
 
         allowed = matcher.evaluate_request(
             "api.openai.com",
@@ -739,6 +996,87 @@ class PolicyMatcherTests(unittest.TestCase):
         self.assertEqual(blocked.action, "blocked")
         self.assertEqual(blocked.reason, "no_rule_matched")
 
+    def test_decision_log_fields_are_built_once_and_omit_empty_fields(self):
+        matcher = self.matcher_from_domains(["api.openai.com"])
+
+        decision = matcher.evaluate_request("api.openai.com", "https", "GET", "/v1/models")
+
+        self.assertIs(decision.log_fields(), decision.log_fields())
+        self.assertEqual(
+            decision.log_fields(),
+            {
+                "phase": "request",
+                "action": "allowed",
+                "reason": decision.reason,
+                "host": "api.openai.com",
+                "scheme": "https",
+                "matched_host": "api.openai.com",
+                "method": "GET",
+                "path": "/v1/models",
+                "matched_rule_index": 0,
+            },
+        )
+        self.assertEqual(decision, type(decision)(**{
+            name: getattr(decision, name) for name in decision.to_metadata()
+        }))
+
+    def test_secret_ids_lists_each_transform_secret_once_in_policy_order(self):
+        def transformed_rule(path, secrets):
+            return {
+                "schemes": ["https"],
+                "methods": ["GET"],
+                "path": {"exact": path},
+                "transform": {
+                    "request": {
+                        "headers": {
+                            f"X-Token-{index}": {"secret": secret, "transform": {"type": "bearer"}}
+                            for index, secret in enumerate(secrets)
+                        },
+                    },
+                },
+            }
+
+        matcher = self.matcher_from_domains(
+            [
+                "plain.example",
+                {"host": "api.github.com", "rules": [
+                    transformed_rule("/a", ["github-read", "github-push"]),
+                    {"schemes": ["https"], "methods": ["GET"], "path": {"prefix": "/"}},
+                ]},
+                {"host": "*.openai.com", "rules": [transformed_rule("/b", ["openai-api-token", "github-read"])]},
+            ]
+        )
+
+        self.assertEqual(
+            matcher.secret_ids(),
+            ("github-read", "github-push", "openai-api-token"),
+        )
+        self.assertEqual(self.matcher_from_domains(["plain.example"]).secret_ids(), ())
+
+    def test_from_policy_data_reuses_records_for_unchanged_domain_entries(self):
+        github = {"host": "*.github.com", "rules": [{"schemes": ["https"]}]}
+        previous = self.matcher_from_domains(["plain.example", github, "old.example"])
+
+        matcher = self.policy_matcher.PolicyMatcher.from_policy_data(
+            {"domains": [
+                {"host": "*.github.com", "rules": [{"schemes": ["https"]}]},
+                "new.example",
+                {"host": "plain.example", "rules": [{"schemes": ["https"]}]},
+            ]},
+            previous=previous,
+        )
+
+        self.assertEqual(
+            [record.host for record in matcher.host_records],
+            ["new.example", "plain.example", "*.github.com"],
+        )
+        self.assertIs(matcher.host_records[2], previous.host_records[2])
+        self.assertEqual(matcher.host_records[1].rules[0].schemes, ("https",))
+        self.assertEqual(
+            matcher.host_record_changes(previous),
+            {"added": 1, "removed": 1, "changed": 1, "reused": 1},
+        )
+
     def test_rule_transform_request_metadata_requires_connect_request_inspection(self):
         matcher = self.matcher_from_domains(
             [
@@ -770,6 +1108,161 @@ class PolicyMatcherTests(unittest.TestCase):
         self.assertEqual(decision.reason, "connect_inspect_request")
 
 
+class PolicyArtifactTests(unittest.TestCase):
+    POLICY_TEXT = """
+domains:
+  - plain.example
+  - host: "*.github.com"
+    rules:
+      - schemes: [https]
+  - host: api.openai.com
+    rules:
+      - schemes: [https]
+        methods: [GET]
+        path:
+          prefix: /V1/%7emodels
+        path_case_insensitive: true
+      - schemes: [https]
+        methods: [POST, get]
+        path:
+          exact: /v1/responses
+        query:
+          exact:
+            b: ["2", "1"]
+            a: [""]
+        transform:
+          request:
+            headers:
+              Authorization:
+                secret: openai-api-token
+                transform:
+                  type: basic
+                  username: x-access-token
+            on_existing_header: replace
+  - host: api.example.com
+    rules:
+      - schemes: [https]
+"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.policy_matcher = load_policy_matcher_module()
+
+    def setUp(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        self.policy_path = Path(tempdir.name) / "policy.yaml"
+        self.artifact_path = Path(tempdir.name) / "policy.compiled"
+        self.policy_path.write_text(self.POLICY_TEXT, encoding="utf-8")
+        self.matcher = self.policy_matcher.PolicyMatcher.from_policy_path(str(self.policy_path))
+        self.artifact_path.write_bytes(self.matcher.to_artifact(self.POLICY_TEXT.encode("utf-8")))
+
+    def load_artifact(self):
+        return self.policy_matcher.PolicyMatcher.from_artifact_path(
+            str(self.artifact_path),
+            str(self.policy_path),
+        )
+
+    def test_artifact_round_trips_compiled_host_records(self):
+        loaded = self.load_artifact()
+
+        self.assertEqual(loaded.host_records, self.matcher.host_records)
+        self.assertEqual(loaded.record_digests, self.matcher.record_digests)
+        self.assertEqual(
+            [record.host for record in loaded.host_records],
+            ["plain.example", "api.openai.com", "api.example.com", "*.github.com"],
+        )
+        self.assertEqual(loaded.secret_ids(), ("openai-api-token",))
+        self.assertIs(
+            loaded.host_records[2].rules[0],
+            loaded.host_records[3].rules[0],
+        )
+        decision = loaded.evaluate_request(
+            "api.openai.com", "https", "GET", "/v1/responses?a=&b=1&b=2"
+        )
+        self.assertEqual(decision.action, "allowed")
+        self.assertEqual(decision.matched_rule_index, 1)
+        self.assertEqual(decision.rule_transform.request.headers[0].username, "x-access-token")
+        # Injection plans are derived again on decode, not stored.
+        self.assertEqual(decision.rule_transform.request.target_names, frozenset({"authorization"}))
+        self.assertEqual(decision.rule_transform.request.headers[0].render_key, ("basic", "x-access-token"))
+        self.assertEqual(
+            loaded.evaluate_request("api.openai.com", "https", "GET", "/v1/~Models/list").action,
+            "allowed",
+        )
+        self.assertEqual(loaded.evaluate_connect("gist.github.com").reason, "connect_fast_path")
+
+    def test_artifact_bytes_reuse_unchanged_records_from_previous_matcher(self):
+        previous = self.policy_matcher.PolicyMatcher.from_policy_data(
+            {"domains": ["plain.example", {"host": "*.github.com", "rules": [{"schemes": ["http"]}]}]}
+        )
+
+        loaded = self.policy_matcher.PolicyMatcher.from_artifact_bytes(
+            self.artifact_path.read_bytes(),
+            previous=previous,
+        )
+
+        self.assertEqual(loaded.host_records, self.matcher.host_records)
+        self.assertIs(loaded.host_records[0], previous.host_records[0])
+        self.assertIsNot(loaded.host_records[3], previous.host_records[1])
+        self.assertEqual(loaded.source_description, "rendered policy")
+
+    def test_artifact_is_rejected_when_policy_changed_since_compile(self):
+        self.policy_path.write_text(self.POLICY_TEXT + "  - extra.example\n", encoding="utf-8")
+
+        with self.assertRaisesRegex(
+            self.policy_matcher.PolicyArtifactError,
+            "compiled from a different policy",
+        ):
+            self.load_artifact()
+
+    def test_artifact_is_rejected_when_payload_is_corrupt(self):
+        data = bytearray(self.artifact_path.read_bytes())
+        data[-2] ^= 0x01
+        self.artifact_path.write_bytes(bytes(data))
+
+        with self.assertRaisesRegex(self.policy_matcher.PolicyArtifactError, "checksum"):
+            self.load_artifact()
+
+    def test_artifact_is_rejected_when_truncated_or_from_another_version(self):
+        data = self.artifact_path.read_bytes()
+        self.artifact_path.write_bytes(data[:-10])
+        with self.assertRaisesRegex(self.policy_matcher.PolicyArtifactError, "truncated"):
+            self.load_artifact()
+
+        self.artifact_path.write_bytes(b"")
+        with self.assertRaisesRegex(self.policy_matcher.PolicyArtifactError, "truncated"):
+            self.load_artifact()
+
+        self.artifact_path.write_bytes(
+            data[:8] + (self.policy_matcher.POLICY_ARTIFACT_VERSION + 1).to_bytes(4, "little") + data[12:]
+        )
+        with self.assertRaisesRegex(self.policy_matcher.PolicyArtifactError, "artifact version"):
+            self.load_artifact()
+
+    def test_artifacts_from_earlier_payload_formats_are_rejected(self):
+        data = self.artifact_path.read_bytes()
+        current = self.policy_matcher.POLICY_ARTIFACT_VERSION
+        self.assertGreaterEqual(current, 3)
+        for version in range(1, current):
+            with self.subTest(version=version):
+                self.artifact_path.write_bytes(data[:8] + version.to_bytes(4, "little") + data[12:])
+                with self.assertRaisesRegex(
+                    self.policy_matcher.PolicyArtifactError,
+                    f"artifact version {version}, expected {current}",
+                ):
+                    self.load_artifact()
+
+    def test_missing_artifact_raises_artifact_error(self):
+        self.artifact_path.unlink()
+
+        with self.assertRaisesRegex(
+            self.policy_matcher.PolicyArtifactError,
+            "no compiled policy artifact",
+        ):
+            self.load_artifact()
+
+
 class PolicyMatcherGithubServiceIntegrationTests(unittest.TestCase):
     """Prove the generic matcher enforces GitHub service expansions end-to-end.
 
@@ -1,4 +1,5 @@
 import importlib.util
+import io
 import os
 import sys
 import tempfile
@@ -880,6 +881,21 @@ services:
         self.assertNotIn("github-token", init_body)
         self.assertNotIn("github-token", git_env_body)
 
+    def test_write_credential_shim_init_reports_whether_files_changed(self):
+        rendered = self.render_single(
+            """
+domains:
+  - api.github.com
+"""
+        )
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            init_path = Path(tempdir) / "init.zsh"
+            self.assertTrue(self.render_policy.write_credential_shim_init(rendered, str(init_path)))
+            mtime_ns = init_path.stat().st_mtime_ns
+            self.assertFalse(self.render_policy.write_credential_shim_init(rendered, str(init_path)))
+            self.assertEqual(init_path.stat().st_mtime_ns, mtime_ns)
+
     def test_write_credential_shim_init_clears_stale_fragments_without_hints(self):
         rendered = self.render_single(
             """
@@ -1353,6 +1369,42 @@ class PublicPolicyViewTests(unittest.TestCase):
                 },
             )
 
+    def test_write_public_policy_replaces_file_only_when_content_changes(self):
+        first = {"domains": [{"host": "api.github.com", "rules": [{"schemes": ["https"]}]}]}
+        second = {"domains": [{"host": "api.openai.com", "rules": [{"schemes": ["https"]}]}]}
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            out_path = Path(tempdir) / "policy.yaml"
+            self.assertTrue(self.render_policy.write_public_policy(first, str(out_path)))
+            inode = out_path.stat().st_ino
+
+            self.assertFalse(self.render_policy.write_public_policy(first, str(out_path)))
+            self.assertEqual(out_path.stat().st_ino, inode)
+
+            self.assertTrue(self.render_policy.write_public_policy(second, str(out_path)))
+            # Replaced by rename, so a reader holding the old file never sees
+            # a partial write.
+            self.assertNotEqual(out_path.stat().st_ino, inode)
+            self.assertIn("api.openai.com", out_path.read_text(encoding="utf-8"))
+            self.assertEqual(sorted(path.name for path in Path(tempdir).iterdir()), ["policy.yaml"])
+
+    def test_write_file_if_changed_uses_a_unique_temp_file(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            out_path = Path(tempdir) / "policy.yaml"
+            # A leftover from a writer that used a fixed temp name.
+            (Path(tempdir) / "policy.yaml.tmp").mkdir()
+            out_path.write_bytes(b"same-prefix, longer")
+
+            self.assertTrue(self.render_policy.credential_shim.write_file_if_changed(str(out_path), b"same-prefix"))
+            self.assertFalse(self.render_policy.credential_shim.write_file_if_changed(str(out_path), b"same-prefix"))
+
+            self.assertEqual(out_path.read_bytes(), b"same-prefix")
+            self.assertEqual(out_path.stat().st_mode & 0o777, 0o644)
+            self.assertEqual(
+                sorted(path.name for path in Path(tempdir).iterdir()),
+                ["policy.yaml", "policy.yaml.tmp"],
+            )
+
     def test_write_public_policy_no_op_without_path(self):
         with mock.patch.dict(os.environ, {"AGENTBOX_PUBLIC_POLICY_PATH": ""}, clear=False):
             # Should not raise when no destination is configured.
@@ -1369,5 +1421,79 @@ class PublicPolicyViewTests(unittest.TestCase):
             self.render_policy.write_public_policy({"domains": []}, str(doomed))
 
 
+
+class PolicySourcePathsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.render_policy = load_render_policy_module()
+
+    def test_policy_source_paths_follow_active_render_mode(self):
+        with mock.patch.dict(
+            os.environ,
+            {
+                "AGENTBOX_ACTIVE_AGENT": "",
+                "AGENTBOX_POLICY_SOURCE_PATH": "/tmp/source.yaml",
+                "AGENTBOX_SHARED_POLICY_PATH": "/tmp/shared.yaml",
+                "AGENTBOX_AGENT_POLICY_PATH": "/tmp/agent.yaml",
+                "AGENTBOX_DEVCONTAINER_POLICY_PATH": "/tmp/devcontainer.yaml",
+            },
+            clear=False,
+        ):
+            self.assertEqual(self.render_policy.policy_source_paths(), ("/tmp/source.yaml",))
+            os.environ["AGENTBOX_ACTIVE_AGENT"] = "claude"
+            self.assertEqual(
+                self.render_policy.policy_source_paths(),
+                ("/tmp/shared.yaml", "/tmp/agent.yaml", "/tmp/devcontainer.yaml"),
+            )
+
+
+class CompiledPolicyOutputTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.render_policy = load_render_policy_module()
+
+    def test_write_compiled_policy_emits_artifact_bound_to_rendered_yaml(self):
+        rendered = {
+            "domains": [
+                {"host": "api.github.com", "rules": [{"schemes": ["https"], "methods": ["GET"]}]},
+                {"host": "*.example.com", "rules": [{"schemes": ["http", "https"]}]},
+            ],
+        }
+        rendered_yaml = yaml.safe_dump(rendered, sort_keys=False)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            policy_path = Path(tempdir) / "policy.yaml"
+            compiled_path = Path(tempdir) / "nested" / "policy.compiled"
+            policy_path.write_text(rendered_yaml, encoding="utf-8")
+
+            self.render_policy.write_compiled_policy(rendered, rendered_yaml, str(compiled_path))
+
+            policy_matcher = self.render_policy.load_policy_matcher_module()
+            loaded = policy_matcher.PolicyMatcher.from_artifact_path(
+                str(compiled_path),
+                str(policy_path),
+            )
+            self.assertEqual(
+                loaded.host_records,
+                policy_matcher.PolicyMatcher.from_policy_data(rendered).host_records,
+            )
+            self.assertEqual(sorted(path.name for path in compiled_path.parent.iterdir()), ["policy.compiled"])
+
+    def test_write_compiled_policy_warns_instead_of_failing(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            blocker = Path(tempdir) / "blocker"
+            blocker.write_text("not a directory", encoding="utf-8")
+            stderr = io.StringIO()
+
+            with mock.patch.object(sys, "stderr", stderr):
+                self.render_policy.write_compiled_policy(
+                    {"domains": []},
+                    "domains: []\n",
+                    str(blocker / "policy.compiled"),
+                )
+
+        self.assertIn("warning: could not write compiled policy", stderr.getvalue())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -2,13 +2,17 @@ import base64
 import importlib.util
 import sys
 import tempfile
+import threading
+import time
 import unittest
 from importlib.machinery import SourceFileLoader
 from pathlib import Path
+from unittest import mock
 
 
 REPO_ROOT = Path(__file__).resolve().parents[3]
 SECRET_RESOLVER_PATH = REPO_ROOT / "images" / "proxy" / "secret_resolver.py"
+SECRET_DAEMON_PATH = Path(__file__).resolve().with_name("secret_daemon.py")
 
 
 def load_secret_resolver_module():
@@ -168,19 +172,280 @@ class SecretResolverTests(unittest.TestCase):
         self.assertIn("chmod 600", messages)
         self.assertNotIn("secret-token", messages)
 
-    def test_file_secret_changes_are_visible_on_next_resolve(self):
+    def cached_resolver_for_root(self, root):
+        now = [100.0]
+        resolver = self.resolver_for_root(root)
+        resolver.monotonic = lambda: now[0]
+        self.addCleanup(resolver.close)
+        return resolver, now
+
+    def test_file_secret_changes_are_visible_after_cache_ttl(self):
         root = self.make_root()
         secret_path = self.write_secret(root, value=b"first-token")
-        resolver = self.resolver_for_root(root)
+        resolver, now = self.cached_resolver_for_root(root)
 
         first = resolver.resolve("service-token")
         secret_path.write_bytes(b"second-token")
         secret_path.chmod(0o600)
+        cached = resolver.resolve("service-token")
+        now[0] += resolver.cache_ttl
+        second = resolver.resolve("service-token")
+
+        self.assertEqual(first.value.as_text(), "first-token")
+        self.assertIs(cached, first)
+        self.assertEqual(second.value.as_text(), "second-token")
+
+    def test_zero_cache_ttl_sees_changes_on_next_resolve(self):
+        root = self.make_root()
+        secret_path = self.write_secret(root, value=b"first-token")
+        resolver = self.secret_resolver.SecretResolver.from_env(
+            {"AGENTBOX_SECRET_SOURCE": f"file:{root}", "AGENTBOX_SECRET_CACHE_TTL": "0"}
+        )
+        self.addCleanup(resolver.close)
+
+        first = resolver.resolve("service-token")
+        secret_path.write_bytes(b"second-token")
         second = resolver.resolve("service-token")
 
         self.assertEqual(first.value.as_text(), "first-token")
         self.assertEqual(second.value.as_text(), "second-token")
 
+    def test_invalid_cache_ttl_is_rejected(self):
+        with self.assertRaises(self.secret_resolver.SecretResolverError) as context:
+            self.secret_resolver.SecretResolver.from_env(
+                {"AGENTBOX_SECRET_SOURCE": "file:/run/secrets/agentbox", "AGENTBOX_SECRET_CACHE_TTL": "soon"}
+            )
+
+        self.assertIn("AGENTBOX_SECRET_CACHE_TTL", str(context.exception))
+
+    def test_unchanged_file_is_not_reread_after_cache_ttl(self):
+        root = self.make_root()
+        self.write_secret(root)
+        resolver, now = self.cached_resolver_for_root(root)
+
+        first = resolver.resolve("service-token")
+        now[0] += resolver.cache_ttl
+        with mock.patch.object(self.secret_resolver, "_read_regular_file") as read_file:
+            second = resolver.resolve("service-token")
+
+        read_file.assert_not_called()
+        self.assertIs(second, first)
+
+    def test_permission_change_refreshes_cached_warnings(self):
+        root = self.make_root()
+        secret_path = self.write_secret(root)
+        resolver, now = self.cached_resolver_for_root(root)
+
+        self.assertEqual(resolver.resolve("service-token").warnings, ())
+        secret_path.chmod(0o644)
+        now[0] += resolver.cache_ttl
+
+        warnings = resolver.resolve("service-token").warnings
+        self.assertEqual([warning.code for warning in warnings], ["unsafe_permissions"])
+
+    def test_symlink_swapped_in_after_caching_is_rejected(self):
+        root = self.make_root()
+        secret_path = self.write_secret(root)
+        outside = root.parent / "outside-secret"
+        outside.write_bytes(b"outside-token")
+        self.addCleanup(lambda: outside.exists() and outside.unlink())
+        resolver, now = self.cached_resolver_for_root(root)
+
+        resolver.resolve("service-token")
+        secret_path.unlink()
+        secret_path.symlink_to(outside)
+        now[0] += resolver.cache_ttl
+
+        with self.assertRaises(self.secret_resolver.SecretResolverError) as context:
+            resolver.resolve("service-token")
+
+        self.assertIn("must not be a symlink", str(context.exception))
+        with self.assertRaises(self.secret_resolver.SecretResolverError):
+            resolver.resolve("service-token")
+
+    def test_replaced_root_directory_is_reopened(self):
+        parent = self.make_root()
+        root = parent / "secrets"
+        root.mkdir(mode=0o700)
+        self.write_secret(root, value=b"first-token")
+        resolver, now = self.cached_resolver_for_root(root)
+
+        resolver.resolve("service-token")
+        root.rename(parent / "old-secrets")
+        root.mkdir(mode=0o700)
+        self.write_secret(root, value=b"second-token")
+        now[0] += resolver.cache_ttl
+
+        self.assertEqual(resolver.resolve("service-token").value.as_text(), "second-token")
+
+    def test_peek_only_returns_fresh_cached_resolutions(self):
+        root = self.make_root()
+        self.write_secret(root)
+        resolver, now = self.cached_resolver_for_root(root)
+
+        self.assertIsNone(resolver.peek("service-token"))
+        resolution = resolver.resolve("service-token")
+        self.assertIs(resolver.peek("service-token"), resolution)
+        now[0] += resolver.cache_ttl
+        self.assertIsNone(resolver.peek("service-token"))
+
+    def test_invalidate_drops_cached_resolution(self):
+        root = self.make_root()
+        secret_path = self.write_secret(root, value=b"first-token")
+        resolver, _ = self.cached_resolver_for_root(root)
+
+        resolver.resolve("service-token")
+        secret_path.write_bytes(b"second-token")
+        resolver.invalidate("service-token")
+
+        self.assertEqual(resolver.resolve("service-token").value.as_text(), "second-token")
+
+    def wait_for(self, predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            time.sleep(0.01)
+        return predicate()
+
+    def test_slow_read_does_not_block_other_ids_invalidate_or_close(self):
+        module = self.secret_resolver
+        root = self.make_root()
+        self.write_secret(root, "slow-token", b"slow-value")
+        self.write_secret(root, "fast-token", b"fast-value")
+        resolver = module.FileSecretResolver(root, cache_ttl=30)
+        entered = threading.Event()
+        release = threading.Event()
+        read_regular_file = module._read_regular_file
+
+        def gated_read(root_fd, secret_id):
+            if secret_id == "slow-token":
+                entered.set()
+                release.wait(timeout=5)
+            return read_regular_file(root_fd, secret_id)
+
+        results = []
+        with mock.patch.object(module, "_read_regular_file", gated_read):
+            slow = threading.Thread(target=lambda: results.append(resolver.resolve("slow-token")))
+            slow.start()
+            self.assertTrue(entered.wait(timeout=5))
+
+            self.assertEqual(resolver.resolve("fast-token").value.as_text(), "fast-value")
+            self.assertEqual(resolver.invalidate(), ["fast-token"])
+            resolver.close()
+            release.set()
+            slow.join(timeout=5)
+
+        self.assertEqual(results[0].value.as_text(), "slow-value")
+        # The slow read started before invalidate(), so its result is not cached,
+        # and close() released the root fd once the read finished.
+        self.assertIsNone(resolver.peek("slow-token"))
+        self.assertIsNone(resolver._root_fd)
+
+    def test_invalid_watch_mode_is_rejected(self):
+        with self.assertRaises(self.secret_resolver.SecretResolverError) as context:
+            self.secret_resolver.SecretResolver.from_env(
+                {"AGENTBOX_SECRET_SOURCE": "file:/run/secrets/agentbox", "AGENTBOX_SECRET_WATCH": "fanotify"}
+            )
+
+        self.assertIn("AGENTBOX_SECRET_WATCH", str(context.exception))
+
+    def test_watching_is_off_by_default(self):
+        root = self.make_root()
+        resolver = self.resolver_for_root(root)
+
+        self.assertIsNone(resolver.start_watching())
+
+    def test_active_watcher_skips_revalidation(self):
+        root = self.make_root()
+        secret_path = self.write_secret(root, value=b"first-token")
+        resolver, now = self.cached_resolver_for_root(root)
+        resolver._watcher = mock.Mock(active=True)
+
+        first = resolver.resolve("service-token")
+        secret_path.write_bytes(b"second-token")
+        now[0] += 1000
+        self.assertIs(resolver.resolve("service-token"), first)
+
+        resolver._watcher.active = False
+        self.assertEqual(resolver.resolve("service-token").value.as_text(), "second-token")
+
+    def assert_watcher_reports_rotation(self, watch_mode):
+        root = self.make_root()
+        secret_path = self.write_secret(root, value=b"first-token")
+        self.write_secret(root, secret_id="other-token", value=b"other")
+        resolver = self.secret_resolver.FileSecretResolver(
+            root,
+            watch_mode=watch_mode,
+            watch_interval=0.05,
+        )
+        self.addCleanup(resolver.close)
+        rotated = []
+
+        mode = resolver.start_watching(rotated.append)
+        self.assertTrue(self.wait_for(lambda: resolver._watcher.active))
+        resolver.resolve("service-token")
+        resolver.resolve("other-token")
+
+        replacement = root / "service-token.tmp"
+        replacement.write_bytes(b"second-token")
+        replacement.chmod(0o600)
+        replacement.replace(secret_path)
+
+        self.assertTrue(self.wait_for(lambda: "service-token" in rotated))
+        self.assertNotIn("other-token", rotated)
+        self.assertEqual(resolver.resolve("service-token").value.as_text(), "second-token")
+        return mode
+
+    def test_poll_watcher_invalidates_replaced_secret(self):
+        mode = self.assert_watcher_reports_rotation("poll")
+
+        self.assertEqual(mode, "poll")
+
+    def test_auto_watcher_invalidates_replaced_secret(self):
+        mode = self.assert_watcher_reports_rotation("auto")
+
+        directory_watcher = sys.modules[self.secret_resolver.DirectoryWatcher.__module__]
+        expected = "inotify" if directory_watcher._load_inotify() is not None else "poll"
+        self.assertEqual(mode, expected)
+
+    def test_first_watch_does_not_invalidate_cached_secrets(self):
+        root = self.make_root()
+        self.write_secret(root)
+        resolver = self.secret_resolver.FileSecretResolver(root, watch_mode="auto")
+        self.addCleanup(resolver.close)
+        first = resolver.resolve("service-token")
+        rotated = []
+        resets = []
+
+        resolver.start_watching(rotated.append, resets.append)
+        self.assertTrue(self.wait_for(lambda: resolver._watcher.active))
+        time.sleep(0.1)
+
+        self.assertEqual((rotated, resets), ([], []))
+        self.assertIs(resolver.peek("service-token"), first)
+
+    def test_watch_reset_drops_cache_without_naming_secrets(self):
+        root = self.make_root()
+        self.write_secret(root)
+        self.write_secret(root, secret_id="other-token", value=b"other")
+        resolver = self.secret_resolver.FileSecretResolver(root, watch_mode="poll", watch_interval=60)
+        self.addCleanup(resolver.close)
+        rotated = []
+        resets = []
+        resolver.start_watching(rotated.append, resets.append)
+        resolver.resolve("service-token")
+        resolver.resolve("other-token")
+
+        # What the watcher reports after an inotify queue overflow.
+        resolver._handle_watch_change(None)
+        resolver._handle_watch_change(None)
+
+        self.assertEqual(rotated, [])
+        self.assertEqual(resets, [2])
+        self.assertIsNone(resolver.peek("service-token"))
+        self.assertIsNone(resolver.peek("other-token"))
+
     def test_crlf_trailing_newline_is_trimmed_once(self):
         root = self.make_root()
         self.write_secret(root, value=b"secret-token\r\n")
@@ -254,6 +519,42 @@ class SecretResolverTests(unittest.TestCase):
         expected = base64.b64encode(b"x-access-token:secret-token").decode("ascii")
         self.assertEqual(rendered, f"Basic {expected}")
 
+    def test_rendered_header_value_is_cached_per_transform(self):
+        value = self.secret_resolver.SecretValue.from_text("secret-token")
+        basic = {"type": "basic", "username": "x-access-token"}
+
+        first = self.secret_resolver.render_header_value(value, basic)
+        with mock.patch.object(self.secret_resolver, "_render_header_value") as render:
+            second = self.secret_resolver.render_header_value(value, dict(basic))
+            bearer = self.secret_resolver.render_header_value(value, {"type": "bearer"})
+
+        self.assertIs(second, first)
+        render.assert_called_once_with(value, {"type": "bearer"})
+        self.assertIs(bearer, render.return_value)
+        self.assertNotIn("secret-token", repr(value))
+
+    def test_compiled_header_value_skips_validation_and_caches_per_secret_version(self):
+        value = self.secret_resolver.SecretValue.from_text("secret-token")
+        render_key = ("basic", "x-access-token")
+
+        with mock.patch.object(self.secret_resolver.policy_injection, "normalize_header_transform") as normalize:
+            first = self.secret_resolver.render_compiled_header_value(value, render_key)
+            second = self.secret_resolver.render_compiled_header_value(value, render_key)
+        rotated = self.secret_resolver.render_compiled_header_value(
+            self.secret_resolver.SecretValue.from_text("rotated-token"),
+            render_key,
+        )
+
+        normalize.assert_not_called()
+        self.assertIs(second, first)
+        expected = base64.b64encode(b"x-access-token:secret-token").decode("ascii")
+        self.assertEqual(first, f"Basic {expected}")
+        self.assertNotEqual(rotated, first)
+        self.assertEqual(
+            self.secret_resolver.render_compiled_header_value(value, ("bearer", None)),
+            "Bearer secret-token",
+        )
+
     def test_transform_validation_reuses_policy_injection_rules(self):
         value = self.secret_resolver.SecretValue.from_text("secret-token")
 
@@ -261,3 +562,153 @@ class SecretResolverTests(unittest.TestCase):
             self.secret_resolver.render_header_value(value, {"type": "digest"})
 
         self.assertIn("transform.type must be one of", str(context.exception))
+
+
+class UnixSocketSecretResolverTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.secret_resolver = load_secret_resolver_module()
+        loader = SourceFileLoader("secret_daemon_module", str(SECRET_DAEMON_PATH))
+        spec = importlib.util.spec_from_loader(loader.name, loader)
+        cls.secret_daemon = importlib.util.module_from_spec(spec)
+        loader.exec_module(cls.secret_daemon)
+
+    def socket_path(self):
+        tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tempdir.cleanup)
+        return Path(tempdir.name) / "secrets.sock"
+
+    def start_daemon(self, socket_path=None, secrets=None, **kwargs):
+        if socket_path is None:
+            socket_path = self.socket_path()
+        if secrets is None:
+            secrets = {"service-token": "secret-token"}
+        daemon = self.secret_daemon.StandInSecretDaemon(socket_path, secrets, **kwargs).start()
+        self.addCleanup(daemon.stop)
+        return daemon
+
+    def make_resolver(self, daemon, **kwargs):
+        now = [100.0]
+        resolver = self.secret_resolver.UnixSocketSecretResolver(
+            daemon.socket_path,
+            monotonic=lambda: now[0],
+            **kwargs,
+        )
+        self.addCleanup(resolver.close)
+        return resolver, now
+
+    def test_from_env_resolves_unix_secret(self):
+        daemon = self.start_daemon()
+        resolver = self.secret_resolver.SecretResolver.from_env(
+            {"AGENTBOX_SECRET_SOURCE": f"unix:{daemon.socket_path}"}
+        )
+        self.addCleanup(resolver.close)
+
+        result = resolver.resolve("service-token")
+
+        self.assertIsInstance(resolver, self.secret_resolver.UnixSocketSecretResolver)
+        self.assertEqual(result.secret_id, "service-token")
+        self.assertIsInstance(result.value, self.secret_resolver.SecretValue)
+        self.assertEqual(result.value.as_text(), "secret-token")
+        self.assertEqual(result.warnings, ())
+        self.assertNotIn("secret-token", repr(result))
+        self.assertEqual(
+            self.secret_resolver.render_header_value(result.value, {"type": "bearer"}),
+            "Bearer secret-token",
+        )
+
+    def test_unix_source_rejects_relative_path_and_watch_mode(self):
+        for env, message in (
+            ({"AGENTBOX_SECRET_SOURCE": "unix:relative.sock"}, "absolute socket path"),
+            (
+                {"AGENTBOX_SECRET_SOURCE": "unix:/run/agentbox.sock", "AGENTBOX_SECRET_WATCH": "auto"},
+                "only applies to file secret sources",
+            ),
+        ):
+            with self.subTest(env=env):
+                with self.assertRaises(self.secret_resolver.SecretResolverError) as context:
+                    self.secret_resolver.SecretResolver.from_env(env)
+                self.assertIn(message, str(context.exception))
+
+    def test_connections_are_pooled_across_requests(self):
+        daemon = self.start_daemon()
+        resolver, _ = self.make_resolver(daemon, cache_ttl=0)
+
+        for _ in range(5):
+            resolver.resolve("service-token")
+
+        self.assertEqual(daemon.requests, 5)
+        self.assertEqual(daemon.connections, 1)
+
+    def test_resolutions_are_cached_until_ttl_expires(self):
+        daemon = self.start_daemon()
+        resolver, now = self.make_resolver(daemon, cache_ttl=30)
+
+        first = resolver.resolve("service-token")
+        self.assertIs(resolver.resolve("service-token"), first)
+        self.assertIs(resolver.peek("service-token"), first)
+        now[0] += 30
+        self.assertIsNone(resolver.peek("service-token"))
+        resolver.resolve("service-token")
+
+        self.assertEqual(daemon.requests, 2)
+
+    def test_daemon_ttl_overrides_default_ttl(self):
+        daemon = self.start_daemon(ttl=0)
+        resolver, _ = self.make_resolver(daemon, cache_ttl=30)
+
+        resolver.resolve("service-token")
+        resolver.resolve("service-token")
+
+        self.assertEqual(daemon.requests, 2)
+
+    def test_concurrent_lookups_for_one_id_share_a_round_trip(self):
+        daemon = self.start_daemon(delay=0.2)
+        resolver, _ = self.make_resolver(daemon, cache_ttl=30)
+        results = []
+
+        def resolve():
+            results.append(resolver.resolve("service-token"))
+
+        threads = [threading.Thread(target=resolve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(len(results), 8)
+        self.assertEqual(daemon.requests, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_daemon_errors_are_reported_without_values(self):
+        daemon = self.start_daemon(secrets={"bad-token": "top-secret\nstill-secret"})
+        resolver, _ = self.make_resolver(daemon)
+
+        with self.assertRaises(self.secret_resolver.SecretResolverError) as context:
+            resolver.resolve("missing-token")
+        self.assertIn("has no secret for secret ID 'missing-token'", str(context.exception))
+
+        with self.assertRaises(self.secret_resolver.SecretResolverError) as context:
+            resolver.resolve("bad-token")
+        self.assertIn("invalid secret bytes", str(context.exception))
+        self.assertNotIn("top-secret", str(context.exception))
+
+    def test_unreachable_daemon_is_rejected(self):
+        resolver = self.secret_resolver.UnixSocketSecretResolver(self.socket_path())
+
+        with self.assertRaises(self.secret_resolver.SecretResolverError) as context:
+            resolver.resolve("service-token")
+
+        self.assertIn("Secret daemon is not reachable", str(context.exception))
+
+    def test_pooled_connection_is_replaced_after_daemon_restart(self):
+        socket_path = self.socket_path()
+        daemon = self.start_daemon(socket_path)
+        resolver, _ = self.make_resolver(daemon, cache_ttl=0)
+        resolver.resolve("service-token")
+
+        daemon.stop()
+        restarted = self.start_daemon(socket_path, secrets={"service-token": "rotated-token"})
+
+        self.assertEqual(resolver.resolve("service-token").value.as_text(), "rotated-token")
+        self.assertEqual(restarted.connections, 1)